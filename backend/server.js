@@ -336,7 +336,11 @@ app.post('/api/assess', async (req, res) => {
         location: location,
         space_length: spaceLength,
         space_width: spaceWidth
-      }, { timeout: 5000 });
+      }, {
+        timeout: 5000,
+        // Lets the ML API shed the request early instead of working past our timeout
+        headers: { 'X-Deadline-Ms': '4500' }
+      });
       
       mlPrediction = mlResponse.data;
     } catch (mlError) {
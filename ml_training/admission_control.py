@@ -0,0 +1,139 @@
+import threading
+import time
+from collections import deque
+
+# Node backend gives up on the ML API after 5 s (axios timeout in server.js)
+DEFAULT_DEADLINE_MS = 4500
+
+
+def _ewma(average, sample, weight=0.1):
+    return sample if average is None else (1 - weight) * average + weight * sample
+
+
+class Rejected(Exception):
+    """Request turned away before running; status is the HTTP code to answer with"""
+
+    def __init__(self, status, reason):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+
+
+class AdmissionController:
+    """Bounded in-flight work with a deadline-aware wait queue
+
+    At most max_in_flight requests run at once and at most max_queue wait
+    for a slot. A request that would have to queue is rejected up front when
+    the queue is full (429) or when the expected wait plus its own service
+    time would overrun its deadline (503). A request whose deadline has
+    already passed is rejected even with a slot free, and a queued request
+    whose deadline passes is dropped without running.
+
+    Service time is tracked per request kind and per row, so a large batch
+    does not inflate the estimate for single predictions. A request that
+    finds a free slot is always admitted, so the estimates keep updating
+    after a slow outlier.
+    """
+
+    def __init__(self, max_in_flight=4, max_queue=32, default_deadline_ms=DEFAULT_DEADLINE_MS):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.default_deadline_ms = default_deadline_ms
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._waiting = 0
+        self._service_ms = None  # moving average of how long a request holds a slot
+        self._row_ms = {}  # moving average of service time per row, by request kind
+        self._queue_waits = deque(maxlen=1000)
+        self.counts = {
+            'admitted': 0,
+            'completed': 0,
+            'rejected_queue_full': 0,
+            'rejected_deadline': 0,
+            'expired_in_queue': 0
+        }
+
+    def deadline(self, deadline_ms=None):
+        """Absolute monotonic deadline from a relative budget in milliseconds"""
+        budget = self.default_deadline_ms if deadline_ms is None else deadline_ms
+        return time.monotonic() + budget / 1000
+
+    def expected_wait_ms(self):
+        """Queue wait for a new arrival at the current service rate"""
+        if self._service_ms is None or self._in_flight < self.max_in_flight:
+            return 0.0
+        return (self._waiting + 1) / self.max_in_flight * self._service_ms
+
+    def expected_service_ms(self, kind='default', rows=1):
+        """Service time of a request of this kind and size, or 0 before any has completed"""
+        row_ms = self._row_ms.get(kind)
+        return 0.0 if row_ms is None else row_ms * rows
+
+    def acquire(self, deadline, kind='default', rows=1):
+        """Wait for a slot; raises Rejected instead of queueing work that cannot finish in time"""
+        arrived = time.monotonic()
+        with self._cond:
+            if deadline <= arrived:
+                self.counts['rejected_deadline'] += 1
+                raise Rejected(503, 'Deadline already passed')
+
+            idle = self._in_flight < self.max_in_flight and self._waiting == 0
+            if not idle:
+                if self._waiting >= self.max_queue:
+                    self.counts['rejected_queue_full'] += 1
+                    raise Rejected(429, 'Too many queued requests')
+
+                expected_ms = self.expected_wait_ms() + self.expected_service_ms(kind, rows)
+                if arrived + expected_ms / 1000 > deadline:
+                    self.counts['rejected_deadline'] += 1
+                    raise Rejected(503, 'Request cannot complete before its deadline')
+
+            self._waiting += 1
+            try:
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:  # checked after every wake-up, not only while slots are full
+                        self.counts['expired_in_queue'] += 1
+                        self._cond.notify()  # pass on any wake-up this waiter consumed
+                        raise Rejected(503, 'Deadline passed while queued')
+                    if self._in_flight < self.max_in_flight:
+                        break
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+            self._in_flight += 1
+            self.counts['admitted'] += 1
+            started = time.monotonic()
+            self._queue_waits.append((started - arrived) * 1000)
+            return started
+
+    def release(self, started, kind='default', rows=1):
+        with self._cond:
+            self._in_flight -= 1
+            self.counts['completed'] += 1
+            elapsed_ms = (time.monotonic() - started) * 1000
+            self._service_ms = _ewma(self._service_ms, elapsed_ms)
+            self._row_ms[kind] = _ewma(self._row_ms.get(kind), elapsed_ms / max(rows, 1))
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            waits = sorted(self._queue_waits)
+            shed = self.counts['rejected_queue_full'] + self.counts['rejected_deadline'] + self.counts['expired_in_queue']
+            arrivals = self.counts['admitted'] + shed
+            return {
+                'max_in_flight': self.max_in_flight,
+                'max_queue': self.max_queue,
+                'in_flight': self._in_flight,
+                'queued': self._waiting,
+                **self.counts,
+                'shed_rate': round(shed / arrivals, 4) if arrivals else 0.0,
+                'service_ms': round(self._service_ms, 2) if self._service_ms is not None else None,
+                'service_ms_per_row': {kind: round(ms, 4) for kind, ms in self._row_ms.items()},
+                'queue_wait_ms': {
+                    'p50': round(waits[len(waits) // 2], 2) if waits else None,
+                    'p95': round(waits[int(len(waits) * 0.95)], 2) if waits else None,
+                    'max': round(waits[-1], 2) if waits else None
+                }
+            }
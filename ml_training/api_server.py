@@ -1,19 +1,131 @@
 from flask import Flask, request, jsonify, render_template_string
 from flask_cors import CORS
-import json
-from simple_prediction_service import SimplePredictionService
+import functools
+import math
+import os
+from admission_control import AdmissionController, Rejected, DEFAULT_DEADLINE_MS
+from district_registry import DistrictRegistry
+from sweep_engine import build_grid, run_sweep
+from structure_optimizer import StructureOptimizer
+from response_serializer import json_response, batch_response
+import numpy as np
+import pandas as pd
+
+# Largest grid /sweep will score synchronously; bigger sweeps use the CLI
+MAX_SWEEP_CELLS = 200000
+DEFAULT_SWEEP_ROOF_AREA = {'start': 50, 'stop': 500, 'step': 50}
+DEFAULT_SWEEP_HOUSEHOLD_SIZE = {'start': 1, 'stop': 12, 'step': 1}
+
+# Largest number of households accepted by /predict/batch
+MAX_BATCH_SIZE = 10000
 
 app = Flask(__name__)
 CORS(app)
 
 # Initialize the prediction service
 try:
-    prediction_service = SimplePredictionService()
+    # RWH_SERVING_MODE=surface answers known towns from precomputed response surfaces
+    # RWH_LATENCY_SLO_MS picks the most accurate engine within that single-row latency
+    # (default 1 ms; 'inf' ranks engines on accuracy alone)
+    # RWH_MAX_DISTRICTS bounds how many districts' models are held in memory at once
+    latency_slo = os.environ.get('RWH_LATENCY_SLO_MS')
+    districts = DistrictRegistry(
+        max_loaded=int(os.environ.get('RWH_MAX_DISTRICTS', 4)),
+        use_surfaces=os.environ.get('RWH_SERVING_MODE') == 'surface',
+        latency_slo_ms=float(latency_slo) if latency_slo else None
+    )
+    # The default district is loaded up front and pinned in the registry; others load on first request
+    prediction_service = districts.pin()
     print("✅ ML Prediction Service loaded successfully")
 except Exception as e:
     print(f"❌ Error loading ML service: {e}")
+    districts = None
     prediction_service = None
 
+structure_optimizer = StructureOptimizer(prediction_service.rainfall if prediction_service else None)
+
+# Bounded concurrent inference for /predict, /predict/batch, /predict/sensitivity, /optimize and /sweep.
+# Requests may send X-Deadline-Ms (time left before the caller gives up); RWH_DEFAULT_DEADLINE_MS applies otherwise
+admission = AdmissionController(
+    max_in_flight=int(os.environ.get('RWH_MAX_IN_FLIGHT', 4)),
+    max_queue=int(os.environ.get('RWH_MAX_QUEUE', 32)),
+    default_deadline_ms=float(os.environ.get('RWH_DEFAULT_DEADLINE_MS', DEFAULT_DEADLINE_MS))
+)
+
+def batch_rows(data):
+    households = data.get('households') if isinstance(data, dict) else None
+    return len(households) if isinstance(households, list) and households else 1
+
+def sweep_axis(spec, cast):
+    """(start, step, count) of an inclusive start/stop/step range, counted without building it"""
+    start, stop, step = cast(spec['start']), cast(spec['stop']), cast(spec['step'])
+    if not all(math.isfinite(value) for value in (start, stop, step)) or step <= 0 or stop < start:
+        raise ValueError('start, stop and step must be finite with step > 0 and stop >= start')
+    return start, step, int(math.floor((stop - start) / step + 1e-9)) + 1
+
+def sweep_values(start, step, count):
+    return start + step * np.arange(count)
+
+def sweep_town_count(service, towns):
+    if towns is not None:
+        return len(towns)
+    return len(service.soil_data) if service is not None and service.soil_data is not None else 0
+
+def sweep_cells(data):
+    """Grid cell count of a /sweep request; 1 for requests the view will reject without scoring"""
+    data = data if isinstance(data, dict) else {}
+    try:
+        roof_count = sweep_axis(data.get('roof_area', DEFAULT_SWEEP_ROOF_AREA), float)[2]
+        household_count = sweep_axis(data.get('household_size', DEFAULT_SWEEP_HOUSEHOLD_SIZE), int)[2]
+        service, _ = request_service(data)
+        cells = sweep_town_count(service, data.get('towns')) * roof_count * household_count
+    except (KeyError, ValueError, TypeError, OverflowError):
+        return 1
+    return cells if 0 < cells <= MAX_SWEEP_CELLS else 1
+
+def admitted(kind, rows=None):
+    """Run a view under admission control, shedding requests that would miss their deadline
+    
+    kind keys the service-time estimate and rows(data) gives the request's
+    size in rows. The request's district is loaded before admission, so a
+    first-request model load is not counted as service time.
+    """
+    def decorate(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            header = request.headers.get('X-Deadline-Ms')
+            try:
+                deadline_ms = float(header) if header else None
+            except ValueError:
+                deadline_ms = -1.0
+            if deadline_ms is not None and not (math.isfinite(deadline_ms) and deadline_ms >= 0):
+                return jsonify({
+                    'error': 'Invalid X-Deadline-Ms',
+                    'message': 'X-Deadline-Ms must be a finite, non-negative number of milliseconds'
+                }), 400
+            deadline = admission.deadline(deadline_ms)
+            
+            data = request.get_json(silent=True)
+            _, error = request_service(data)
+            if error is not None:
+                return error
+            size = rows(data) if rows else 1
+            
+            try:
+                started = admission.acquire(deadline, kind, size)
+            except Rejected as e:
+                return jsonify({
+                    'error': 'Service overloaded',
+                    'message': e.reason
+                }), e.status, {'Retry-After': '1'}
+            
+            try:
+                return view(*args, **kwargs)
+            finally:
+                admission.release(started, kind, size)
+        return wrapper
+    return decorate
+
 @app.route('/')
 def home():
     """API documentation page"""
@@ -49,8 +161,10 @@ def home():
                 <pre>{
     "roof_area": 150,
     "household_size": 5,
-    "location": "Erode"
+    "location": "Erode",
+    "district": "Erode"
 }</pre>
+                <p><code>district</code> is optional and selects that district's models and location data.</p>
                 
                 <h4>Response Example:</h4>
                 <pre>{
@@ -80,6 +194,44 @@ def home():
             </div>
             
             <h2>🔧 Other Endpoints</h2>
+            <div class="endpoint">
+                <h3><span class="method">POST</span> /predict/batch</h3>
+                <p>Predictions for up to 10000 households per call. Send <code>Accept: application/x-ndjson</code> or <code>Accept: application/msgpack</code> for compact flat records</p>
+                <pre>{
+    "households": [
+        {"roof_area": 150, "household_size": 5, "location": "Erode"},
+        {"roof_area": 90, "household_size": 3, "location": "Bhavani"}
+    ]
+}</pre>
+            </div>
+            
+            <div class="endpoint">
+                <h3><span class="method">POST</span> /predict/sensitivity</h3>
+                <p>The /predict result plus the gradient of dimensions, volume, cost, cost per liter and structure probability with respect to every input, in one call</p>
+                <pre>{"roof_area": 150, "household_size": 5, "location": "Erode"}</pre>
+            </div>
+            
+            <div class="endpoint">
+                <h3><span class="method">POST</span> /optimize</h3>
+                <p>Structure dimensions with the lowest cost per captured liter under groundwater clearance limits</p>
+                <pre>{
+    "roof_area": 150,
+    "household_size": 5,
+    "location": "Erode",
+    "max_footprint": 12
+}</pre>
+            </div>
+            
+            <div class="endpoint">
+                <h3><span class="method">POST</span> /sweep</h3>
+                <p>Total harvestable water and cost for every town over a grid of roof areas and household sizes</p>
+                <pre>{
+    "roof_area": {"start": 50, "stop": 500, "step": 50},
+    "household_size": {"start": 1, "stop": 12, "step": 1},
+    "towns": ["Erode", "Bhavani"]
+}</pre>
+            </div>
+            
             <div class="endpoint">
                 <h3><span class="method">GET</span> /health</h3>
                 <p>Check API health status</p>
@@ -87,7 +239,17 @@ def home():
             
             <div class="endpoint">
                 <h3><span class="method">GET</span> /locations</h3>
-                <p>Get list of supported locations in Erode district</p>
+                <p>Get list of supported locations in Erode district (<code>?district=</code> for another district)</p>
+            </div>
+            
+            <div class="endpoint">
+                <h3><span class="method">GET</span> /districts</h3>
+                <p>Configured districts and which of them have models loaded</p>
+            </div>
+            
+            <div class="endpoint">
+                <h3><span class="method">GET</span> /admission</h3>
+                <p>Concurrency, queue, load-shedding and queue-wait statistics for /predict, /predict/batch, /predict/sensitivity and /optimize</p>
             </div>
             
             <h2>💡 Usage Example</h2>
@@ -143,16 +305,47 @@ def health():
         'service': 'RWH-Erode ML API',
         'version': '1.0.0',
         'models_loaded': len(prediction_service.models),
-        'locations_available': len(prediction_service.soil_data) if prediction_service.soil_data is not None else 0
+        'engine': prediction_service.engine,
+        'serving_mode': (
+            'surface' if prediction_service.surfaces is not None
+            else 'compiled' if prediction_service.pipeline is not None
+            else 'model'
+        ),
+        'locations_available': len(prediction_service.soil_data) if prediction_service.soil_data is not None else 0,
+        'districts': districts.stats(),
+        'admission': admission.stats()
+    })
+
+@app.route('/admission', methods=['GET'])
+def admission_stats():
+    """In-flight, queue, shed and queue-wait statistics for the admitted endpoints"""
+    return jsonify(admission.stats())
+
+@app.route('/districts', methods=['GET'])
+def list_districts():
+    """Configured districts and the model sets currently in memory"""
+    if districts is None:
+        return jsonify({
+            'error': 'ML service not available',
+            'message': 'The machine learning models could not be loaded'
+        }), 500
+    
+    return jsonify({
+        'districts': districts.names,
+        'default_district': districts.default_district,
+        **districts.stats()
     })
 
 @app.route('/locations', methods=['GET'])
 def locations():
     """Get supported locations"""
-    if prediction_service is None or prediction_service.soil_data is None:
+    service, error = request_service({'district': request.args.get('district')})
+    if error is not None:
+        return error
+    if service is None or service.soil_data is None:
         locations_list = ['Erode', 'Gobichettipalayam', 'Bhavani', 'Sathyamangalam']
     else:
-        locations_list = prediction_service.soil_data['Town'].tolist()
+        locations_list = service.soil_data['Town'].tolist()
     
     return jsonify({
         'locations': locations_list,
@@ -160,7 +353,68 @@ def locations():
         'note': 'If your location is not listed, the system will use the nearest available data'
     })
 
+def request_service(data):
+    """Prediction service for the request's district (the default district if unnamed)
+    
+    Returns (service, None) or (None, error response).
+    """
+    district = data.get('district') if isinstance(data, dict) else None
+    if district is None or districts is None:
+        return prediction_service, None
+    
+    try:
+        return districts.get(district), None
+    except KeyError:
+        return None, (jsonify({
+            'error': 'Unknown district',
+            'message': f"No models are configured for district '{district}'",
+            'available_districts': districts.names
+        }), 404)
+
+def parse_household_input(data):
+    """Validate roof_area, household_size and location from a request body
+    
+    Returns ((roof_area, household_size, location), None) or (None, error response).
+    """
+    # Validate required fields
+    required_fields = ['roof_area', 'household_size']
+    missing_fields = [field for field in required_fields if field not in data]
+    
+    if missing_fields:
+        return None, (jsonify({
+            'error': 'Missing required fields',
+            'missing_fields': missing_fields,
+            'required_fields': required_fields
+        }), 400)
+    
+    # Validate data
+    try:
+        roof_area = float(data['roof_area'])
+        household_size = int(data['household_size'])
+        location = data.get('location')
+        
+        if roof_area <= 0 or roof_area > 10000:
+            return None, (jsonify({
+                'error': 'Invalid roof_area',
+                'message': 'Roof area must be between 1 and 10000 square meters'
+            }), 400)
+        
+        if household_size <= 0 or household_size > 50:
+            return None, (jsonify({
+                'error': 'Invalid household_size',
+                'message': 'Household size must be between 1 and 50 people'
+            }), 400)
+    
+    except (ValueError, TypeError):
+        return None, (jsonify({
+            'error': 'Invalid data types',
+            'message': 'roof_area must be a number, household_size must be an integer'
+        }), 400)
+    
+    return (roof_area, household_size, location), None
+
 @app.route('/predict', methods=['POST'])
+@admitted('predict')
 def predict():
     """Main prediction endpoint"""
     if prediction_service is None:
@@ -178,43 +432,18 @@ def predict():
                 'message': 'Request body must be valid JSON'
             }), 400
         
-        # Validate required fields
-        required_fields = ['roof_area', 'household_size']
-        missing_fields = [field for field in required_fields if field not in data]
-        
-        if missing_fields:
-            return jsonify({
-                'error': 'Missing required fields',
-                'missing_fields': missing_fields,
-                'required_fields': required_fields
-            }), 400
-        
-        # Validate data
-        try:
-            roof_area = float(data['roof_area'])
-            household_size = int(data['household_size'])
-            location = data.get('location', 'Erode')
-            
-            if roof_area <= 0 or roof_area > 10000:
-                return jsonify({
-                    'error': 'Invalid roof_area',
-                    'message': 'Roof area must be between 1 and 10000 square meters'
-                }), 400
-            
-            if household_size <= 0 or household_size > 50:
-                return jsonify({
-                    'error': 'Invalid household_size',
-                    'message': 'Household size must be between 1 and 50 people'
-                }), 400
+        inputs, error = parse_household_input(data)
+        if error is not None:
+            return error
+        roof_area, household_size, location = inputs
         
-        except (ValueError, TypeError):
-            return jsonify({
-                'error': 'Invalid data types',
-                'message': 'roof_area must be a number, household_size must be an integer'
-            }), 400
+        service, error = request_service(data)
+        if error is not None:
+            return error
+        location = location or service.default_location
         
         # Make prediction
-        result = prediction_service.predict(
+        result = service.predict(
             roof_area=roof_area,
             household_size=household_size,
             location=location
@@ -227,11 +456,13 @@ def predict():
             'input_parameters': {
                 'roof_area': roof_area,
                 'household_size': household_size,
-                'location': location
-            }
+                'location': location,
+                'district': districts.resolve(data.get('district')) if districts else None
+            },
+            **service.serving_info(location)
         }
         
-        return jsonify(result)
+        return json_response(result)
     
     except Exception as e:
         print(f"Prediction error: {e}")
@@ -244,12 +475,258 @@ def predict():
             'details': str(e)
         }), 500
 
+@app.route('/predict/batch', methods=['POST'])
+@admitted('batch', rows=batch_rows)
+def predict_batch():
+    """Predictions for many households in one call
+    
+    Responds with JSON by default, or with flat records as NDJSON
+    (Accept: application/x-ndjson) or columnar MessagePack
+    (Accept: application/msgpack).
+    """
+    if prediction_service is None:
+        return jsonify({
+            'error': 'ML service not available',
+            'message': 'The machine learning models could not be loaded'
+        }), 500
+    
+    data = request.get_json(silent=True)
+    households = data.get('households') if isinstance(data, dict) else None
+    if not isinstance(households, list) or not households:
+        return jsonify({
+            'error': 'Invalid request',
+            'message': 'Request body must be JSON with a non-empty "households" list'
+        }), 400
+    
+    if len(households) > MAX_BATCH_SIZE:
+        return jsonify({
+            'error': 'Batch too large',
+            'message': f'At most {MAX_BATCH_SIZE} households are allowed per request'
+        }), 400
+    
+    try:
+        frame = pd.DataFrame(households)
+        roof_area = pd.to_numeric(frame['roof_area'], errors='coerce').to_numpy(dtype=float)
+        household_size = pd.to_numeric(frame['household_size'], errors='coerce').to_numpy(dtype=float)
+    except (KeyError, ValueError, TypeError):
+        return jsonify({
+            'error': 'Invalid data types',
+            'message': 'Each household must be an object with numeric roof_area and household_size'
+        }), 400
+    
+    invalid = ~(
+        (roof_area > 0) & (roof_area <= 10000) &
+        (household_size > 0) & (household_size <= 50)
+    )
+    if invalid.any():
+        return jsonify({
+            'error': 'Invalid households',
+            'message': 'roof_area must be 1-10000 square meters and household_size 1-50 people',
+            'invalid_indices': np.flatnonzero(invalid)[:100].tolist()
+        }), 400
+    
+    service, error = request_service(data)
+    if error is not None:
+        return error
+    
+    try:
+        if 'location' in frame:
+            locations = frame['location'].fillna(service.default_location).astype(str)
+        else:
+            locations = pd.Series(service.default_location, index=frame.index)
+        codes, names = pd.factorize(locations)
+        location_features = np.vstack([service.location_features(name) for name in names])[codes]
+        
+        columns = service.predict_batch(
+            roof_area, np.floor(household_size), location_features, locations.to_numpy()
+        )
+        return batch_response(columns, location_features, request.accept_mimetypes)
+    
+    except Exception as e:
+        print(f"Batch prediction error: {e}")
+        return jsonify({
+            'error': 'Prediction failed',
+            'message': 'An error occurred while making the predictions',
+            'details': str(e)
+        }), 500
+
+@app.route('/predict/sensitivity', methods=['POST'])
+@admitted('sensitivity')
+def predict_sensitivity():
+    """Prediction plus d output / d input for every output and input feature"""
+    if prediction_service is None:
+        return jsonify({
+            'error': 'ML service not available',
+            'message': 'The machine learning models could not be loaded'
+        }), 500
+    
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({
+            'error': 'Invalid request',
+            'message': 'Request body must be valid JSON'
+        }), 400
+    
+    inputs, error = parse_household_input(data)
+    if error is not None:
+        return error
+    roof_area, household_size, location = inputs
+    
+    service, error = request_service(data)
+    if error is not None:
+        return error
+    location = location or service.default_location
+    
+    try:
+        result = service.predict_sensitivity(roof_area, household_size, location)
+        result['metadata'] = {
+            'input_parameters': {
+                'roof_area': roof_area,
+                'household_size': household_size,
+                'location': location,
+                'district': districts.resolve(data.get('district')) if districts else None
+            },
+            **service.serving_info(location)
+        }
+        return json_response(result)
+    
+    except Exception as e:
+        print(f"Sensitivity error: {e}")
+        return jsonify({
+            'error': 'Sensitivity analysis failed',
+            'message': 'An error occurred while computing gradients',
+            'details': str(e)
+        }), 500
+
+@app.route('/optimize', methods=['POST'])
+@admitted('optimize')
+def optimize():
+    """Lowest cost-per-captured-liter structure design"""
+    if prediction_service is None:
+        return jsonify({
+            'error': 'ML service not available',
+            'message': 'The machine learning models could not be loaded'
+        }), 500
+    
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({
+            'error': 'Invalid request',
+            'message': 'Request body must be valid JSON'
+        }), 400
+    
+    inputs, error = parse_household_input(data)
+    if error is not None:
+        return error
+    roof_area, household_size, location = inputs
+    
+    service, error = request_service(data)
+    if error is not None:
+        return error
+    location = location or service.default_location
+    
+    try:
+        max_footprint = data.get('max_footprint')
+        max_footprint = float(max_footprint) if max_footprint is not None else None
+    except (ValueError, TypeError):
+        return jsonify({
+            'error': 'Invalid max_footprint',
+            'message': 'max_footprint must be a number of square meters'
+        }), 400
+    
+    try:
+        result = structure_optimizer.optimize(
+            roof_area, household_size,
+            service.get_location_info(location),
+            location=location,
+            max_footprint=max_footprint,
+            rainfall=service.rainfall
+        )
+        return json_response(result)
+    
+    except Exception as e:
+        print(f"Optimization error: {e}")
+        return jsonify({
+            'error': 'Optimization failed',
+            'message': 'An error occurred while optimizing the structure',
+            'details': str(e)
+        }), 500
+
+@app.route('/sweep', methods=['POST'])
+@admitted('sweep', rows=sweep_cells)
+def sweep():
+    """Scenario sweep over towns x roof areas x household sizes"""
+    if prediction_service is None:
+        return jsonify({
+            'error': 'ML service not available',
+            'message': 'The machine learning models could not be loaded'
+        }), 500
+    
+    data = request.get_json(silent=True) or {}
+    
+    try:
+        roof_start, roof_step, roof_count = sweep_axis(data.get('roof_area', DEFAULT_SWEEP_ROOF_AREA), float)
+        household_start, household_step, household_count = sweep_axis(data.get('household_size', DEFAULT_SWEEP_HOUSEHOLD_SIZE), int)
+        towns = data.get('towns')
+    except (KeyError, ValueError, TypeError, OverflowError) as e:
+        return jsonify({
+            'error': 'Invalid sweep ranges',
+            'message': f'roof_area and household_size must be objects with numeric start, stop and step ({e})'
+        }), 400
+    
+    # Same limits as a single /predict request
+    if roof_start <= 0 or roof_start + roof_step * (roof_count - 1) > 10000:
+        return jsonify({
+            'error': 'Invalid roof_area',
+            'message': 'Roof area must be between 1 and 10000 square meters'
+        }), 400
+    
+    if household_start <= 0 or household_start + household_step * (household_count - 1) > 50:
+        return jsonify({
+            'error': 'Invalid household_size',
+            'message': 'Household size must be between 1 and 50 people'
+        }), 400
+    
+    service, error = request_service(data)
+    if error is not None:
+        return error
+    
+    try:
+        # Checked before any grid array is allocated
+        cells = sweep_town_count(service, towns) * roof_count * household_count
+        if cells == 0:
+            return jsonify({
+                'error': 'Invalid sweep ranges',
+                'message': 'No towns to sweep'
+            }), 400
+        if cells > MAX_SWEEP_CELLS:
+            return jsonify({
+                'error': 'Sweep too large',
+                'message': f'Grid has {cells} cells; at most {MAX_SWEEP_CELLS} are allowed here. Use sweep_engine.py for larger sweeps'
+            }), 400
+        
+        grid = build_grid(
+            service,
+            sweep_values(roof_start, roof_step, roof_count),
+            sweep_values(household_start, household_step, household_count),
+            towns=towns
+        )
+        return jsonify(run_sweep(service, grid))
+    
+    except Exception as e:
+        print(f"Sweep error: {e}")
+        return jsonify({
+            'error': 'Sweep failed',
+            'message': 'An error occurred while running the sweep',
+            'details': str(e)
+        }), 500
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({
         'error': 'Endpoint not found',
         'message': 'The requested endpoint does not exist',
-        'available_endpoints': ['/predict', '/health', '/locations']
+        'available_endpoints': ['/predict', '/predict/batch', '/predict/sensitivity', '/optimize', '/sweep', '/health', '/locations', '/districts', '/admission']
     }), 404
 
 @app.errorhandler(500)
@@ -0,0 +1,204 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from district_registry import load_service
+from sweep_engine import score_chunks
+from response_serializer import flat_columns
+
+# Same validation bounds as /predict in api_server.py
+MAX_ROOF_AREA = 10000
+MAX_HOUSEHOLD_SIZE = 50
+
+
+def iter_input_chunks(path, chunk_size):
+    """Stream a CSV or Parquet household file as DataFrame chunks"""
+    if path.endswith('.parquet'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet input requires pyarrow (pip install pyarrow)")
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+def flatten_predictions(columns, location_features):
+    """Flattened /predict response fields for predict_batch columns"""
+    return pd.DataFrame(flat_columns(columns, location_features))
+
+
+class BulkScorer:
+    """Score a household register in chunks with resumable checkpoints"""
+
+    def __init__(self, service, location_column='town', default_location=None):
+        self.service = service
+        self.location_column = location_column
+        self.default_location = default_location or service.default_location
+
+    def prepare_chunk(self, frame):
+        """Validated inputs and location feature rows for one input chunk"""
+        roof_area = pd.to_numeric(frame['roof_area'], errors='coerce').to_numpy(dtype=float)
+        household_size = pd.to_numeric(frame['household_size'], errors='coerce').to_numpy(dtype=float)
+
+        if self.location_column in frame:
+            locations = frame[self.location_column].fillna(self.default_location).astype(str)
+        else:
+            locations = pd.Series(self.default_location, index=frame.index)
+
+        # Resolve each distinct location once, then gather rows by code
+        codes, uniques = pd.factorize(locations)
+        table = np.vstack([self.service.location_features(name) for name in uniques])
+        location_features = table[codes]
+
+        valid = (
+            (roof_area > 0) & (roof_area <= MAX_ROOF_AREA) &
+            (household_size > 0) & (household_size <= MAX_HOUSEHOLD_SIZE)
+        )
+        return roof_area, np.floor(household_size), location_features, locations.to_numpy(), valid
+
+    def enrich(self, frame, valid, location_features, columns):
+        """Input rows joined with their flattened predictions"""
+        flat = flatten_predictions(columns, location_features[valid])
+        flat.index = frame.index[valid]
+        enriched = frame.join(flat)
+        enriched['error'] = np.where(valid, '', 'Invalid roof_area or household_size')
+        return enriched
+
+    def run(self, input_path, output_path, chunk_size=10000, workers=1,
+            model_dir='models', checkpoint_path=None, resume=False):
+        """Score input_path into output_path; returns a run summary"""
+        checkpoint_path = checkpoint_path or f'{output_path}.checkpoint.json'
+        writer = BulkOutputWriter(output_path)
+        state = {'input': os.path.abspath(input_path), 'chunk_size': chunk_size,
+                 'chunks_done': 0, 'rows_done': 0, 'output_bytes': 0}
+
+        if resume and os.path.exists(checkpoint_path):
+            with open(checkpoint_path, 'r') as f:
+                saved = json.load(f)
+            if saved['input'] != state['input'] or saved['chunk_size'] != chunk_size:
+                raise ValueError("Checkpoint was written for a different input file or chunk size")
+            state = saved
+            writer.truncate(state)
+            print(f"Resuming after {state['chunks_done']} chunks ({state['rows_done']:,} rows)")
+        else:
+            writer.reset()
+
+        start_time = time.time()
+        skip = state['chunks_done']
+
+        def chunks():
+            for chunk_idx, frame in enumerate(iter_input_chunks(input_path, chunk_size)):
+                if chunk_idx < skip:
+                    continue
+                roof_area, household_size, features, locations, valid = self.prepare_chunk(frame)
+                yield (
+                    (chunk_idx, frame, valid, features),
+                    roof_area[valid], household_size[valid], features[valid], locations[valid]
+                )
+
+        for (chunk_idx, frame, valid, features), columns in score_chunks(
+                self.service, chunks(), workers, model_dir):
+            writer.write(chunk_idx, self.enrich(frame, valid, features, columns))
+
+            state['chunks_done'] = chunk_idx + 1
+            state['rows_done'] += len(frame)
+            state['output_bytes'] = writer.tell()
+            with open(checkpoint_path + '.tmp', 'w') as f:
+                json.dump(state, f)
+            os.replace(checkpoint_path + '.tmp', checkpoint_path)
+
+        elapsed = time.time() - start_time
+        return {
+            'rows': state['rows_done'],
+            'chunks': state['chunks_done'],
+            'elapsed_seconds': round(elapsed, 2),
+            'output': output_path,
+            'checkpoint': checkpoint_path
+        }
+
+
+def part_index(name):
+    """Chunk index of a Parquet part file name such as 'part-00012.parquet'"""
+    return int(name[len('part-'):].split('.', 1)[0])
+
+
+class BulkOutputWriter:
+    """CSV file or directory of Parquet parts that can be rolled back to a checkpoint"""
+
+    def __init__(self, path):
+        self.path = path
+        self.format = 'parquet' if path.endswith('.parquet') else 'csv'
+
+    def reset(self):
+        if self.format == 'parquet':
+            os.makedirs(self.path, exist_ok=True)
+            for name in os.listdir(self.path):
+                if name.startswith('part-'):
+                    os.remove(os.path.join(self.path, name))
+        elif os.path.exists(self.path):
+            os.remove(self.path)
+
+    def truncate(self, state):
+        """Drop anything written after the last committed chunk"""
+        if self.format == 'parquet':
+            os.makedirs(self.path, exist_ok=True)
+            for name in os.listdir(self.path):
+                if name.startswith('part-') and part_index(name) >= state['chunks_done']:
+                    os.remove(os.path.join(self.path, name))
+        elif os.path.exists(self.path):
+            with open(self.path, 'r+b') as f:
+                f.truncate(state['output_bytes'])
+
+    def write(self, chunk_idx, frame):
+        if self.format == 'parquet':
+            frame.to_parquet(os.path.join(self.path, f'part-{chunk_idx:05d}.parquet'), index=False)
+        else:
+            write_header = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+            frame.to_csv(self.path, mode='a', header=write_header, index=False)
+
+    def tell(self):
+        if self.format == 'parquet' or not os.path.exists(self.path):
+            return 0
+        return os.path.getsize(self.path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk RWH scoring for household registers')
+    parser.add_argument('input', help='Input .csv or .parquet with roof_area, household_size and town columns')
+    parser.add_argument('output', help='Output .csv file or .parquet directory')
+    parser.add_argument('--location-column', default='town')
+    parser.add_argument('--chunk-size', type=int, default=10000)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--checkpoint', help='Checkpoint file (default: <output>.checkpoint.json)')
+    parser.add_argument('--resume', action='store_true', help='Continue from the last checkpoint')
+    parser.add_argument('--model-dir', default='models')
+    parser.add_argument('--district', help='District from districts.json (overrides --model-dir)')
+    parser.add_argument('--engine', help='Model engine (default: best in metadata.json)')
+    args = parser.parse_args()
+
+    service = load_service(args.district, args.model_dir, engine=args.engine)
+    scorer = BulkScorer(service, location_column=args.location_column)
+
+    print(f"Scoring {args.input} in chunks of {args.chunk_size:,} rows...")
+    summary = scorer.run(
+        args.input, args.output,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        model_dir=service.model_dir,
+        checkpoint_path=args.checkpoint,
+        resume=args.resume
+    )
+
+    print(f"✅ Scored {summary['rows']:,} rows in {summary['elapsed_seconds']}s")
+    print(f"Results saved in '{summary['output']}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import json
+import os
+import re
+
+import numpy as np
+
+COST_DATASET = '../backend/costDataset.js'
+
+# Multipliers applied on top of the rate tables, as in calculateCost() in backend/server.js
+SOIL_COST_MULTIPLIERS = {'Sandy': 1.0, 'Loamy': 1.2, 'Clayey': 1.5, 'Rocky': 2.0, 'Mixed': 1.3}
+DEFAULT_SOIL_MULTIPLIER = 1.2
+SPACE_MULTIPLIERS = [(10, 1.3), (25, 1.1)]  # (available area below, multiplier) in sq meters
+
+# Fixed costs and per-unit rates from calculateStorageCost / calculateRechargeCost
+TANK_INSTALLATION_RATE = 0.2
+TANK_ACCESSORIES = 5000
+RECHARGE_ACCESSORIES = {'pit': 5000, 'trench': 5000, 'shaft': 8000}
+FILTER_MEDIA_PER_M3 = {'pit': 800, 'trench': 800, 'shaft': 500}
+STRUCTURE_SHARE = {'pit': 0.5, 'trench': 0.5, 'shaft': 0.6}
+MAINTENANCE_SCALE_CAPACITY = 5000
+
+
+def load_rate_tables(path=COST_DATASET):
+    """The costDataset object from the Node backend as a Python dict
+
+    The object literal is turned into JSON by dropping comments and quoting
+    keys, so the backend file stays the single source of rates.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        source = f.read()
+
+    match = re.search(r'const costDataset\s*=\s*(\{.*?\n\});', source, re.S)
+    if match is None:
+        raise ValueError(f"No costDataset object found in {path}")
+    literal = re.sub(r'//[^\n]*', '', match.group(1))
+    literal = re.sub(r'([{,]\s*)([A-Za-z_]\w*)\s*:', r'\1"\2":', literal)
+    return json.loads(literal)
+
+
+class TierTable:
+    """Rate tiers over one quantity (capacity, depth, ...) as sorted arrays
+
+    A value takes the first tier whose [low, high] range contains it, as the
+    backend's loop does; values outside every range take the fallback tier.
+    """
+
+    def __init__(self, tiers, range_key, rate_key, fallback):
+        ordered = sorted(tiers.items(), key=lambda item: item[1][range_key][1])
+        self.names = [name for name, _ in ordered]
+        self.lows = np.array([spec[range_key][0] for _, spec in ordered], dtype=float)
+        self.highs = np.array([spec[range_key][1] for _, spec in ordered], dtype=float)
+        self.rates = np.array([spec[rate_key] for _, spec in ordered], dtype=float)
+        self.fallback = self.names.index(fallback)
+
+    def lookup(self, values):
+        """Tier index per value"""
+        values = np.asarray(values, dtype=float)
+        idx = np.minimum(np.searchsorted(self.highs, values, side='left'), len(self.highs) - 1)
+        inside = (self.lows[idx] <= values) & (values <= self.highs[idx])
+        return np.where(inside, idx, self.fallback)
+
+    def rate(self, values):
+        return self.rates[self.lookup(values)]
+
+
+class CostEngine:
+    """Itemized costs from the backend rate tables, priced for whole arrays of designs
+
+    Volumes are in liters as elsewhere in ml_training. Recharge structures
+    are priced per cubic meter and storage tanks per liter of capacity.
+    """
+
+    def __init__(self, path=COST_DATASET, tank_material='plastic'):
+        tables = load_rate_tables(path)
+        recharge = tables['rechargeStructures']
+
+        self.tanks = TierTable(tables['storageTanks'][tank_material], 'capacity', 'costPerLiter', 'large')
+        self.recharge = {
+            kind: TierTable(recharge[kind], 'depth', 'costPerCubicMeter', 'medium')
+            for kind in ('pit', 'trench')
+        }
+        self.shaft_rate = float(recharge['shaft']['medium']['costPerMeter'])
+        self.excavation_rate = float(tables['labor']['excavation']['costPerCubicMeter'])
+        self.maintenance = {
+            system: float(sum(item['costPerYear'] for item in items.values()))
+            for system, items in tables['maintenance'].items()
+        }
+
+    def storage_cost(self, capacity):
+        """Tank cost per design, with installation and accessories"""
+        tank = np.asarray(capacity, dtype=float) * self.tanks.rate(capacity)
+        return {
+            'cost': tank,
+            'tank': tank,
+            'installation': tank * TANK_INSTALLATION_RATE,
+            'accessories': np.full(tank.shape, float(TANK_ACCESSORIES))
+        }
+
+    def recharge_cost(self, structure_type, volume, depth):
+        """Recharge structure cost per design, with the backend's breakdown
+
+        structure_type holds 'pit', 'trench' or 'shaft' per design; arrays
+        broadcast against each other.
+        """
+        structure_type, volume, depth = np.broadcast_arrays(
+            np.asarray(structure_type), np.asarray(volume, dtype=float), np.asarray(depth, dtype=float)
+        )
+        cubic_meters = volume / 1000
+        cost = np.zeros(volume.shape)
+        structure = np.zeros(volume.shape)
+        filter_media = np.zeros(volume.shape)
+        accessories = np.zeros(volume.shape)
+
+        for kind in ('pit', 'trench', 'shaft'):
+            rows = structure_type == kind
+            if not rows.any():
+                continue
+            if kind == 'shaft':
+                cost[rows] = depth[rows] * self.shaft_rate
+            else:
+                cost[rows] = cubic_meters[rows] * self.recharge[kind].rate(depth[rows])
+            structure[rows] = cost[rows] * STRUCTURE_SHARE[kind]
+            filter_media[rows] = cubic_meters[rows] * FILTER_MEDIA_PER_M3[kind]
+            accessories[rows] = RECHARGE_ACCESSORIES[kind]
+
+        return {
+            'cost': cost,
+            'excavation': cubic_meters * self.excavation_rate,
+            'structure': structure,
+            'filter_media': filter_media,
+            'accessories': accessories
+        }
+
+    def soil_multiplier(self, soil_type):
+        soil_type = np.asarray(soil_type)
+        multiplier = np.full(soil_type.shape, DEFAULT_SOIL_MULTIPLIER)
+        for soil, value in SOIL_COST_MULTIPLIERS.items():
+            multiplier[soil_type == soil] = value
+        return multiplier
+
+    def space_multiplier(self, space_area):
+        space_area = np.asarray(space_area, dtype=float)
+        multiplier = np.ones(space_area.shape)
+        for limit, value in reversed(SPACE_MULTIPLIERS):
+            multiplier[space_area < limit] = value
+        return multiplier
+
+    def annual_maintenance(self, system, volume):
+        """Yearly upkeep, scaled up for systems larger than 5000 liters"""
+        scale = np.maximum(1, np.asarray(volume, dtype=float) / MAINTENANCE_SCALE_CAPACITY)
+        return self.maintenance[system] * scale
+
+    def price(self, structure_type, volume, depth, soil_type, space_area=None, goal='recharge'):
+        """Total itemized cost and annual maintenance per design as NumPy columns"""
+        if goal == 'storage':
+            items = self.storage_cost(volume)
+        else:
+            items = self.recharge_cost(structure_type, volume, depth)
+
+        total = items['cost'] * self.soil_multiplier(soil_type)
+        if space_area is not None:
+            total = total * self.space_multiplier(space_area)
+
+        columns = {f'cost_{name}': values for name, values in items.items() if name != 'cost'}
+        columns['itemized_cost'] = total
+        columns['annual_maintenance'] = self.annual_maintenance(
+            'storage' if goal == 'storage' else 'recharge', volume
+        )
+        return columns
+
+
+def load_cost_engine(path=COST_DATASET):
+    """CostEngine for the backend rate tables, or None when they are not deployed alongside"""
+    if not os.path.exists(path):
+        print(f"⚠️  {path} not found; itemized costing disabled")
+        return None
+    return CostEngine(path)
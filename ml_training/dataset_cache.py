@@ -0,0 +1,133 @@
+import hashlib
+import inspect
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def dataset_key(input_paths, config):
+    """Cache key over input file contents and generator configuration"""
+    digest = hashlib.sha256()
+    for path in sorted(input_paths):
+        digest.update(os.path.basename(path).encode())
+        digest.update(file_digest(path).encode())
+    digest.update(json.dumps(config, sort_keys=True).encode())
+    return digest.hexdigest()[:20]
+
+
+def generator_inputs(trainer):
+    """Every file that feeds generate_training_data, rainfall series included"""
+    paths = [trainer.groundwater_csv, trainer.soil_csv]
+    data_dir = trainer.rainfall.data_dir
+    if os.path.isdir(data_dir):
+        paths += [os.path.join(data_dir, name) for name in sorted(os.listdir(data_dir)) if name.endswith('.csv')]
+    return paths
+
+
+def generator_config(trainer, num_samples, seed):
+    """Generator parameters; the generator's source is hashed so code edits invalidate entries"""
+    source = inspect.getsource(type(trainer).generate_training_data)
+    return {
+        'num_samples': num_samples,
+        'seed': seed,
+        'default_location': trainer.default_location,
+        'average_rainfall': trainer.average_rainfall,
+        'generator': hashlib.sha256(source.encode()).hexdigest()[:16]
+    }
+
+
+class DatasetCache:
+    """Generated training sets stored as one .npy file per column
+
+    Numeric columns are saved as-is and text columns as fixed-width unicode,
+    so every column can be memory-mapped with no parsing on load.
+    """
+
+    def __init__(self, cache_dir='data_cache'):
+        self.cache_dir = cache_dir
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def columns(self, key, mmap=True):
+        """{column: array} for a cached dataset, or None on a miss"""
+        directory = self.path(key)
+        meta_path = os.path.join(directory, 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        mode = 'r' if mmap else None
+        return {
+            name: np.load(os.path.join(directory, f'{i:03d}.npy'), mmap_mode=mode)
+            for i, name in enumerate(meta['columns'])
+        }
+
+    def load(self, key):
+        """Cached dataset as a DataFrame, or None on a miss
+
+        The DataFrame copies every column into memory; use columns() to
+        keep them memory-mapped.
+        """
+        columns = self.columns(key)
+        if columns is None:
+            return None
+        df = pd.DataFrame(columns)
+        for name, values in columns.items():
+            if values.dtype.kind == 'U':
+                df[name] = df[name].astype(object)
+        return df
+
+    def save(self, key, df, config=None):
+        """Write a dataset atomically: into a temp directory, then renamed into place"""
+        directory = self.path(key)
+        tmp_dir = directory + '.tmp'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        for i, name in enumerate(df.columns):
+            values = df[name].to_numpy()
+            if values.dtype == object:
+                values = values.astype(str)
+            np.save(os.path.join(tmp_dir, f'{i:03d}.npy'), values)
+
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+            json.dump({'columns': list(df.columns), 'rows': len(df), 'config': config}, f, indent=2)
+
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp_dir, directory)
+
+
+def load_training_data(trainer, num_samples, seed, cache_dir='data_cache'):
+    """Cached training set for these inputs and settings, generating it on a miss
+
+    Returns {column: memory-mapped array}, which SimpleRWHTrainer.train_models
+    accepts in place of a DataFrame, so only the slices it uses are read.
+    """
+    cache = DatasetCache(cache_dir)
+    config = generator_config(trainer, num_samples, seed)
+    key = dataset_key(generator_inputs(trainer), config)
+
+    columns = cache.columns(key)
+    if columns is not None:
+        print(f"Loaded cached training data: {len(next(iter(columns.values())))} samples ({key})")
+        return columns
+
+    gw_df, soil_df = trainer.load_and_process_data()
+    df = trainer.generate_training_data(gw_df, soil_df, num_samples=num_samples, seed=seed)
+    cache.save(key, df, config)
+    print(f"Training data cached: {len(df)} samples ({key})")
+    return cache.columns(key)
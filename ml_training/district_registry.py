@@ -0,0 +1,164 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+
+DISTRICTS_FILE = '../districts.json'
+
+# Settings used when there is no districts file: the original Erode deployment
+ERODE = {
+    'model_dir': 'models',
+    'groundwater_csv': '../Station Ground Water Level Information (1).csv',
+    'soil_csv': '../erode_soil_dataset.csv',
+    'rainfall_dir': '../rainfall',
+    'default_location': 'Erode',
+    'average_rainfall': 775
+}
+
+REQUIRED_SETTINGS = ['groundwater_csv', 'soil_csv']
+
+
+def load_districts(path=DISTRICTS_FILE):
+    """{district: settings} from the districts file, or just Erode without one
+
+    Each entry needs groundwater_csv and soil_csv. model_dir defaults to
+    models/<district>, default_location to the district name, and
+    default_location_info (used for unmatched locations) to the average of
+    the district's own groundwater and soil data.
+    """
+    if not os.path.exists(path):
+        return {'Erode': dict(ERODE)}
+
+    with open(path, 'r') as f:
+        config = json.load(f)
+
+    districts = {}
+    for name, settings in config.items():
+        missing = [key for key in REQUIRED_SETTINGS if key not in settings]
+        if missing:
+            raise ValueError(f"District '{name}' is missing {', '.join(missing)} in {path}")
+        districts[name] = {
+            'model_dir': f'models/{name.lower()}',
+            'rainfall_dir': ERODE['rainfall_dir'],
+            'default_location': name,
+            'average_rainfall': ERODE['average_rainfall'],
+            'default_location_info': None,
+            **settings
+        }
+    return districts
+
+
+def district_settings(name, path=DISTRICTS_FILE):
+    """Settings for one district (case-insensitive); ValueError if unknown"""
+    districts = load_districts(path)
+    names = {district.lower(): district for district in districts}
+    if str(name).lower() not in names:
+        raise ValueError(f"Unknown district '{name}'; choose from {sorted(districts)}")
+    return districts[names[str(name).lower()]]
+
+
+def load_service(district=None, model_dir='models', **options):
+    """Service for a named district, or for model_dir with the Erode data"""
+    if district is None:
+        from simple_prediction_service import SimplePredictionService
+        return SimplePredictionService(model_dir, **options)
+    registry = DistrictRegistry(**options)
+    return registry.build(registry.resolve(district))
+
+
+def service_options(settings):
+    """SimplePredictionService keyword arguments for a district's location data"""
+    return {key: value for key, value in settings.items() if key != 'model_dir'}
+
+
+class DistrictRegistry:
+    """Prediction services per district, loaded on first use
+
+    At most max_loaded districts are held in memory; the least recently used
+    one that is not pinned is evicted to make room. Pinned districts count
+    against the bound. Safe to share between request threads.
+    """
+
+    def __init__(self, path=DISTRICTS_FILE, max_loaded=4, **options):
+        self.districts = load_districts(path)
+        self.default_district = next(iter(self.districts))
+        self.max_loaded = max_loaded
+        self.options = options  # passed to every SimplePredictionService
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._pinned = set()
+        self._names = {name.lower(): name for name in self.districts}
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+    @property
+    def names(self):
+        return list(self.districts)
+
+    def resolve(self, name):
+        """Canonical district name (case-insensitive); KeyError if unknown"""
+        if name is None:
+            return self.default_district
+        return self._names[str(name).strip().lower()]
+
+    def pin(self, name=None):
+        """Load a district (the default one if unnamed) and keep it loaded"""
+        name = self.resolve(name)
+        with self._lock:
+            self._pinned.add(name)
+        return self.get(name)
+
+    def get(self, name=None):
+        """Loaded service for a district, loading (and evicting) as needed"""
+        name = self.resolve(name)
+        with self._lock:
+            service = self._loaded.get(name)
+            if service is not None:
+                self._loaded.move_to_end(name)
+                self.hits += 1
+                return service
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        # One thread loads a district; others asking for it wait, the rest carry on
+        with load_lock:
+            with self._lock:
+                service = self._loaded.get(name)
+                if service is not None:
+                    self._loaded.move_to_end(name)
+                    self.hits += 1
+                    return service
+
+            service = self.build(name)
+
+            with self._lock:
+                self._loaded[name] = service
+                self.loads += 1
+                evictable = [loaded for loaded in self._loaded if loaded not in self._pinned]
+                while len(self._loaded) > self.max_loaded and evictable:
+                    evicted = evictable.pop(0)
+                    del self._loaded[evicted]
+                    self.evictions += 1
+                    print(f"District '{evicted}' evicted from memory")
+        return service
+
+    def build(self, name):
+        """New service for a district, bypassing the cache"""
+        from simple_prediction_service import SimplePredictionService
+
+        settings = self.districts[name]
+        print(f"Loading district '{name}' from '{settings['model_dir']}/'...")
+        return SimplePredictionService(settings['model_dir'], **self.options, **service_options(settings))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'districts': len(self.districts),
+                'loaded': list(self._loaded),
+                'pinned': sorted(self._pinned),
+                'max_loaded': self.max_loaded,
+                'hits': self.hits,
+                'loads': self.loads,
+                'evictions': self.evictions
+            }
@@ -0,0 +1,187 @@
+import json
+import os
+
+import numpy as np
+
+PIPELINE_FILE = 'compiled_pipeline.npz'
+
+ACTIVATIONS = {
+    'linear': lambda z: z,
+    'relu': lambda z: np.maximum(z, 0),
+    'tanh': np.tanh,
+    'sigmoid': lambda z: 1 / (1 + np.exp(-z)),
+    'softmax': lambda z: _softmax(z),
+}
+
+
+# Derivative of each activation applied to a tangent dz of shape (n, features, units),
+# given the pre-activation z and output h of shape (n, units)
+ACTIVATION_TANGENTS = {
+    'linear': lambda z, h, dz: dz,
+    'relu': lambda z, h, dz: dz * (z > 0)[:, None, :],
+    'tanh': lambda z, h, dz: dz * (1 - h ** 2)[:, None, :],
+    'sigmoid': lambda z, h, dz: dz * (h * (1 - h))[:, None, :],
+    'softmax': lambda z, h, dz: h[:, None, :] * (dz - (dz * h[:, None, :]).sum(axis=2, keepdims=True)),
+}
+
+
+def _softmax(z):
+    z = z - z.max(axis=1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=1, keepdims=True)
+
+
+def dense_layers(model):
+    """(kernel, bias, activation) for each Dense layer, skipping Dropout"""
+    layers = []
+    for layer in model.layers:
+        class_name = layer.__class__.__name__
+        if class_name == 'Dropout':
+            continue  # inactive at inference
+        if class_name != 'Dense':
+            raise ValueError(f"Cannot compile layer type {class_name}")
+
+        kernel, bias = layer.get_weights()
+        activation = layer.get_config()['activation']
+        if activation not in ACTIVATIONS:
+            raise ValueError(f"Cannot compile activation {activation}")
+        layers.append((kernel, bias, activation))
+    return layers
+
+
+def fold_scaler(layers, mean, scale):
+    """Fold (x - mean) / scale into the first Dense layer"""
+    kernel, bias, activation = layers[0]
+    folded_kernel = kernel / scale[:, None]
+    folded_bias = bias - (mean / scale) @ kernel
+    return [(folded_kernel, folded_bias, activation)] + list(layers[1:])
+
+
+class CompiledPipeline:
+    """Frozen scaler + MLP heads evaluated with NumPy on raw features
+
+    The first layers of all heads take the same input, so they are fused
+    into one matrix product; deeper layers run per head.
+    """
+
+    def __init__(self, heads, dtype=np.float32):
+        self.heads = {
+            name: [(k.astype(dtype), b.astype(dtype), act) for k, b, act in layers]
+            for name, layers in heads.items()
+        }
+        self.dtype = dtype
+        self.names = list(self.heads)
+
+        first = [self.heads[name][0] for name in self.names]
+        self._first_kernel = np.concatenate([k for k, _, _ in first], axis=1)
+        self._first_bias = np.concatenate([b for _, b, _ in first])
+        self._splits = np.cumsum([k.shape[1] for k, _, _ in first])[:-1]
+
+    def __call__(self, X):
+        """Raw feature matrix (n, 7) -> {head: outputs}"""
+        X = np.asarray(X, dtype=self.dtype)
+        hidden = X @ self._first_kernel + self._first_bias
+        outputs = {}
+        for name, z in zip(self.names, np.split(hidden, self._splits, axis=1)):
+            layers = self.heads[name]
+            h = ACTIVATIONS[layers[0][2]](z)
+            for kernel, bias, activation in layers[1:]:
+                h = ACTIVATIONS[activation](h @ kernel + bias)
+            outputs[name] = h
+        return outputs
+
+    def jacobian(self, X):
+        """Raw features (n, 7) -> ({head: outputs}, {head: d outputs / d features (n, outputs, 7)})
+
+        Forward-mode differentiation through the same fused layers, so one
+        pass gives every output's gradient with respect to every feature.
+        """
+        X = np.asarray(X, dtype=self.dtype)
+        hidden = X @ self._first_kernel + self._first_bias
+        kernels = np.split(self._first_kernel, self._splits, axis=1)
+        outputs = {}
+        jacobians = {}
+        for name, z, kernel in zip(self.names, np.split(hidden, self._splits, axis=1), kernels):
+            layers = self.heads[name]
+            dz = np.broadcast_to(kernel, (len(X),) + kernel.shape)
+            h = ACTIVATIONS[layers[0][2]](z)
+            dh = ACTIVATION_TANGENTS[layers[0][2]](z, h, dz)
+            for kernel, bias, activation in layers[1:]:
+                z = h @ kernel + bias
+                h = ACTIVATIONS[activation](z)
+                dh = ACTIVATION_TANGENTS[activation](z, h, dh @ kernel)
+            outputs[name] = h
+            jacobians[name] = np.transpose(dh, (0, 2, 1))
+        return outputs, jacobians
+
+    def save(self, path):
+        arrays = {}
+        spec = {}
+        for name, layers in self.heads.items():
+            spec[name] = [act for _, _, act in layers]
+            for i, (kernel, bias, _) in enumerate(layers):
+                arrays[f'{name}/kernel{i}'] = kernel
+                arrays[f'{name}/bias{i}'] = bias
+        arrays['spec'] = np.array(json.dumps(spec))
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            spec = json.loads(str(data['spec']))
+            heads = {
+                name: [(data[f'{name}/kernel{i}'], data[f'{name}/bias{i}'], act)
+                       for i, act in enumerate(activations)]
+                for name, activations in spec.items()
+            }
+        return cls(heads)
+
+
+def compile_models(models, scaler):
+    """Build a CompiledPipeline from Keras models and their StandardScaler"""
+    heads = {
+        name: fold_scaler(dense_layers(model), scaler.mean_, scaler.scale_)
+        for name, model in models.items()
+    }
+    return CompiledPipeline(heads)
+
+
+def verify_pipeline(pipeline, models, scaler, num_samples=2000, rtol=1e-4, seed=0):
+    """Max relative error of compiled vs. original outputs; raises if out of tolerance
+
+    Samples are drawn within +/- 3 standard deviations of the training features.
+    """
+    rng = np.random.default_rng(seed)
+    X = scaler.mean_ + rng.uniform(-3, 3, (num_samples, len(scaler.mean_))) * scaler.scale_
+
+    compiled = pipeline(X)
+    report = {}
+    for name, model in models.items():
+        expected = model.predict(scaler.transform(X), verbose=0)
+        actual = compiled[name]
+        tolerance = rtol * max(1.0, float(np.abs(expected).max()))
+        error = float(np.abs(actual - expected).max())
+        report[name] = error / max(1.0, float(np.abs(expected).max()))
+        if error > tolerance:
+            raise AssertionError(f"Compiled {name} differs from original by {error:.6g} (tolerance {tolerance:.6g})")
+    return report
+
+
+def main():
+    from simple_prediction_service import SimplePredictionService
+
+    service = SimplePredictionService(use_compiled=False, engine='keras')
+    print("Compiling models...")
+    pipeline = compile_models(service.models, service.scaler)
+
+    report = verify_pipeline(pipeline, service.models, service.scaler)
+    for name, error in report.items():
+        print(f"  {name}: max relative error {error:.2e}")
+
+    path = os.path.join(service.model_dir, PIPELINE_FILE)
+    pipeline.save(path)
+    print(f"✅ Compiled pipeline saved to '{path}'")
+
+
+if __name__ == "__main__":
+    main()
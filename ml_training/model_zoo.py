@@ -0,0 +1,245 @@
+import time
+
+import joblib
+import numpy as np
+
+
+class KerasBackend:
+    """Dense networks with dropout, as originally trained by SimpleRWHTrainer"""
+    name = 'keras'
+
+    def __init__(self, epochs=50, batch_size=32, patience=5, validation_split=0.1):
+        self.epochs = epochs  # upper bound; early stopping usually ends sooner
+        self.batch_size = batch_size
+        self.patience = patience
+        self.validation_split = validation_split
+
+    def build(self, task, n_features, n_classes=None):
+        from tensorflow import keras
+
+        output = (
+            keras.layers.Dense(n_classes, activation='softmax') if task == 'classifier'
+            else keras.layers.Dense(1, activation='linear')
+        )
+        model = keras.Sequential([
+            keras.layers.Dense(64, activation='relu', input_shape=(n_features,)),
+            keras.layers.Dropout(0.3),
+            keras.layers.Dense(32, activation='relu'),
+            output
+        ])
+        if task == 'classifier':
+            model.compile(optimizer='adam', loss='sparse_categorical_crossentropy', metrics=['accuracy'])
+        else:
+            model.compile(optimizer='adam', loss='mean_squared_error', metrics=['mean_absolute_error'])
+        return model
+
+    def fit(self, model, X, y, callbacks=None, initial_epoch=0):
+        from tensorflow import keras
+
+        callbacks = list(callbacks or [])
+        if self.validation_split:
+            callbacks.append(_restore_best_weights())
+        if self.patience and self.validation_split:
+            callbacks.append(keras.callbacks.EarlyStopping(monitor='val_loss', patience=self.patience))
+        history = model.fit(
+            X, y, epochs=self.epochs, batch_size=self.batch_size, verbose=0,
+            validation_split=self.validation_split, callbacks=callbacks, initial_epoch=initial_epoch
+        )
+        return len(history.epoch)
+
+    def predict(self, model, X, batch_size=4096):
+        return model.predict(X, batch_size=batch_size, verbose=0)
+
+    def gradients(self, model, X, batch_size=4096):
+        """Outputs (n, k) and their Jacobian (n, k, features) from one GradientTape pass per batch"""
+        import tensorflow as tf
+
+        outputs = []
+        jacobians = []
+        for start in range(0, len(X), batch_size):
+            x = tf.convert_to_tensor(X[start:start + batch_size], dtype=tf.float32)
+            with tf.GradientTape() as tape:
+                tape.watch(x)
+                y = model(x, training=False)
+            jacobians.append(tape.batch_jacobian(y, x).numpy())
+            outputs.append(y.numpy())
+        return np.concatenate(outputs), np.concatenate(jacobians)
+
+    def path(self, model_dir, name):
+        return f'{model_dir}/{name}_model.keras'
+
+    def save(self, model, path):
+        model.save(path)
+
+    def load(self, path):
+        from tensorflow import keras
+        return keras.models.load_model(path)
+
+
+def _restore_best_weights():
+    """Keras callback that ends training on the lowest-val_loss weights
+
+    Unlike EarlyStopping(restore_best_weights=True) it restores however
+    training ends: early stopping, the training budget or the epoch limit.
+    """
+    from tensorflow import keras
+
+    class RestoreBestWeights(keras.callbacks.Callback):
+        def on_train_begin(self, logs=None):
+            self.best = np.inf
+            self.best_weights = None
+
+        def on_epoch_end(self, epoch, logs=None):
+            loss = (logs or {}).get('val_loss')
+            if loss is not None and loss < self.best:
+                self.best = loss
+                self.best_weights = self.model.get_weights()
+
+        def on_train_end(self, logs=None):
+            if self.best_weights is not None:
+                self.model.set_weights(self.best_weights)
+
+    return RestoreBestWeights()
+
+
+class SklearnBackend:
+    """Any scikit-learn classifier/regressor pair behind the same interface"""
+    gradient_step = 0.1  # central-difference step, in standard deviations of each scaled feature
+
+    def __init__(self, name, classifier_factory, regressor_factory):
+        self.name = name
+        self.classifier_factory = classifier_factory
+        self.regressor_factory = regressor_factory
+
+    def build(self, task, n_features, n_classes=None):
+        return self.classifier_factory() if task == 'classifier' else self.regressor_factory()
+
+    def fit(self, model, X, y, callbacks=None, initial_epoch=0):
+        model.fit(X, y)  # no epochs to observe
+        return None
+
+    def predict(self, model, X, batch_size=None):
+        if hasattr(model, 'predict_proba'):
+            return model.predict_proba(X)
+        return model.predict(X).reshape(-1, 1)
+
+    def gradients(self, model, X, batch_size=None):
+        """Outputs (n, k) and central-difference Jacobian (n, k, features)
+
+        Every perturbed copy of X is stacked into a single predict call. Tree
+        models are piecewise constant, so the step is wide enough to cross splits.
+        """
+        n, n_features = X.shape
+        offsets = np.eye(n_features) * self.gradient_step
+        stacked = np.concatenate([X] + [X + o for o in offsets] + [X - o for o in offsets])
+        y = self.predict(model, stacked).reshape(2 * n_features + 1, n, -1)
+        jacobian = (y[1:n_features + 1] - y[n_features + 1:]) / (2 * self.gradient_step)
+        return y[0], np.transpose(jacobian, (1, 2, 0))
+
+    def path(self, model_dir, name):
+        return f'{model_dir}/{self.name}/{name}_model.pkl'
+
+    def save(self, model, path):
+        joblib.dump(model, path)
+
+    def load(self, path):
+        return joblib.load(path)
+
+
+def _tree_backend():
+    from sklearn.ensemble import HistGradientBoostingClassifier, HistGradientBoostingRegressor
+    return SklearnBackend(
+        'tree',
+        lambda: HistGradientBoostingClassifier(max_iter=200, early_stopping=True, random_state=42),
+        lambda: HistGradientBoostingRegressor(max_iter=200, early_stopping=True, random_state=42)
+    )
+
+
+def _linear_backend():
+    from sklearn.linear_model import LogisticRegression, Ridge
+    return SklearnBackend(
+        'linear',
+        lambda: LogisticRegression(max_iter=1000),
+        lambda: Ridge(alpha=1.0)
+    )
+
+
+def _mlp_backend():
+    from sklearn.compose import TransformedTargetRegressor
+    from sklearn.neural_network import MLPClassifier, MLPRegressor
+    from sklearn.preprocessing import StandardScaler
+    return SklearnBackend(
+        'mlp',
+        lambda: MLPClassifier(hidden_layer_sizes=(64, 32), max_iter=500, early_stopping=True, random_state=42),
+        lambda: TransformedTargetRegressor(
+            MLPRegressor(hidden_layer_sizes=(64, 32), max_iter=500, early_stopping=True, random_state=42),
+            transformer=StandardScaler()
+        )
+    )
+
+
+BACKEND_FACTORIES = {
+    'keras': KerasBackend,
+    'tree': _tree_backend,
+    'linear': _linear_backend,
+    'mlp': _mlp_backend,
+}
+
+
+# Single-row latency budget for engine selection when none is configured; the
+# compiled Keras pipeline answers in well under this, scikit-learn trees do not
+DEFAULT_LATENCY_SLO_MS = 1.0
+
+
+def get_backend(name, **options):
+    """Backend instance for an engine name; options go to the backend constructor"""
+    if name not in BACKEND_FACTORIES:
+        raise ValueError(f"Unknown engine '{name}'; choose from {sorted(BACKEND_FACTORIES)}")
+    return BACKEND_FACTORIES[name](**options)
+
+
+def measure_latency(predict_fn, X, repeats=50, batch_size=1024):
+    """Median single-row latency and per-row batch latency in milliseconds"""
+    row = X[:1]
+    predict_fn(row)  # warm up
+
+    single = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predict_fn(row)
+        single.append(time.perf_counter() - start)
+
+    batch = X[np.arange(batch_size) % len(X)]
+    start = time.perf_counter()
+    predict_fn(batch)
+    batch_time = time.perf_counter() - start
+
+    return {
+        'single_row_ms': round(float(np.median(single)) * 1000, 4),
+        'batch_per_row_ms': round(batch_time / batch_size * 1000, 6)
+    }
+
+
+def engine_score(metrics):
+    """Single accuracy figure: mean of structure accuracy and mean clipped R²"""
+    r2 = np.mean([max(0.0, value) for value in metrics['r2'].values()])
+    return round(float((metrics['structure_accuracy'] + r2) / 2), 4)
+
+
+def select_engine(engines, latency_slo_ms=None):
+    """Most accurate engine whose single-row latency meets the SLO
+
+    latency_slo_ms defaults to DEFAULT_LATENCY_SLO_MS, so a small accuracy
+    gain never silently costs orders of magnitude in /predict latency; pass
+    float('inf') to rank on accuracy alone. Falls back to the fastest engine
+    when none meets it.
+    """
+    if latency_slo_ms is None:
+        latency_slo_ms = DEFAULT_LATENCY_SLO_MS
+    candidates = {
+        name: info for name, info in engines.items()
+        if info['latency']['single_row_ms'] <= latency_slo_ms
+    }
+    if not candidates:
+        return min(engines, key=lambda name: engines[name]['latency']['single_row_ms'])
+    return max(candidates, key=lambda name: candidates[name]['score'])
@@ -5,20 +5,27 @@ import pandas as pd
 from tensorflow import keras
 import joblib
 import json
+import os
+from model_compiler import CompiledPipeline, PIPELINE_FILE
+from rainfall_engine import RainfallEngine
+from response_serializer import json_response
+from simple_prediction_service import DAILY_DRAW_PER_PERSON
 
 app = Flask(__name__)
 CORS(app)
 
 # Global variables for models
 models = {}
+pipeline = None
 scaler = None
 label_encoders = {}
 gw_data = None
 soil_data = None
+rainfall = RainfallEngine()  # falls back to 775 mm when no series is available
 
 def load_everything():
     """Load models and data"""
-    global models, scaler, label_encoders, gw_data, soil_data
+    global models, pipeline, scaler, label_encoders, gw_data, soil_data
     
     try:
         # Load models
@@ -31,6 +38,10 @@ def load_everything():
         for model_name in metadata['models']:
             models[model_name] = keras.models.load_model(f'models/{model_name}_model.keras')
         
+        # Compiled pipeline (scaler folded into the first layers), if built
+        if os.path.exists(f'models/{PIPELINE_FILE}'):
+            pipeline = CompiledPipeline.load(f'models/{PIPELINE_FILE}')
+        
         # Load data
         gw_df = pd.read_csv('../Station Ground Water Level Information (1).csv', skiprows=1)
         gw_df = gw_df.dropna()
@@ -75,14 +86,14 @@ def get_location_info(location_name):
         }
     
     # Find groundwater data
-    gw_match = gw_data[gw_data['location'].str.contains(location_name, case=False, na=False)]
+    gw_match = gw_data[gw_data['location'].str.contains(location_name, case=False, na=False, regex=False)]
     if gw_match.empty:
         groundwater_depth = gw_data['avg_groundwater_depth'].mean()
     else:
         groundwater_depth = gw_match['avg_groundwater_depth'].iloc[0]
     
     # Find soil data
-    soil_match = soil_data[soil_data['Town'].str.contains(location_name, case=False, na=False)]
+    soil_match = soil_data[soil_data['Town'].str.contains(location_name, case=False, na=False, regex=False)]
     if soil_match.empty:
         soil_match = soil_data[soil_data['Town'] == 'Erode']
         if soil_match.empty:
@@ -160,20 +171,23 @@ def predict():
         ]
         
         X = np.array(features).reshape(1, -1)
-        X_scaled = scaler.transform(X)
+        if pipeline is not None:
+            outputs = pipeline(X)
+        else:
+            X_scaled = scaler.transform(X)
+            outputs = {name: model.predict(X_scaled, verbose=0) for name, model in models.items()}
         
         # Make predictions
         predictions = {}
         
         # Structure type
-        structure_pred = models['structure_type'].predict(X_scaled, verbose=0)
-        structure_idx = np.argmax(structure_pred, axis=1)[0]
+        structure_idx = np.argmax(outputs['structure_type'], axis=1)[0]
         structure_types = label_encoders['structure_type'].classes_
         predictions['structure_type'] = structure_types[structure_idx]
         
         # Other predictions
         for target in ['pit_depth', 'pit_length', 'pit_width', 'volume', 'cost']:
-            pred = models[target].predict(X_scaled, verbose=0)[0][0]
+            pred = outputs[target][0][0]
             predictions[target] = max(0, float(pred))
         
         # Calculate additional metrics
@@ -188,10 +202,14 @@ def predict():
         runoff_coeffs = {'Sandy': 0.15, 'Loamy': 0.25, 'Clayey': 0.35, 'Rocky': 0.45}
         runoff_coeff = runoff_coeffs[dominant_soil]
         
-        annual_harvestable = roof_area * 775 * runoff_coeff  # 775mm rainfall
-        storage_efficiency = min(100, (predictions['volume'] / annual_harvestable) * 100) if annual_harvestable > 0 else 0
+        annual_harvestable, annual_captured, capture_efficiency = rainfall.harvest_metrics(
+            location, roof_area * runoff_coeff, predictions['volume'], household_size * DAILY_DRAW_PER_PERSON
+        )
+        annual_harvestable = float(annual_harvestable)
+        annual_captured = float(annual_captured)
+        storage_efficiency = float(capture_efficiency) * 100
         cost_per_liter = predictions['cost'] / predictions['volume'] if predictions['volume'] > 0 else 0
-        annual_savings = (annual_harvestable / 1000) * 5
+        annual_savings = (annual_captured / 1000) * 5
         payback_years = predictions['cost'] / annual_savings if annual_savings > 0 else float('inf')
         
         # Format response
@@ -211,18 +229,20 @@ def predict():
             },
             'water_harvesting': {
                 'annual_harvestable': round(annual_harvestable, 2),
+                'annual_captured': round(annual_captured, 2),
                 'storage_efficiency': round(storage_efficiency, 1),
                 'annual_savings': round(annual_savings, 2)
             },
             'location_info': {
                 'groundwater_depth': location_info['groundwater_depth'],
+                'annual_rainfall': round(rainfall.annual_rainfall(location), 1),
                 'dominant_soil_type': dominant_soil,
                 'soil_composition': location_info
             },
             'runoff_coefficient': runoff_coeff
         }
         
-        return jsonify(result)
+        return json_response(result)
         
     except Exception as e:
         print(f"Error: {e}")
@@ -0,0 +1,195 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Normalized grids for the capture tables: tank capacity and yearly draw as a
+# fraction of the mean annual inflow into the tank
+CAPACITY_RATIOS = np.concatenate([[0.0], np.logspace(-3, 1, 48)])
+DRAW_RATIOS = np.concatenate([[0.0], np.logspace(-3, 1, 48)])
+
+DAYS_PER_YEAR = 365
+
+RESOLVE_CACHE_SIZE = 1024  # location names whose series key is remembered
+
+
+def simulate_tank(daily_rain, inflow_scale, capacity, daily_draw):
+    """Day-by-day tank balance, vectorized over years and households
+
+    daily_rain is (years, 365) in mm; inflow_scale (roof area x runoff
+    coefficient), capacity (L) and daily_draw (L/day) are arrays over
+    households. Returns (inflow, captured, overflow) in liters per year as
+    (years, households) arrays.
+    """
+    daily_rain = np.asarray(daily_rain, dtype=float)
+    inflow_scale = np.asarray(inflow_scale, dtype=float)
+    capacity = np.asarray(capacity, dtype=float)
+    daily_draw = np.asarray(daily_draw, dtype=float)
+
+    years = daily_rain.shape[0]
+    households = np.broadcast(inflow_scale, capacity, daily_draw).shape
+    storage = np.zeros((years,) + households)
+    captured = np.zeros((years,) + households)
+    overflow = np.zeros((years,) + households)
+
+    for day in range(daily_rain.shape[1]):
+        inflow = daily_rain[:, day, None] * inflow_scale
+        storage += inflow
+        spill = np.maximum(storage - capacity, 0)
+        storage -= spill
+        overflow += spill
+        captured += inflow - spill
+        storage = np.maximum(storage - daily_draw, 0)
+
+    inflow_total = np.broadcast_to(daily_rain.sum(axis=1)[:, None] * inflow_scale, storage.shape)
+    return inflow_total, captured, overflow
+
+
+def interp2d(x_grid, y_grid, table, x, y):
+    """Bilinear interpolation of table[x_grid, y_grid] at points (x, y)"""
+    x = np.clip(np.asarray(x, dtype=float), x_grid[0], x_grid[-1])
+    y = np.clip(np.asarray(y, dtype=float), y_grid[0], y_grid[-1])
+
+    i = np.clip(np.searchsorted(x_grid, x, side='right') - 1, 0, len(x_grid) - 2)
+    j = np.clip(np.searchsorted(y_grid, y, side='right') - 1, 0, len(y_grid) - 2)
+    tx = (x - x_grid[i]) / (x_grid[i + 1] - x_grid[i])
+    ty = (y - y_grid[j]) / (y_grid[j + 1] - y_grid[j])
+
+    return (
+        table[i, j] * (1 - tx) * (1 - ty) +
+        table[i + 1, j] * tx * (1 - ty) +
+        table[i, j + 1] * (1 - tx) * ty +
+        table[i + 1, j + 1] * tx * ty
+    )
+
+
+class RainfallEngine:
+    """Per-location rainfall series with cached tank-capture summaries
+
+    Series live in data_dir as one CSV per location (e.g. ``Erode.csv``) with
+    ``date`` and ``rainfall_mm`` columns, at daily or monthly resolution.
+    Locations without a series fall back to the default location's series,
+    then to a flat ``default_annual_mm`` with no capture simulation.
+    """
+
+    def __init__(self, data_dir='../rainfall', default_location='Erode', default_annual_mm=775):
+        self.data_dir = data_dir
+        self.default_location = default_location
+        self.default_annual_mm = default_annual_mm
+        self._summaries = {}
+        self._resolved = OrderedDict()  # LRU of location name -> series key
+        self._resolved_lock = threading.Lock()
+        self._files = {}
+
+        if os.path.isdir(data_dir):
+            for name in os.listdir(data_dir):
+                if name.lower().endswith('.csv'):
+                    self._files[name[:-4].lower()] = os.path.join(data_dir, name)
+
+        if self._files:
+            print(f"✅ Loaded rainfall series index: {len(self._files)} locations")
+
+    def resolve(self, location):
+        """Series key for a location name, or None if no series applies"""
+        with self._resolved_lock:
+            if location in self._resolved:
+                self._resolved.move_to_end(location)
+                return self._resolved[location]
+
+        name = str(location).lower()
+        key = None
+        if name in self._files:
+            key = name
+        else:
+            for candidate in self._files:
+                if candidate in name or name in candidate:
+                    key = candidate
+                    break
+        if key is None and self.default_location.lower() in self._files:
+            key = self.default_location.lower()
+
+        with self._resolved_lock:
+            self._resolved[location] = key
+            while len(self._resolved) > RESOLVE_CACHE_SIZE:
+                self._resolved.popitem(last=False)
+        return key
+
+    def load_series(self, key):
+        """Daily rainfall in mm as a (years, 365) array"""
+        df = pd.read_csv(self._files[key])
+        dates = pd.to_datetime(df['date'])
+        values = pd.Series(df['rainfall_mm'].astype(float).values, index=dates).sort_index()
+
+        # Monthly totals are spread evenly over the days of the month
+        if len(values) > 1 and values.index.to_series().diff().median() > pd.Timedelta(days=20):
+            monthly = values.groupby(values.index.to_period('M')).sum()
+            days = pd.date_range(monthly.index[0].start_time, monthly.index[-1].end_time.normalize(), freq='D')
+            values = pd.Series(monthly.reindex(days.to_period('M')).values / days.days_in_month, index=days)
+
+        values = values.resample('D').sum(min_count=1)
+        values = values[~((values.index.month == 2) & (values.index.day == 29))]
+
+        years = []
+        for _, year in values.groupby(values.index.year):
+            if year.notna().sum() >= DAYS_PER_YEAR - 5 and len(year) == DAYS_PER_YEAR:
+                years.append(year.fillna(0).values)
+
+        if not years:
+            raise ValueError(f"Rainfall series '{key}' has no complete years")
+        return np.vstack(years)
+
+    def summary(self, location):
+        """Cached rainfall summary and capture table for a location"""
+        key = self.resolve(location)
+        if key is None:
+            return None
+        if key not in self._summaries:
+            daily = self.load_series(key)
+            annual_mm = daily.sum(axis=1).mean()
+
+            # Unit inflow: mean annual inflow into the tank is 1
+            capacity, draw = np.meshgrid(CAPACITY_RATIOS, DRAW_RATIOS / DAYS_PER_YEAR, indexing='ij')
+            inflow, captured, _ = simulate_tank(daily, 1.0 / annual_mm, capacity.ravel(), draw.ravel())
+            efficiency = (captured.sum(axis=0) / inflow.sum(axis=0)).reshape(capacity.shape)
+
+            self._summaries[key] = {
+                'annual_mm': float(annual_mm),
+                'years': int(daily.shape[0]),
+                'capture_efficiency': efficiency
+            }
+        return self._summaries[key]
+
+    def annual_rainfall(self, location):
+        """Mean annual rainfall (mm) for a location"""
+        summary = self.summary(location)
+        return summary['annual_mm'] if summary else self.default_annual_mm
+
+    def harvest_metrics(self, location, inflow_scale, capacity, daily_draw):
+        """Annual inflow, captured volume (L) and capture efficiency (0-1)
+
+        inflow_scale is roof area x runoff coefficient. Without a series the
+        flat annual rainfall is used, all of it counts as captured and
+        efficiency is the capacity ratio, as before series support.
+        """
+        inflow_scale = np.asarray(inflow_scale, dtype=float)
+        capacity = np.asarray(capacity, dtype=float)
+        summary = self.summary(location)
+
+        if summary is None:
+            annual_inflow = inflow_scale * self.default_annual_mm
+            with np.errstate(divide='ignore', invalid='ignore'):
+                efficiency = np.where(annual_inflow > 0, np.minimum(1, capacity / annual_inflow), 0)
+            return annual_inflow, annual_inflow, efficiency
+
+        annual_inflow = inflow_scale * summary['annual_mm']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            capacity_ratio = np.where(annual_inflow > 0, capacity / annual_inflow, 0)
+            draw_ratio = np.where(annual_inflow > 0, daily_draw * DAYS_PER_YEAR / annual_inflow, 0)
+        efficiency = np.where(
+            annual_inflow > 0,
+            interp2d(CAPACITY_RATIOS, DRAW_RATIOS, summary['capture_efficiency'], capacity_ratio, draw_ratio),
+            0
+        )
+        return annual_inflow, annual_inflow * efficiency, efficiency
@@ -0,0 +1,180 @@
+import json
+
+import numpy as np
+from flask import Response
+
+try:
+    import orjson
+except ImportError:  # fall back to the standard library encoder
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON_MIMETYPE = 'application/json'
+NDJSON_MIMETYPE = 'application/x-ndjson'
+MSGPACK_MIMETYPES = ['application/msgpack', 'application/x-msgpack']
+
+# Flattened /predict field -> (predict_batch column, decimals or None)
+FLAT_FIELDS = [
+    ('dimensions_length', 'pit_length', 2),
+    ('dimensions_width', 'pit_width', 2),
+    ('dimensions_depth', 'pit_depth', 2),
+    ('dimensions_volume', 'volume', 2),
+    ('cost_estimation_total_cost', 'cost', 2),
+    ('cost_estimation_cost_per_liter', 'cost_per_liter', 2),
+    ('cost_estimation_payback_period_years', 'payback_years', 1),
+    ('water_harvesting_annual_harvestable', 'annual_harvestable', 2),
+    ('water_harvesting_annual_captured', 'annual_captured', 2),
+    ('water_harvesting_storage_efficiency', 'storage_efficiency', 1),
+    ('water_harvesting_annual_savings', 'annual_savings', 2),
+    ('location_info_annual_rainfall', 'annual_rainfall', 1),
+    ('runoff_coefficient', 'runoff_coefficient', None)
+]
+
+# Present only when the service has the backend rate tables loaded
+ITEMIZED_FIELDS = [
+    ('cost_estimation_itemized_cost', 'itemized_cost', 2),
+    ('cost_estimation_annual_maintenance', 'annual_maintenance', 2)
+]
+
+
+def _default(obj):
+    """NumPy scalars and arrays for the standard library encoder"""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj):
+    """Encode obj (which may hold NumPy values) as JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, default=_default, separators=(',', ':')).encode()
+
+
+def json_response(obj, status=200):
+    """Flask JSON response encoded with the fast encoder"""
+    return Response(dumps(obj), status=status, mimetype=JSON_MIMETYPE)
+
+
+# predict_batch column -> decimals it is rounded to in responses
+COLUMN_DECIMALS = {column: decimals for _, column, decimals in FLAT_FIELDS + ITEMIZED_FIELDS}
+
+
+def round_column(values, decimals):
+    """Column as float64 rounded like /predict's round(float(value), decimals)
+
+    Model heads may return float32, and rounding that directly leaves
+    digits like 0.5899999737739563.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    return np.round(values, decimals) if decimals is not None else values
+
+
+def flat_columns(columns, location_features):
+    """Flattened /predict fields as NumPy columns, rounded like the nested response"""
+    volume = columns['volume']
+    flat = {
+        'feasibility': np.where(volume > 1000, 'Feasible', 'Limited Feasibility'),
+        'recommended_structure': np.asarray(columns['structure_type']).astype(str),
+    }
+    for field, column, decimals in FLAT_FIELDS:
+        values = columns[column]
+        if column == 'payback_years':
+            values = np.minimum(values, 50)
+        flat[field] = round_column(values, decimals)
+    for field, column, decimals in ITEMIZED_FIELDS:
+        if column in columns:
+            flat[field] = round_column(columns[column], decimals)
+
+    flat['location_info_groundwater_depth'] = location_features[:, 0]
+    flat['location_info_dominant_soil_type'] = np.asarray(columns['dominant_soil_type']).astype(str)
+    flat['location_info_soil_composition_sandy'] = location_features[:, 1]
+    flat['location_info_soil_composition_loamy'] = location_features[:, 2]
+    flat['location_info_soil_composition_clayey'] = location_features[:, 3]
+    flat['location_info_soil_composition_rocky'] = location_features[:, 4]
+    return flat
+
+
+def nested_records(columns, location_features):
+    """Nested /predict responses for every row, built from whole columns"""
+    flat = {name: values.tolist() for name, values in flat_columns(columns, location_features).items()}
+    records = []
+    for i in range(len(flat['feasibility'])):
+        record = {
+            'feasibility': flat['feasibility'][i],
+            'recommended_structure': flat['recommended_structure'][i],
+            'dimensions': {
+                'length': flat['dimensions_length'][i],
+                'width': flat['dimensions_width'][i],
+                'depth': flat['dimensions_depth'][i],
+                'volume': flat['dimensions_volume'][i]
+            },
+            'cost_estimation': {
+                'total_cost': flat['cost_estimation_total_cost'][i],
+                'cost_per_liter': flat['cost_estimation_cost_per_liter'][i],
+                'payback_period_years': flat['cost_estimation_payback_period_years'][i]
+            },
+            'water_harvesting': {
+                'annual_harvestable': flat['water_harvesting_annual_harvestable'][i],
+                'annual_captured': flat['water_harvesting_annual_captured'][i],
+                'storage_efficiency': flat['water_harvesting_storage_efficiency'][i],
+                'annual_savings': flat['water_harvesting_annual_savings'][i]
+            },
+            'location_info': {
+                'groundwater_depth': flat['location_info_groundwater_depth'][i],
+                'annual_rainfall': flat['location_info_annual_rainfall'][i],
+                'dominant_soil_type': flat['location_info_dominant_soil_type'][i],
+                'soil_composition': {
+                    'sandy': flat['location_info_soil_composition_sandy'][i],
+                    'loamy': flat['location_info_soil_composition_loamy'][i],
+                    'clayey': flat['location_info_soil_composition_clayey'][i],
+                    'rocky': flat['location_info_soil_composition_rocky'][i]
+                }
+            },
+            'runoff_coefficient': flat['runoff_coefficient'][i]
+        }
+        if 'cost_estimation_itemized_cost' in flat:
+            record['cost_estimation']['itemized_cost'] = flat['cost_estimation_itemized_cost'][i]
+            record['cost_estimation']['annual_maintenance'] = flat['cost_estimation_annual_maintenance'][i]
+        records.append(record)
+    return records
+
+
+def encode_ndjson(flat):
+    """One flat JSON record per line"""
+    names = list(flat)
+    rows = zip(*(flat[name].tolist() for name in names))
+    return b'\n'.join(dumps(dict(zip(names, row))) for row in rows) + b'\n'
+
+
+def encode_msgpack(flat):
+    """Columnar MessagePack document: {field: [values, ...]}"""
+    if msgpack is None:
+        raise RuntimeError("MessagePack responses require msgpack (pip install msgpack)")
+    return msgpack.packb({name: values.tolist() for name, values in flat.items()})
+
+
+def batch_response(columns, location_features, accept):
+    """Encode predict_batch columns in the best format for an Accept header
+
+    accept is a werkzeug MIMEAccept (request.accept_mimetypes). JSON returns
+    nested records like /predict; NDJSON and MessagePack return flat fields.
+    """
+    offered = [JSON_MIMETYPE, NDJSON_MIMETYPE]
+    if msgpack is not None:
+        offered += MSGPACK_MIMETYPES
+    mimetype = accept.best_match(offered, default=JSON_MIMETYPE)
+
+    if mimetype == NDJSON_MIMETYPE:
+        return Response(encode_ndjson(flat_columns(columns, location_features)), mimetype=NDJSON_MIMETYPE)
+    if mimetype in MSGPACK_MIMETYPES:
+        return Response(encode_msgpack(flat_columns(columns, location_features)), mimetype=mimetype)
+
+    records = nested_records(columns, location_features)
+    return json_response({'results': records, 'count': len(records)})
@@ -0,0 +1,213 @@
+import argparse
+import hashlib
+import os
+
+import numpy as np
+
+SURFACE_FILE = 'response_surfaces.npz'
+
+# Input bounds accepted by /predict in api_server.py
+ROOF_AREA_RANGE = (1.0, 10000.0)
+HOUSEHOLD_RANGE = (1, 50)
+
+
+class ResponseSurfaces:
+    """Per-town model output tables over roof area x household size
+
+    Roof area is sampled on a geometric grid and household size at every
+    integer, so a lookup is two index computations and a bilinear blend of
+    four table cells. Towns are matched by their exact location feature row.
+    """
+
+    def __init__(self, towns, location_rows, roof_grid, household_grid, tables,
+                 structure_classes, targets, error_bounds=None, structure_mismatch=None,
+                 model_fingerprint=None):
+        self.towns = list(towns)
+        self.targets = list(targets)
+        self.location_rows = np.asarray(location_rows, dtype=float)
+        self.roof_grid = np.asarray(roof_grid, dtype=float)
+        self.household_grid = np.asarray(household_grid, dtype=float)
+        self.tables = tables
+        self.structure_classes = int(structure_classes)
+        self.error_bounds = error_bounds
+        self.structure_mismatch = structure_mismatch
+        self.model_fingerprint = model_fingerprint  # of the models the tables were built from
+
+        self._log_roof0 = np.log(self.roof_grid[0])
+        self._log_roof_step = np.log(self.roof_grid[1]) - self._log_roof0
+        self._row_index = {tuple(row): i for i, row in enumerate(self.location_rows)}
+
+    def town_index(self, location_features):
+        """Town index per row, -1 where the location has no table"""
+        unique, inverse = np.unique(location_features, axis=0, return_inverse=True)
+        idx = np.array([self._row_index.get(tuple(row), -1) for row in unique])
+        return idx[inverse.ravel()]
+
+    def lookup(self, X):
+        """Interpolated raw outputs for raw feature rows
+
+        Returns (outputs, covered) where outputs follows raw_outputs() and
+        covered marks rows served from a table; other rows are zero.
+        """
+        X = np.asarray(X, dtype=float)
+        roof_area, household_size = X[:, 0], X[:, 1]
+        town = self.town_index(X[:, 2:])
+        covered = (
+            (town >= 0) &
+            (roof_area >= self.roof_grid[0]) & (roof_area <= self.roof_grid[-1]) &
+            (household_size >= self.household_grid[0]) & (household_size <= self.household_grid[-1])
+        )
+
+        # Fractional grid positions, clamped so i + 1 stays in range
+        u = (np.log(np.clip(roof_area, self.roof_grid[0], self.roof_grid[-1])) - self._log_roof0) / self._log_roof_step
+        v = np.clip(household_size, self.household_grid[0], self.household_grid[-1]) - self.household_grid[0]
+        i = np.minimum(np.floor(u).astype(int), len(self.roof_grid) - 2)
+        j = np.minimum(np.floor(v).astype(int), len(self.household_grid) - 2)
+        tu = (u - i)[:, None]
+        tv = (v - j)[:, None]
+        t = np.where(covered, town, 0)
+
+        values = (
+            self.tables[t, i, j] * (1 - tu) * (1 - tv) +
+            self.tables[t, i + 1, j] * tu * (1 - tv) +
+            self.tables[t, i, j + 1] * (1 - tu) * tv +
+            self.tables[t, i + 1, j + 1] * tu * tv
+        )
+        values[~covered] = 0
+        return split_channels(values, self.structure_classes, self.targets), covered
+
+    def error_bound(self, town_idx):
+        """Max absolute interpolation error per output for one town"""
+        bounds = self.error_bounds[town_idx]
+        report = {'structure_probability': float(bounds[:self.structure_classes].max())}
+        for k, name in enumerate(self.targets):
+            report[name] = float(bounds[self.structure_classes + k])
+        report['structure_mismatch_rate'] = float(self.structure_mismatch[town_idx])
+        return report
+
+    def save(self, path):
+        np.savez_compressed(
+            path,
+            towns=np.array(self.towns),
+            location_rows=self.location_rows,
+            roof_grid=self.roof_grid,
+            household_grid=self.household_grid,
+            tables=self.tables,
+            structure_classes=self.structure_classes,
+            targets=np.array(self.targets),
+            error_bounds=self.error_bounds,
+            structure_mismatch=self.structure_mismatch,
+            model_fingerprint=np.array(self.model_fingerprint or '')
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            fingerprint = str(data['model_fingerprint']) if 'model_fingerprint' in data else None
+            return cls(
+                data['towns'].tolist(), data['location_rows'], data['roof_grid'],
+                data['household_grid'], data['tables'], data['structure_classes'],
+                data['targets'].tolist(), data['error_bounds'], data['structure_mismatch'],
+                fingerprint or None
+            )
+
+
+def model_fingerprint(model_dir, backend, model_names):
+    """Hash of the preprocessors and one engine's saved models
+
+    Any retraining or fine-tuning rewrites these files, so a surface whose
+    fingerprint differs was built from other models.
+    """
+    digest = hashlib.sha256(backend.name.encode())
+    paths = [f'{model_dir}/scaler.pkl', f'{model_dir}/label_encoders.pkl']
+    paths += [backend.path(model_dir, name) for name in model_names]
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def stack_channels(outputs, targets):
+    """raw_outputs() dict -> (n, channels) array: class probabilities, then regressions"""
+    return np.column_stack(
+        [outputs['structure_type']] + [outputs[target].reshape(-1, 1) for target in targets]
+    )
+
+
+def split_channels(values, structure_classes, targets):
+    """Inverse of stack_channels"""
+    outputs = {'structure_type': values[:, :structure_classes]}
+    for k, target in enumerate(targets):
+        outputs[target] = values[:, structure_classes + k:structure_classes + k + 1]
+    return outputs
+
+
+def build_surfaces(service, roof_points=256, check_samples=2000, seed=0):
+    """Evaluate the live model on a dense grid for every known town"""
+    towns = service.soil_data['Town'].tolist()
+    location_rows = np.vstack([service.location_features(town) for town in towns])
+    roof_grid = np.geomspace(ROOF_AREA_RANGE[0], ROOF_AREA_RANGE[1], roof_points)
+    household_grid = np.arange(HOUSEHOLD_RANGE[0], HOUSEHOLD_RANGE[1] + 1, dtype=float)
+
+    targets = [name for name in service.metadata['models'] if name != 'structure_type']
+    roof, household = np.meshgrid(roof_grid, household_grid, indexing='ij')
+    tables = []
+    for town, row in zip(towns, location_rows):
+        X = np.column_stack([roof.ravel(), household.ravel(), np.broadcast_to(row, (roof.size, len(row)))])
+        values = stack_channels(service.raw_outputs(X), targets)
+        tables.append(values.reshape(len(roof_grid), len(household_grid), -1))
+        print(f"  Built surface for {town}")
+
+    structure_classes = len(service.label_encoders['structure_type'].classes_)
+    surfaces = ResponseSurfaces(
+        towns, location_rows, roof_grid, household_grid,
+        np.stack(tables).astype(np.float32), structure_classes, targets,
+        model_fingerprint=model_fingerprint(service.model_dir, service.backend, service.metadata['models'])
+    )
+
+    # Error bound: interpolated vs. live model at random off-grid points
+    rng = np.random.default_rng(seed)
+    error_bounds = []
+    mismatch = []
+    for row in location_rows:
+        X = np.column_stack([
+            np.exp(rng.uniform(np.log(ROOF_AREA_RANGE[0]), np.log(ROOF_AREA_RANGE[1]), check_samples)),
+            rng.integers(HOUSEHOLD_RANGE[0], HOUSEHOLD_RANGE[1] + 1, check_samples),
+            np.broadcast_to(row, (check_samples, len(row)))
+        ])
+        live = stack_channels(service.raw_outputs(X), targets)
+        interpolated = stack_channels(surfaces.lookup(X)[0], targets)
+        error_bounds.append(np.abs(interpolated - live).max(axis=0))
+        mismatch.append(np.mean(
+            np.argmax(interpolated[:, :structure_classes], axis=1) != np.argmax(live[:, :structure_classes], axis=1)
+        ))
+
+    surfaces.error_bounds = np.vstack(error_bounds)
+    surfaces.structure_mismatch = np.array(mismatch)
+    return surfaces
+
+
+def main():
+    from simple_prediction_service import SimplePredictionService
+
+    parser = argparse.ArgumentParser(description='Build per-town response-surface tables')
+    parser.add_argument('--roof-points', type=int, default=256)
+    parser.add_argument('--check-samples', type=int, default=2000)
+    parser.add_argument('--model-dir', default='models')
+    args = parser.parse_args()
+
+    service = SimplePredictionService(args.model_dir, use_surfaces=False)
+    print("Building response surfaces...")
+    surfaces = build_surfaces(service, args.roof_points, args.check_samples)
+
+    for i, town in enumerate(surfaces.towns):
+        bound = surfaces.error_bound(i)
+        print(f"  {town}: max cost error {bound['cost']:.2f}, structure mismatch {bound['structure_mismatch_rate']:.2%}")
+
+    path = os.path.join(args.model_dir, SURFACE_FILE)
+    surfaces.save(path)
+    print(f"✅ Response surfaces saved to '{path}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,20 +8,51 @@ from sklearn.metrics import mean_absolute_error, r2_score
 import joblib
 import json
 import os
+import argparse
+from contextlib import nullcontext
+from rainfall_engine import RainfallEngine
+from model_compiler import compile_models, verify_pipeline, PIPELINE_FILE
+from response_surface import SURFACE_FILE
+from model_zoo import BACKEND_FACTORIES, get_backend, measure_latency, engine_score, select_engine
+from dataset_cache import load_training_data
+from simple_prediction_service import scaled_outputs
+from district_registry import ERODE, district_settings
+from training_control import TrainingBudget, BudgetExhausted, CheckpointStore, dataset_fingerprint, save_holdout, load_holdout
+
+HOLDOUT_FILE = 'holdout.npz'
 
 class SimpleRWHTrainer:
-    def __init__(self):
+    def __init__(self, profiler=None, budget_seconds=None, checkpoint_dir=None, resume=False, district=None):
+        district = district or ERODE  # settings from district_registry
         self.scaler = StandardScaler()
+        self.scaler_refit = False  # fitted in this run rather than loaded with deployed models
         self.label_encoders = {}
         self.models = {}
-        self.average_rainfall = 775  # mm per year for Erode
+        self.engines = {}
+        self.engine_metrics = {}
+        self.backend_options = {}  # per-engine constructor options, e.g. {'keras': {'epochs': 10}}
+        self.profiler = profiler
+        self.budget_seconds = budget_seconds  # wall-clock limit shared by all heads
+        self.checkpoint_dir = checkpoint_dir
+        self.resume = resume
+        self.budget = None
+        self.checkpoints = None
+        self.epochs_trained = {}
+        self.holdout = None
+        self.deployed_metadata = None
+        self.model_dir = district['model_dir']
+        self.groundwater_csv = district['groundwater_csv']
+        self.soil_csv = district['soil_csv']
+        self.default_location = district['default_location']
+        self.average_rainfall = district['average_rainfall']  # mm per year, used without a rainfall series
+        self.rainfall = RainfallEngine(district['rainfall_dir'], self.default_location, self.average_rainfall)
         
     def load_and_process_data(self):
         """Load and process the real data"""
         print("Loading data...")
         
         # Load groundwater data
-        gw_df = pd.read_csv('../Station Ground Water Level Information (1).csv', skiprows=1)
+        gw_df = pd.read_csv(self.groundwater_csv, skiprows=1)
         gw_df = gw_df.dropna()
         
         # Extract average groundwater depth
@@ -40,7 +71,7 @@ class SimpleRWHTrainer:
         gw_df['location'] = gw_df['Station'].str.replace(r'(_\d+|Pz|_Pz)', '', regex=True)
         
         # Load soil data
-        soil_df = pd.read_csv('../erode_soil_dataset.csv')
+        soil_df = pd.read_csv(self.soil_csv)
         soil_df = soil_df.dropna(subset=['Town'])  # Only drop rows where Town is NaN
         soil_df = soil_df[soil_df['Town'] != '']  # Remove empty town names
         
@@ -58,9 +89,11 @@ class SimpleRWHTrainer:
         print(f"Loaded {len(gw_df)} groundwater stations and {len(soil_df)} soil locations")
         return gw_df, soil_df
     
-    def generate_training_data(self, gw_df, soil_df, num_samples=1000):
-        """Generate synthetic training data"""
+    def generate_training_data(self, gw_df, soil_df, num_samples=1000, seed=None):
+        """Generate synthetic training data; a seed makes it reproducible"""
         print(f"Generating {num_samples} training samples...")
+        if seed is not None:
+            np.random.seed(seed)
         
         training_data = []
         
@@ -70,10 +103,10 @@ class SimpleRWHTrainer:
             location = gw_row['location']
             gw_depth = gw_row['avg_groundwater_depth']
             
-            # Find matching soil data or use Erode as default
+            # Find matching soil data or use the district's default location
             soil_match = soil_df[soil_df['Town'].str.contains(location, case=False, na=False)]
             if soil_match.empty:
-                soil_match = soil_df[soil_df['Town'] == 'Erode']
+                soil_match = soil_df[soil_df['Town'] == self.default_location]
             soil_data = soil_match.iloc[0]
             
             # Generate input features
@@ -88,7 +121,7 @@ class SimpleRWHTrainer:
             runoff_coeff = runoff_coeffs.get(soil_data['dominant_soil_type'], 0.25)
             
             # Calculate harvestable water
-            harvestable_water = roof_area * self.average_rainfall * runoff_coeff
+            harvestable_water = roof_area * self.rainfall.annual_rainfall(location) * runoff_coeff
             
             # Determine structure type based on groundwater depth
             if gw_depth_var < 3:
@@ -147,8 +180,12 @@ class SimpleRWHTrainer:
         
         return pd.DataFrame(training_data)
     
-    def train_models(self, df):
-        """Train the ML models"""
+    def train_models(self, df, engines=('keras', 'tree', 'linear', 'mlp')):
+        """Train every head with each engine and record accuracy and latency
+        
+        df is a DataFrame or a {column: array} mapping such as the memory-mapped
+        columns from the dataset cache.
+        """
         print("Training models...")
         
         # Prepare features
@@ -157,7 +194,7 @@ class SimpleRWHTrainer:
             'sandy_percentage', 'loamy_percentage', 'clayey_percentage', 'rocky_percentage'
         ]
         
-        X = df[feature_columns].values
+        X = np.column_stack([df[column] for column in feature_columns]).astype(float)
         
         # Encode structure type
         le_structure = LabelEncoder()
@@ -171,100 +208,437 @@ class SimpleRWHTrainer:
         
         # Scale features
         X_train_scaled = self.scaler.fit_transform(X_train)
+        self.scaler_refit = True
         X_test_scaled = self.scaler.transform(X_test)
         
-        # Train structure classifier
-        print("Training structure type classifier...")
-        structure_model = keras.Sequential([
-            keras.layers.Dense(64, activation='relu', input_shape=(len(feature_columns),)),
-            keras.layers.Dropout(0.3),
-            keras.layers.Dense(32, activation='relu'),
-            keras.layers.Dense(3, activation='softmax')  # 3 structure types
-        ])
+        # Regression targets share the same split
+        regression_targets = ['pit_depth', 'pit_length', 'pit_width', 'volume', 'cost']
+        y_targets = {}
+        for target in regression_targets:
+            _, _, y_train, y_test = train_test_split(X, np.asarray(df[target]), test_size=0.2, random_state=42)
+            y_targets[target] = (y_train, y_test)
         
-        structure_model.compile(optimizer='adam', loss='sparse_categorical_crossentropy', metrics=['accuracy'])
-        structure_model.fit(X_train_scaled, y_struct_train, epochs=50, batch_size=32, verbose=0)
+        # Held-out rows saved with the models, so later fine-tunes compare on the same data.
+        # Structure types are kept label-encoded so the .npz loads without pickle.
+        self.holdout = {'X': X_test, 'structure_type': y_struct_test}
+        self.holdout.update({target: y_targets[target][1] for target in regression_targets})
+
+        # Budget and checkpoints cover every head of every engine
+        total_heads = len(engines) * (1 + len(regression_targets))
+        if self.budget_seconds:
+            self.budget = TrainingBudget(self.budget_seconds, total_heads)
+        if self.checkpoint_dir:
+            self.checkpoints = CheckpointStore(self.checkpoint_dir, dataset_fingerprint(df), self.resume)
+
+        for engine in engines:
+            try:
+                self._train_engine(engine, X_train_scaled, X_test, X_test_scaled,
+                                   y_struct_train, y_struct_test, y_targets, le_structure)
+            except BudgetExhausted as e:
+                skipped = list(engines)[list(engines).index(engine):]
+                print(f"⚠️  {e}; skipping engines {', '.join(skipped)}")
+                break
+        if not self.engines:
+            raise RuntimeError("Training budget ran out before any engine finished")
         
+        # Keras heads keep their original role (compiled pipeline, old loaders)
+        self.models = self.engines.get('keras', {})
+
+    def _train_engine(self, engine, X_train_scaled, X_test, X_test_scaled,
+                      y_struct_train, y_struct_test, y_targets, le_structure):
+        """Train and score every head of one engine; raises BudgetExhausted to abandon it"""
+        backend = get_backend(engine, **self.backend_options.get(engine, {}))
+        models = {}
+        metrics = {'mae': {}, 'r2': {}}
+
+        # Train structure classifier
+        print(f"[{engine}] Training structure type classifier...")
+        structure_model = self._train_head(
+            backend, engine, 'structure_type', X_train_scaled, y_struct_train, len(le_structure.classes_)
+        )
+
         # Evaluate
-        struct_pred = structure_model.predict(X_test_scaled, verbose=0)
+        with self._phase(f'{engine}/structure_type/evaluate', len(X_test_scaled)):
+            struct_pred = backend.predict(structure_model, X_test_scaled)
         struct_accuracy = np.mean(np.argmax(struct_pred, axis=1) == y_struct_test)
         print(f"Structure classification accuracy: {struct_accuracy:.3f}")
         
-        self.models['structure_type'] = structure_model
+        models['structure_type'] = structure_model
+        metrics['structure_accuracy'] = round(float(struct_accuracy), 4)
         
         # Train regression models
-        regression_targets = ['pit_depth', 'pit_length', 'pit_width', 'volume', 'cost']
-        
-        for target in regression_targets:
-            print(f"Training {target} model...")
-            
-            y_target = df[target].values
-            _, _, y_train, y_test = train_test_split(X, y_target, test_size=0.2, random_state=42)
-            
-            model = keras.Sequential([
-                keras.layers.Dense(64, activation='relu', input_shape=(len(feature_columns),)),
-                keras.layers.Dropout(0.3),
-                keras.layers.Dense(32, activation='relu'),
-                keras.layers.Dense(1, activation='linear')
-            ])
-            
-            model.compile(optimizer='adam', loss='mean_squared_error', metrics=['mean_absolute_error'])
-            model.fit(X_train_scaled, y_train, epochs=50, batch_size=32, verbose=0)
+        for target, (y_train, y_test) in y_targets.items():
+            print(f"[{engine}] Training {target} model...")
             
+            model = self._train_head(backend, engine, target, X_train_scaled, y_train)
+
             # Evaluate
-            pred = model.predict(X_test_scaled, verbose=0).flatten()
+            with self._phase(f'{engine}/{target}/evaluate', len(X_test_scaled)):
+                pred = backend.predict(model, X_test_scaled).flatten()
             mae = mean_absolute_error(y_test, pred)
             r2 = r2_score(y_test, pred)
             print(f"  MAE: {mae:.2f}, R²: {r2:.3f}")
             
-            self.models[target] = model
+            models[target] = model
+            metrics['mae'][target] = round(float(mae), 4)
+            metrics['r2'][target] = round(float(r2), 4)
+        
+        self.engines[engine] = models
+        metrics['score'] = engine_score(metrics)
+        epochs = {name: self.epochs_trained[f'{engine}/{name}'] for name in models
+                  if f'{engine}/{name}' in self.epochs_trained}
+        if epochs:
+            metrics['epochs'] = epochs
+        metrics['latency'] = measure_latency(self.engine_predict_fn(engine), X_test)
+        self.engine_metrics[engine] = metrics
+        print(f"[{engine}] score {metrics['score']:.3f}, "
+              f"single-row {metrics['latency']['single_row_ms']:.3f} ms, "
+              f"batch {metrics['latency']['batch_per_row_ms']:.5f} ms/row")
+
+    def _train_head(self, backend, engine, name, X_train, y_train, n_classes=None):
+        """Build and fit one head, honouring the budget and resuming from checkpoints"""
+        key = f'{engine}/{name}'
+        store = self.checkpoints
+        head_deadline = self.budget.start_head() if self.budget else None
+
+        if store and store.completed(key):
+            print(f"  Restored {key} from checkpoint")
+            return backend.load(store.model_path(backend, name))
+        if self.budget:
+            self.budget.check(key)  # a scikit-learn fit cannot be stopped once started
+
+        model = None
+        initial_epoch = 0
+        if store and engine == 'keras' and store.partial_epoch(key):
+            initial_epoch = store.partial_epoch(key)
+            model = backend.load(store.partial_path(name))
+            print(f"  Resuming {key} from epoch {initial_epoch}")
+        if model is None:
+            task = 'classifier' if n_classes else 'regressor'
+            model = backend.build(task, X_train.shape[1], n_classes)
+
+        callbacks = self._epoch_callbacks(engine, name) or []
+        if engine == 'keras':
+            if head_deadline is not None:
+                callbacks.append(self.budget.callback(head_deadline))
+            if store:
+                callbacks.append(store.epoch_callback(key, name))
+
+        with self._phase(f'{key}/fit', len(X_train)):
+            epochs = backend.fit(model, X_train, y_train, callbacks=callbacks or None, initial_epoch=initial_epoch)
+        if epochs is not None:
+            self.epochs_trained[key] = initial_epoch + epochs
+            print(f"  Stopped after {initial_epoch + epochs} epochs")
+
+        if store:
+            store.mark_complete(key, backend, name, model)
+        return model
+
+    def _phase(self, name, samples=None):
+        """Profiler phase when profiling, otherwise a no-op"""
+        return self.profiler.phase(name, samples) if self.profiler else nullcontext()
+    
+    def _epoch_callbacks(self, engine, name):
+        """Per-epoch timing callbacks for Keras fits when profiling"""
+        if self.profiler is None or engine != 'keras':
+            return None
+        return [self.profiler.epoch_callback(f'{engine}/{name}')]
+    
+    def engine_predict_fn(self, engine):
+        """Raw-feature predict function an engine would be served with
+        
+        Goes through the same code as SimplePredictionService.model_outputs,
+        so the measured latency is the latency /predict will see.
+        """
+        models = self.engines[engine]
+        if engine == 'keras':
+            return compile_models(models, self.scaler)
+        
+        backend = get_backend(engine)
+        return lambda X: scaled_outputs(backend, models, self.scaler, X)
     
-    def save_models(self):
-        """Save all models and preprocessors"""
-        os.makedirs('models', exist_ok=True)
+    def load_deployed(self, model_dir=None):
+        """Load the deployed heads of every engine, preprocessors and holdout for fine-tuning
+
+        Only the Keras heads are fine-tuned; the other engines are loaded so
+        they can be rescored on the same holdout.
+        """
+        model_dir = model_dir or self.model_dir
+        with open(f'{model_dir}/metadata.json', 'r') as f:
+            self.deployed_metadata = json.load(f)
+
+        self.scaler = joblib.load(f'{model_dir}/scaler.pkl')
+        self.label_encoders = joblib.load(f'{model_dir}/label_encoders.pkl')
+        self.engine_metrics = self.deployed_metadata.get('engines', {})
+
+        self.engines = {}
+        for engine in ['keras'] + [name for name in self.engine_metrics if name != 'keras']:
+            backend = get_backend(engine)
+            paths = {name: backend.path(model_dir, name) for name in self.deployed_metadata['models']}
+            if engine != 'keras' and not all(os.path.exists(path) for path in paths.values()):
+                print(f"⚠️  {engine} models missing from '{model_dir}/'; dropping it from engine selection")
+                self.engine_metrics.pop(engine, None)
+                continue
+            self.engines[engine] = {name: backend.load(path) for name, path in paths.items()}
+        self.models = self.engines['keras']
+
+        self.holdout = load_holdout(f'{model_dir}/{HOLDOUT_FILE}')
+        print(f"Loaded {len(self.models)} deployed models per engine for {sorted(self.engines)} from '{model_dir}/'")
+
+    def fine_tune(self, df, epochs=5, learning_rate=1e-4):
+        """Fine-tune the deployed Keras heads on new samples
+
+        Each tuned head replaces the deployed one only if it has lower error on
+        the holdout (the saved holdout plus 20% of the new samples). The scaler
+        stays frozen, since the deployed weights expect its scaling. Returns
+        True when any head improved.
+        """
+        print("Fine-tuning deployed models...")
+        feature_columns = self.deployed_metadata['feature_columns']
+        structure_encoder = self.label_encoders['structure_type']
+
+        train_rows, test_rows = train_test_split(np.arange(len(df)), test_size=0.2, random_state=42)
+        new_holdout = {'X': df[feature_columns].values[test_rows]}
+        new_holdout.update({name: df[name].values[test_rows] for name in self.models})
+        new_holdout['structure_type'] = structure_encoder.transform(new_holdout['structure_type'])
+        if self.holdout is None:
+            self.holdout = new_holdout  # becomes the fixed holdout for later refreshes
+            holdout = new_holdout
+        else:
+            holdout = {key: np.concatenate([self.holdout[key], new_holdout[key]]) for key in new_holdout}
+
+        X_train = self.scaler.transform(df[feature_columns].values[train_rows])
+        X_eval = self.scaler.transform(holdout['X'])
+        targets = {name: df[name].values[train_rows] for name in self.models}
+        targets['structure_type'] = structure_encoder.transform(targets['structure_type'])
+        expected = holdout
+
+        options = dict(self.backend_options.get('keras', {}), epochs=epochs)
+        backend = get_backend('keras', **options)
+        improved = False
+        for name, deployed in self.models.items():
+            tuned = keras.models.clone_model(deployed)
+            tuned.set_weights(deployed.get_weights())
+            tuned.compile(optimizer=keras.optimizers.Adam(learning_rate), loss=deployed.loss)
+
+            with self._phase(f'keras/{name}/fine_tune', len(X_train)):
+                backend.fit(tuned, X_train, targets[name], callbacks=self._epoch_callbacks('keras', name))
+
+            old_error = self._holdout_error(backend, deployed, name, X_eval, expected[name])
+            new_error = self._holdout_error(backend, tuned, name, X_eval, expected[name])
+            if new_error < old_error:
+                self.models[name] = tuned
+                improved = True
+            verdict = 'kept' if new_error < old_error else 'discarded'
+            print(f"  {name}: holdout error {old_error:.4f} -> {new_error:.4f} ({verdict})")
+
+        if improved:
+            self.engines['keras'] = self.models
+            # Every engine is rescored on the same holdout, so selection compares like with like
+            for engine in self.engines:
+                metrics = self._holdout_metrics(engine, X_eval, expected)
+                if engine == 'keras':
+                    metrics['latency'] = measure_latency(self.engine_predict_fn('keras'), holdout['X'])
+                else:
+                    metrics['latency'] = self.engine_metrics[engine]['latency']
+                self.engine_metrics[engine] = metrics
+        return improved
+
+    def _holdout_error(self, backend, model, name, X_scaled, y):
+        """Classification error rate, or mean absolute error for regression heads"""
+        pred = backend.predict(model, X_scaled)
+        if name == 'structure_type':
+            return float(np.mean(np.argmax(pred, axis=1) != y))
+        return float(mean_absolute_error(y, pred.flatten()))
+
+    def _holdout_metrics(self, engine, X_scaled, expected):
+        """An engine's accuracy metrics recomputed on the holdout"""
+        backend = get_backend(engine)
+        metrics = {'mae': {}, 'r2': {}}
+        for name, model in self.engines[engine].items():
+            pred = backend.predict(model, X_scaled)
+            if name == 'structure_type':
+                accuracy = np.mean(np.argmax(pred, axis=1) == expected[name])
+                metrics['structure_accuracy'] = round(float(accuracy), 4)
+            else:
+                metrics['mae'][name] = round(float(mean_absolute_error(expected[name], pred.flatten())), 4)
+                metrics['r2'][name] = round(float(r2_score(expected[name], pred.flatten())), 4)
+        metrics['score'] = engine_score(metrics)
+        return metrics
+
+    def save_models(self, engines=None):
+        """Save all models and preprocessors; `engines` limits which engines' models are rewritten
+
+        A scaler fitted in this run is written only together with every
+        engine trained on it, and saved artifacts of other engines (which
+        expect the old scaler) are removed.
+        """
+        model_dir = self.model_dir
+        os.makedirs(model_dir, exist_ok=True)
+        if self.scaler_refit and engines is not None and set(engines) != set(self.engines):
+            raise ValueError("Engines trained with a newly fitted scaler must all be saved together")
+        if self.scaler_refit:
+            self._remove_stale_engines(model_dir)
         
-        # Save Keras models
-        for name, model in self.models.items():
-            model.save(f'models/{name}_model.keras')
+        # Save every engine's models
+        for engine, models in self.engines.items():
+            if engines is not None and engine not in engines:
+                continue
+            backend = get_backend(engine)
+            for name, model in models.items():
+                path = backend.path(model_dir, name)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                backend.save(model, path)
         
-        # Save preprocessors
-        joblib.dump(self.scaler, 'models/scaler.pkl')
-        joblib.dump(self.label_encoders, 'models/label_encoders.pkl')
+        # Save preprocessors; a scaler loaded from model_dir is already there
+        if self.scaler_refit:
+            joblib.dump(self.scaler, f'{model_dir}/scaler.pkl')
+        joblib.dump(self.label_encoders, f'{model_dir}/label_encoders.pkl')
+        if self.holdout is not None:
+            save_holdout(f'{model_dir}/{HOLDOUT_FILE}', self.holdout)
         
         # Save metadata
         metadata = {
-            'models': list(self.models.keys()),
+            'models': list(next(iter(self.engines.values())).keys()),
             'feature_columns': ['roof_area', 'household_size', 'groundwater_depth',
                               'sandy_percentage', 'loamy_percentage', 'clayey_percentage', 'rocky_percentage'],
-            'structure_types': self.label_encoders['structure_type'].classes_.tolist()
+            'structure_types': self.label_encoders['structure_type'].classes_.tolist(),
+            'engines': self.engine_metrics,
+            'default_engine': select_engine(self.engine_metrics)
         }
         
-        with open('models/metadata.json', 'w') as f:
+        with open(f'{model_dir}/metadata.json', 'w') as f:
             json.dump(metadata, f, indent=2)
         
+        # Save compiled inference pipeline (scaler folded into first layers)
+        if self.models:
+            pipeline = compile_models(self.models, self.scaler)
+            verify_pipeline(pipeline, self.models, self.scaler)
+            pipeline.save(f'{model_dir}/{PIPELINE_FILE}')
+        
+        # A finished run needs no checkpoint to resume from
+        if self.checkpoints:
+            self.checkpoints.clear()
+        
         print("Models saved successfully!")
 
+    def _remove_stale_engines(self, model_dir):
+        """Delete saved models of engines not retrained with the new scaler"""
+        names = list(next(iter(self.engines.values())).keys())
+        for engine in BACKEND_FACTORIES:
+            if engine in self.engines:
+                continue
+            backend = get_backend(engine)
+            stale = [backend.path(model_dir, name) for name in names if os.path.exists(backend.path(model_dir, name))]
+            for path in stale:
+                os.remove(path)
+            if stale:
+                print(f"⚠️  Removed {engine} models trained with the previous scaler")
+        pipeline_path = f'{model_dir}/{PIPELINE_FILE}'
+        if 'keras' not in self.engines and os.path.exists(pipeline_path):
+            os.remove(pipeline_path)
+        if os.path.exists(f'{model_dir}/{SURFACE_FILE}'):
+            print("⚠️  Response surfaces no longer match the models and will not be served; rebuild them with response_surface.py")
+
+def run_incremental(args):
+    """Monthly refresh: fine-tune the deployed models on new samples"""
+    trainer = SimpleRWHTrainer(district=district_settings(args.district) if args.district else None)
+    trainer.backend_options['keras'] = {'patience': args.patience}
+    trainer.load_deployed()
+    
+    if args.data:
+        new_df = pd.read_csv(args.data)
+    else:
+        gw_df, soil_df = trainer.load_and_process_data()
+        new_df = trainer.generate_training_data(gw_df, soil_df, num_samples=args.num_samples)
+    print(f"Fine-tuning on {len(new_df)} new samples")
+    
+    if not trainer.fine_tune(new_df, epochs=args.fine_tune_epochs):
+        print("\nDeployed models kept: no fine-tuned head beat them on the holdout")
+        return
+    
+    trainer.save_models(engines=['keras'])
+    if os.path.exists(f'{trainer.model_dir}/{SURFACE_FILE}'):
+        print("⚠️  Response surfaces no longer match the models and will not be served; rebuild them with response_surface.py")
+    print("\n✅ Incremental update completed successfully!")
+
 def main():
-    trainer = SimpleRWHTrainer()
+    parser = argparse.ArgumentParser(description='Train the RWH prediction models')
+    parser.add_argument('--num-samples', type=int, default=1500)
+    parser.add_argument('--engines', nargs='+', default=['keras', 'tree', 'linear', 'mlp'])
+    parser.add_argument('--profile', action='store_true', help='Report time, throughput and memory per phase')
+    parser.add_argument('--profile-output', default='training_profile.json')
+    parser.add_argument('--trace-malloc', action='store_true', help='With --profile, also record the Python-heap peak of each phase')
+    parser.add_argument('--budget-minutes', type=float, help='Wall-clock training budget shared by all heads')
+    parser.add_argument('--epochs', type=int, help='Maximum Keras epochs per head (default: 50)')
+    parser.add_argument('--patience', type=int, default=5, help='Epochs without validation improvement before stopping')
+    parser.add_argument('--checkpoint', action='store_true', help='Save finished heads so an interrupted run can be resumed')
+    parser.add_argument('--checkpoint-dir', help='Checkpoint directory; implies --checkpoint (default: checkpoints, or checkpoints/<district>)')
+    parser.add_argument('--resume', action='store_true', help='Continue an interrupted --checkpoint run')
+    parser.add_argument('--incremental', action='store_true', help='Fine-tune the deployed Keras models instead of retraining')
+    parser.add_argument('--fine-tune-epochs', type=int, default=5)
+    parser.add_argument('--district', help='Train the model bundle of a district from districts.json')
+    parser.add_argument('--seed', type=int, default=42, help='Training data generator seed')
+    parser.add_argument('--cache-dir', default='data_cache', help='Generated dataset cache')
+    parser.add_argument('--no-cache', action='store_true', help='Regenerate and write training_data.csv instead')
+    parser.add_argument('--data', help='CSV of new samples for --incremental (default: generate --num-samples)')
+    args = parser.parse_args()
+    
+    if args.profile:
+        from training_profiler import run_profiled
+        
+        report, profiler = run_profiled(args.num_samples, args.engines, args.epochs, trace_malloc=args.trace_malloc, save=True)
+        profiler.print_summary()
+        with open(args.profile_output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Profile saved in '{args.profile_output}'")
+        return
     
-    # Load data
-    gw_df, soil_df = trainer.load_and_process_data()
+    if args.incremental:
+        run_incremental(args)
+        return
     
-    # Generate training data
-    training_df = trainer.generate_training_data(gw_df, soil_df, num_samples=1500)
+    checkpoint_dir = args.checkpoint_dir
+    if checkpoint_dir is None and (args.checkpoint or args.resume):
+        checkpoint_dir = f'checkpoints/{args.district.lower()}' if args.district else 'checkpoints'
     
-    # Save training data
-    training_df.to_csv('training_data.csv', index=False)
-    print(f"Training data saved: {len(training_df)} samples")
+    trainer = SimpleRWHTrainer(
+        budget_seconds=args.budget_minutes * 60 if args.budget_minutes else None,
+        checkpoint_dir=checkpoint_dir,
+        resume=args.resume,
+        district=district_settings(args.district) if args.district else None
+    )
+    keras_options = {'patience': args.patience}
+    if args.epochs:
+        keras_options['epochs'] = args.epochs
+    trainer.backend_options['keras'] = keras_options
+    
+    if not args.no_cache:
+        # Same inputs, settings and seed give the same data, so a resume hits the cache too
+        training_df = load_training_data(trainer, args.num_samples, args.seed, args.cache_dir)
+    elif args.resume and os.path.exists('training_data.csv'):
+        # Resume on the exact data the checkpoint was trained on
+        training_df = pd.read_csv('training_data.csv')
+        print(f"Reusing training data: {len(training_df)} samples")
+    else:
+        # Load data
+        gw_df, soil_df = trainer.load_and_process_data()
+        
+        # Generate training data
+        training_df = trainer.generate_training_data(gw_df, soil_df, num_samples=args.num_samples, seed=args.seed)
+        
+        # Save training data
+        training_df.to_csv('training_data.csv', index=False)
+        print(f"Training data saved: {len(training_df)} samples")
     
     # Train models
-    trainer.train_models(training_df)
+    trainer.train_models(training_df, engines=args.engines)
     
     # Save models
     trainer.save_models()
     
     print("\n✅ Training completed successfully!")
-    print("Models saved in 'models/' directory")
+    print(f"Models saved in '{trainer.model_dir}/' directory")
 
 if __name__ == "__main__":
     main()
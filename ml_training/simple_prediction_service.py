@@ -1,17 +1,74 @@
 import numpy as np
 import pandas as pd
-from tensorflow import keras
 import joblib
 import json
+import os
+import threading
+from collections import OrderedDict
+from rainfall_engine import RainfallEngine
+from model_compiler import CompiledPipeline, PIPELINE_FILE
+from response_surface import ResponseSurfaces, SURFACE_FILE, model_fingerprint
+from model_zoo import get_backend, select_engine
+from cost_engine import load_cost_engine, COST_DATASET
+
+LOCATION_FEATURES = [
+    'groundwater_depth', 'sandy_percentage', 'loamy_percentage',
+    'clayey_percentage', 'rocky_percentage'
+]
+REGRESSION_TARGETS = ['pit_depth', 'pit_length', 'pit_width', 'volume', 'cost']
+INPUT_FEATURES = ['roof_area', 'household_size'] + LOCATION_FEATURES  # model input column order
+SOIL_TYPES = ['Sandy', 'Loamy', 'Clayey', 'Rocky']
+RUNOFF_COEFFS = np.array([0.15, 0.25, 0.35, 0.45])  # indexed like SOIL_TYPES
+DAILY_DRAW_PER_PERSON = 50  # liters drawn from storage per person per day
+LOCATION_CACHE_SIZE = 1024  # location names whose feature rows are kept; names come from clients
+GROUNDWATER_CSV = '../Station Ground Water Level Information (1).csv'
+SOIL_CSV = '../erode_soil_dataset.csv'
+
+# Fallback location info of the original Erode deployment
+ERODE_LOCATION_INFO = {
+    'groundwater_depth': 8.5,
+    'sandy_percentage': 30.0,
+    'loamy_percentage': 40.0,
+    'clayey_percentage': 20.0,
+    'rocky_percentage': 10.0
+}
+
+def scaled_outputs(backend, models, scaler, X, batch_size=4096):
+    """Raw outputs of every head of an uncompiled engine, scaling the features once for all heads"""
+    X_scaled = scaler.transform(X)
+    return {name: backend.predict(model, X_scaled, batch_size=batch_size) for name, model in models.items()}
 
 class SimplePredictionService:
-    def __init__(self, model_dir='models'):
+    def __init__(self, model_dir='models', use_compiled=True, use_surfaces=False,
+                 engine=None, latency_slo_ms=None, groundwater_csv=GROUNDWATER_CSV, soil_csv=SOIL_CSV,
+                 rainfall_dir='../rainfall', default_location='Erode', average_rainfall=775,
+                 default_location_info=ERODE_LOCATION_INFO, cost_dataset=COST_DATASET):
         self.model_dir = model_dir
+        self.use_compiled = use_compiled
+        self.use_surfaces = use_surfaces
+        self.engine = engine
+        self.latency_slo_ms = latency_slo_ms
+        self.backend = None
         self.models = {}
+        self.pipeline = None
+        self.surfaces = None
         self.scaler = None
         self.label_encoders = {}
         self.metadata = {}
-        self.average_rainfall = 775  # mm per year for Erode
+        self.default_location = default_location
+        self.average_rainfall = average_rainfall  # mm per year, used without a rainfall series
+        self.default_location_info = default_location_info  # None: average of the district's data
+        self.rainfall = RainfallEngine(rainfall_dir, default_location, average_rainfall)
+        # District data, so worker processes can rebuild an identical service
+        self.district_options = {
+            'groundwater_csv': groundwater_csv, 'soil_csv': soil_csv, 'rainfall_dir': rainfall_dir,
+            'default_location': default_location, 'average_rainfall': average_rainfall,
+            'default_location_info': default_location_info
+        }
+        self._location_cache = OrderedDict()  # LRU, shared by request threads
+        self._location_lock = threading.Lock()
+        # Itemized costing from the backend rate tables, alongside the learned cost head
+        self.cost_engine = load_cost_engine(cost_dataset)
         
         self.load_models()
         self.load_location_data()
@@ -27,12 +84,35 @@ class SimplePredictionService:
             self.scaler = joblib.load(f'{self.model_dir}/scaler.pkl')
             self.label_encoders = joblib.load(f'{self.model_dir}/label_encoders.pkl')
             
-            # Load Keras models
+            # Pick the most accurate engine within the latency SLO
+            if self.engine is None:
+                engines = self.metadata.get('engines')
+                self.engine = select_engine(engines, self.latency_slo_ms) if engines else 'keras'
+            self.backend = get_backend(self.engine)
+            
+            # Load the engine's models
             for model_name in self.metadata['models']:
-                model_path = f'{self.model_dir}/{model_name}_model.keras'
-                self.models[model_name] = keras.models.load_model(model_path)
+                model_path = self.backend.path(self.model_dir, model_name)
+                self.models[model_name] = self.backend.load(model_path)
+            
+            print(f"✅ Loaded {len(self.models)} {self.engine} models successfully")
+            
+            # Compiled pipeline (scaler folded into the first layers), if built
+            pipeline_path = f'{self.model_dir}/{PIPELINE_FILE}'
+            if self.engine == 'keras' and self.use_compiled and os.path.exists(pipeline_path):
+                self.pipeline = CompiledPipeline.load(pipeline_path)
+                print("✅ Using compiled inference pipeline")
             
-            print(f"✅ Loaded {len(self.models)} models successfully")
+            # Precomputed per-town response surfaces, if built and enabled
+            surface_path = f'{self.model_dir}/{SURFACE_FILE}'
+            if self.use_surfaces and os.path.exists(surface_path):
+                surfaces = ResponseSurfaces.load(surface_path)
+                if surfaces.model_fingerprint != model_fingerprint(self.model_dir, self.backend, self.metadata['models']):
+                    print(f"⚠️  {surface_path} was built from other {self.engine} models; "
+                          "serving the live model. Rebuild it with response_surface.py")
+                else:
+                    self.surfaces = surfaces
+                    print(f"✅ Serving from response surfaces for {len(self.surfaces.towns)} towns")
             
         except Exception as e:
             print(f"❌ Error loading models: {e}")
@@ -42,7 +122,7 @@ class SimplePredictionService:
         """Load groundwater and soil data for location lookup"""
         try:
             # Load groundwater data
-            gw_df = pd.read_csv('../Station Ground Water Level Information (1).csv', skiprows=1)
+            gw_df = pd.read_csv(self.district_options['groundwater_csv'], skiprows=1)
             gw_df = gw_df.dropna()
             
             def extract_avg_depth(range_str):
@@ -60,7 +140,7 @@ class SimplePredictionService:
             gw_df['location'] = gw_df['Station'].str.replace(r'(_\d+|Pz|_Pz)', '', regex=True)
             
             # Load soil data
-            soil_df = pd.read_csv('../erode_soil_dataset.csv')
+            soil_df = pd.read_csv(self.district_options['soil_csv'])
             soil_df = soil_df.dropna(subset=['Town'])
             soil_df = soil_df[soil_df['Town'] != '']
             
@@ -82,17 +162,18 @@ class SimplePredictionService:
             return self.get_default_location_info()
         
         # Find groundwater data
-        gw_match = self.gw_data[self.gw_data['location'].str.contains(location_name, case=False, na=False)]
+        # Names come from clients, so they are matched as text rather than as regular expressions
+        gw_match = self.gw_data[self.gw_data['location'].str.contains(location_name, case=False, na=False, regex=False)]
         if gw_match.empty:
             groundwater_depth = self.gw_data['avg_groundwater_depth'].mean()
         else:
             groundwater_depth = gw_match['avg_groundwater_depth'].iloc[0]
         
         # Find soil data
-        soil_match = self.soil_data[self.soil_data['Town'].str.contains(location_name, case=False, na=False)]
+        soil_match = self.soil_data[self.soil_data['Town'].str.contains(location_name, case=False, na=False, regex=False)]
         if soil_match.empty:
-            # Use Erode as default
-            soil_match = self.soil_data[self.soil_data['Town'] == 'Erode']
+            # Use the district's default location
+            soil_match = self.soil_data[self.soil_data['Town'] == self.default_location]
             if soil_match.empty:
                 return self.get_default_location_info()
         
@@ -107,98 +188,286 @@ class SimplePredictionService:
         }
     
     def get_default_location_info(self):
-        """Default location info for Erode"""
-        return {
-            'groundwater_depth': 8.5,
-            'sandy_percentage': 30.0,
-            'loamy_percentage': 40.0,
-            'clayey_percentage': 20.0,
-            'rocky_percentage': 10.0
+        """Location info for unmatched locations: the district's configured defaults,
+        else its average over the loaded groundwater and soil data"""
+        if self.default_location_info is not None:
+            return dict(self.default_location_info)
+        if self.gw_data is None or self.soil_data is None:
+            raise ValueError(f"No location data or default_location_info for '{self.default_location}'")
+        
+        soil_means = {
+            column: float(pd.to_numeric(self.soil_data[source], errors='coerce').mean())
+            for column, source in [
+                ('sandy_percentage', 'Sandy Soil (%)'),
+                ('loamy_percentage', 'Loamy Soil (%)'),
+                ('clayey_percentage', 'Clayey Soil (%)'),
+                ('rocky_percentage', 'Rocky/Hard Soil (%)')
+            ]
         }
+        return {'groundwater_depth': float(self.gw_data['avg_groundwater_depth'].mean()), **soil_means}
     
-    def predict(self, roof_area, household_size, location='Erode'):
-        """Make predictions for rainwater harvesting"""
+    def location_features(self, location_name):
+        """Location feature row in model column order (LRU-cached per location name)"""
+        with self._location_lock:
+            features = self._location_cache.get(location_name)
+            if features is not None:
+                self._location_cache.move_to_end(location_name)
+                return features
         
-        # Get location information
-        location_info = self.get_location_info(location)
+        location_info = self.get_location_info(location_name)
+        features = np.array([location_info[key] for key in LOCATION_FEATURES], dtype=float)
+        with self._location_lock:
+            self._location_cache[location_name] = features
+            while len(self._location_cache) > LOCATION_CACHE_SIZE:
+                self._location_cache.popitem(last=False)
+        return features
+    
+    def predict_batch(self, roof_area, household_size, location_features, locations=None, batch_size=4096):
+        """Vectorized predictions for many households at once
         
-        # Prepare input features
-        features = [
-            roof_area,
-            household_size,
-            location_info['groundwater_depth'],
-            location_info['sandy_percentage'],
-            location_info['loamy_percentage'],
-            location_info['clayey_percentage'],
-            location_info['rocky_percentage']
-        ]
+        roof_area and household_size are 1-D arrays of length n and
+        location_features is an (n, 5) array (or a single row broadcast to n)
+        in LOCATION_FEATURES order. locations names the rainfall series per
+        row (or one name for all rows, by default the district's default
+        location). Returns a dict of NumPy result columns.
+        """
+        if locations is None:
+            locations = self.default_location
+        roof_area = np.asarray(roof_area, dtype=float).ravel()
+        household_size = np.asarray(household_size, dtype=float).ravel()
+        location_features = np.broadcast_to(
+            np.asarray(location_features, dtype=float), (len(roof_area), len(LOCATION_FEATURES))
+        )
         
-        X = np.array(features).reshape(1, -1)
-        X_scaled = self.scaler.transform(X)
+        if len(roof_area) == 0:
+            columns = {'structure_type': np.empty(0, dtype=object)}
+            columns.update({target: np.empty(0) for target in REGRESSION_TARGETS})
+            columns.update(self.derived_metrics(
+                roof_area, household_size, location_features, locations, columns['volume'], columns['cost']
+            ))
+            columns.update(self.itemized_costs(columns))
+            return columns
         
-        # Make predictions
-        predictions = {}
+        X = np.column_stack([roof_area, household_size, location_features])
+        outputs = self.raw_outputs(X, batch_size)
         
         # Predict structure type
-        structure_pred = self.models['structure_type'].predict(X_scaled, verbose=0)
-        structure_idx = np.argmax(structure_pred, axis=1)[0]
         structure_types = self.label_encoders['structure_type'].classes_
-        predictions['structure_type'] = structure_types[structure_idx]
+        columns = {'structure_type': structure_types[np.argmax(outputs['structure_type'], axis=1)]}
         
         # Predict dimensions and cost
-        for target in ['pit_depth', 'pit_length', 'pit_width', 'volume', 'cost']:
-            pred = self.models[target].predict(X_scaled, verbose=0)[0][0]
-            predictions[target] = max(0, float(pred))  # Ensure non-negative
-        
-        # Calculate additional metrics
-        runoff_coeffs = {'Sandy': 0.15, 'Loamy': 0.25, 'Clayey': 0.35, 'Rocky': 0.45}
-        
-        # Determine dominant soil type
-        soil_percentages = {
-            'Sandy': location_info['sandy_percentage'],
-            'Loamy': location_info['loamy_percentage'],
-            'Clayey': location_info['clayey_percentage'],
-            'Rocky': location_info['rocky_percentage']
+        for target in REGRESSION_TARGETS:
+            columns[target] = np.maximum(0, outputs[target].ravel())  # Ensure non-negative
+        
+        columns.update(self.derived_metrics(
+            roof_area, household_size, location_features, locations, columns['volume'], columns['cost']
+        ))
+        columns.update(self.itemized_costs(columns))
+        return columns
+    
+    def itemized_costs(self, columns):
+        """Rate-table cost and annual maintenance of each predicted design, if tables are loaded"""
+        if self.cost_engine is None:
+            return {}
+        priced = self.cost_engine.price(
+            columns['structure_type'], columns['volume'], columns['pit_depth'], columns['dominant_soil_type']
+        )
+        return {'itemized_cost': priced['itemized_cost'], 'annual_maintenance': priced['annual_maintenance']}
+    
+    def raw_outputs(self, X, batch_size=4096):
+        """Raw output of every model head for an unscaled feature matrix"""
+        if self.surfaces is not None:
+            outputs, covered = self.surfaces.lookup(X)
+            if not covered.all():
+                live = self.model_outputs(X[~covered], batch_size)
+                for name in outputs:
+                    outputs[name][~covered] = live[name]
+            return outputs
+        
+        return self.model_outputs(X, batch_size)
+    
+    def model_outputs(self, X, batch_size=4096):
+        """Raw outputs from the live model (compiled pipeline or the selected engine)"""
+        if self.pipeline is not None:
+            return self.pipeline(X)
+        
+        return scaled_outputs(self.backend, self.models, self.scaler, X, batch_size)
+    
+    def model_gradients(self, X, batch_size=4096):
+        """Raw model outputs and their Jacobians (n, outputs, 7) with respect to unscaled features"""
+        if self.pipeline is not None:
+            return self.pipeline.jacobian(X)
+        
+        X_scaled = self.scaler.transform(X)
+        outputs = {}
+        jacobians = {}
+        for name, model in self.models.items():
+            outputs[name], jacobian = self.backend.gradients(model, X_scaled, batch_size=batch_size)
+            jacobians[name] = jacobian / self.scaler.scale_  # chain rule through (x - mean) / scale
+        return outputs, jacobians
+    
+    def gradient_method(self):
+        if self.pipeline is not None:
+            return 'compiled'
+        return 'autodiff' if self.engine == 'keras' else 'finite_difference'
+    
+    def sensitivity(self, roof_area, household_size, location_features, locations=None, batch_size=4096):
+        """predict_batch columns plus the gradient of each output with respect to each input
+        
+        Returns (columns, gradients), where gradients maps pit_depth, pit_length,
+        pit_width, volume, cost, cost_per_liter and structure_probability (of the
+        recommended type) to (n, 7) arrays in INPUT_FEATURES order. Gradients
+        always come from the live model, even when surfaces serve the values.
+        """
+        columns = self.predict_batch(roof_area, household_size, location_features, locations, batch_size)
+        n = len(columns['volume'])
+        names = REGRESSION_TARGETS + ['cost_per_liter', 'structure_probability']
+        if n == 0:
+            return columns, {name: np.empty((0, len(INPUT_FEATURES))) for name in names}
+        
+        X = np.column_stack([
+            np.asarray(roof_area, dtype=float).ravel(),
+            np.asarray(household_size, dtype=float).ravel(),
+            np.broadcast_to(np.asarray(location_features, dtype=float), (n, len(LOCATION_FEATURES)))
+        ])
+        outputs, jacobians = self.model_gradients(X, batch_size)
+        
+        gradients = {}
+        for target in REGRESSION_TARGETS:
+            # Outputs clamped at zero do not respond to small input changes
+            active = outputs[target].ravel() > 0
+            gradients[target] = np.where(active[:, None], jacobians[target][:, 0, :], 0.0)
+        
+        volume = columns['volume'][:, None]
+        cost = columns['cost'][:, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gradients['cost_per_liter'] = np.where(
+                volume > 0, (gradients['cost'] * volume - cost * gradients['volume']) / volume ** 2, 0.0
+            )
+        
+        chosen = np.argmax(outputs['structure_type'], axis=1)
+        gradients['structure_probability'] = jacobians['structure_type'][np.arange(n), chosen]
+        return columns, gradients
+    
+    def serving_info(self, location_name):
+        """How predictions for a location are served, with the table error bound if any"""
+        if self.surfaces is not None:
+            town_idx = self.surfaces.town_index(self.location_features(location_name)[None, :])[0]
+            if town_idx >= 0:
+                return {
+                    'serving_mode': 'surface',
+                    'interpolation_error_bound': self.surfaces.error_bound(town_idx)
+                }
+        return {
+            'serving_mode': 'compiled' if self.pipeline is not None else 'model',
+            'engine': self.engine
         }
-        dominant_soil = max(soil_percentages, key=soil_percentages.get)
-        runoff_coeff = runoff_coeffs[dominant_soil]
+    
+    def derived_metrics(self, roof_area, household_size, location_features, locations, volume, cost):
+        """Harvest, efficiency and payback columns for predicted volume and cost"""
+        # Dominant soil type (first of the four soil columns on ties)
+        soil_idx = np.argmax(location_features[:, 1:5], axis=1)
+        runoff_coeff = RUNOFF_COEFFS[soil_idx]
+        
+        # Annual harvestable and captured water from each location's rainfall series
+        annual_harvestable = np.zeros(len(roof_area))
+        annual_captured = np.zeros(len(roof_area))
+        capture_efficiency = np.zeros(len(roof_area))
+        annual_rainfall = np.zeros(len(roof_area))
+        codes, names = pd.factorize(pd.Series(np.broadcast_to(locations, roof_area.shape)))
+        for code, name in enumerate(names):
+            rows = codes == code
+            annual_harvestable[rows], annual_captured[rows], capture_efficiency[rows] = self.rainfall.harvest_metrics(
+                name, roof_area[rows] * runoff_coeff[rows], volume[rows],
+                household_size[rows] * DAILY_DRAW_PER_PERSON
+            )
+            annual_rainfall[rows] = self.rainfall.annual_rainfall(name)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Storage efficiency
+            storage_efficiency = capture_efficiency * 100
+            
+            # Cost per liter
+            cost_per_liter = np.where(volume > 0, cost / volume, 0)
+            
+            # Annual savings (assuming 5 INR per 1000L)
+            annual_savings = (annual_captured / 1000) * 5
+            payback_years = np.where(annual_savings > 0, cost / annual_savings, np.inf)
         
-        # Annual harvestable water
-        annual_harvestable = roof_area * self.average_rainfall * runoff_coeff
+        return {
+            'dominant_soil_type': np.asarray(SOIL_TYPES)[soil_idx],
+            'runoff_coefficient': runoff_coeff,
+            'annual_rainfall': annual_rainfall,
+            'annual_harvestable': annual_harvestable,
+            'annual_captured': annual_captured,
+            'storage_efficiency': storage_efficiency,
+            'cost_per_liter': cost_per_liter,
+            'annual_savings': annual_savings,
+            'payback_years': payback_years
+        }
+    
+    def predict(self, roof_area, household_size, location=None):
+        """Make predictions for rainwater harvesting"""
+        if location is None:
+            location = self.default_location
         
-        # Storage efficiency
-        storage_efficiency = min(100, (predictions['volume'] / annual_harvestable) * 100) if annual_harvestable > 0 else 0
+        # Get location information
+        location_info = self.get_location_info(location)
+        features = np.array([location_info[key] for key in LOCATION_FEATURES], dtype=float)
         
-        # Cost per liter
-        cost_per_liter = predictions['cost'] / predictions['volume'] if predictions['volume'] > 0 else 0
+        columns = self.predict_batch([roof_area], [household_size], features, locations=location)
+        return self.format_result(columns, 0, location_info)
+    
+    def predict_sensitivity(self, roof_area, household_size, location=None):
+        """/predict result plus the gradient of each output with respect to each input"""
+        if location is None:
+            location = self.default_location
         
-        # Annual savings (assuming 5 INR per 1000L)
-        annual_savings = (annual_harvestable / 1000) * 5
-        payback_years = predictions['cost'] / annual_savings if annual_savings > 0 else float('inf')
+        location_info = self.get_location_info(location)
+        features = np.array([location_info[key] for key in LOCATION_FEATURES], dtype=float)
         
-        # Format response
+        columns, gradients = self.sensitivity([roof_area], [household_size], features, locations=location)
+        result = self.format_result(columns, 0, location_info)
+        result['sensitivity'] = {
+            'method': self.gradient_method(),
+            'gradients': self.format_gradients(gradients, 0)
+        }
+        return result
+    
+    def format_gradients(self, gradients, i):
+        """{output: {input feature: d output / d feature}} for row i of sensitivity gradients"""
         return {
-            'feasibility': 'Feasible' if predictions['volume'] > 1000 else 'Limited Feasibility',
-            'recommended_structure': predictions['structure_type'],
+            output: {feature: round(float(value), 6) for feature, value in zip(INPUT_FEATURES, values[i])}
+            for output, values in gradients.items()
+        }
+    
+    def format_result(self, columns, i, location_info):
+        """Nested /predict response for row i of predict_batch columns"""
+        volume = float(columns['volume'][i])
+        result = {
+            'feasibility': 'Feasible' if volume > 1000 else 'Limited Feasibility',
+            'recommended_structure': str(columns['structure_type'][i]),
             'dimensions': {
-                'length': round(predictions['pit_length'], 2),
-                'width': round(predictions['pit_width'], 2),
-                'depth': round(predictions['pit_depth'], 2),
-                'volume': round(predictions['volume'], 2)
+                'length': round(float(columns['pit_length'][i]), 2),
+                'width': round(float(columns['pit_width'][i]), 2),
+                'depth': round(float(columns['pit_depth'][i]), 2),
+                'volume': round(volume, 2)
             },
             'cost_estimation': {
-                'total_cost': round(predictions['cost'], 2),
-                'cost_per_liter': round(cost_per_liter, 2),
-                'payback_period_years': round(min(payback_years, 50), 1)
+                'total_cost': round(float(columns['cost'][i]), 2),
+                'cost_per_liter': round(float(columns['cost_per_liter'][i]), 2),
+                'payback_period_years': round(min(float(columns['payback_years'][i]), 50), 1)
             },
             'water_harvesting': {
-                'annual_harvestable': round(annual_harvestable, 2),
-                'storage_efficiency': round(storage_efficiency, 1),
-                'annual_savings': round(annual_savings, 2)
+                'annual_harvestable': round(float(columns['annual_harvestable'][i]), 2),
+                'annual_captured': round(float(columns['annual_captured'][i]), 2),
+                'storage_efficiency': round(float(columns['storage_efficiency'][i]), 1),
+                'annual_savings': round(float(columns['annual_savings'][i]), 2)
             },
             'location_info': {
                 'groundwater_depth': location_info['groundwater_depth'],
-                'dominant_soil_type': dominant_soil,
+                'annual_rainfall': round(float(columns['annual_rainfall'][i]), 1),
+                'dominant_soil_type': str(columns['dominant_soil_type'][i]),
                 'soil_composition': {
                     'sandy': location_info['sandy_percentage'],
                     'loamy': location_info['loamy_percentage'],
@@ -206,8 +475,12 @@ class SimplePredictionService:
                     'rocky': location_info['rocky_percentage']
                 }
             },
-            'runoff_coefficient': runoff_coeff
+            'runoff_coefficient': float(columns['runoff_coefficient'][i])
         }
+        if 'itemized_cost' in columns:
+            result['cost_estimation']['itemized_cost'] = round(float(columns['itemized_cost'][i]), 2)
+            result['cost_estimation']['annual_maintenance'] = round(float(columns['annual_maintenance'][i]), 2)
+        return result
 
 # Test the service
 def test_service():
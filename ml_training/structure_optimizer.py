@@ -0,0 +1,260 @@
+import numpy as np
+
+from cost_engine import RECHARGE_ACCESSORIES
+from rainfall_engine import RainfallEngine
+from simple_prediction_service import RUNOFF_COEFFS, SOIL_TYPES, DAILY_DRAW_PER_PERSON
+
+STRUCTURE_TYPES = ['pit', 'shaft', 'trench']  # same order as the label encoder
+
+# Depth limits (m) and clearance above groundwater (m) per structure type,
+# matching the heuristics in SimpleRWHTrainer.generate_training_data
+DEPTH_LIMITS = {'pit': (0.5, 3.0), 'trench': (0.5, 2.0), 'shaft': (1.0, 8.0)}
+GROUNDWATER_CLEARANCE = {'pit': 1.0, 'trench': 0.5, 'shaft': 2.0}
+
+MIN_VOLUME_PER_PERSON = 500  # liters
+
+# Synthetic cost model used to generate the training data
+BASE_COSTS = {'pit': 800, 'trench': 600, 'shaft': 1200}
+SOIL_MULTIPLIERS = {'Sandy': 1.0, 'Loamy': 1.2, 'Clayey': 1.5, 'Rocky': 2.0}
+
+# Without a rainfall series, yearly runoff is taken to arrive in this many equal
+# storms (Erode sees roughly 40-50 rain days a year). A recharge structure
+# drains between storms, so it captures at most its own volume per storm.
+RAIN_EVENTS_PER_YEAR = 40
+
+# Designs must capture at least this share of the roof's runoff before cost
+# per captured liter decides between them
+TARGET_CAPTURE = 0.8
+
+# Upper bound on (households x candidates) cells evaluated at once
+MAX_CELLS = 2000000
+
+
+def synthetic_cost(type_idx, length, width, depth, volume, soil_idx):
+    """Cost of each candidate under the training-data cost formula
+
+    Each structure also carries the backend's fixed accessories cost, so
+    one large structure is cheaper per liter than the same volume split up.
+    Candidate arrays broadcast against soil_idx, so a (rows, 1) soil_idx
+    against (candidates,) arrays yields a (rows, candidates) cost matrix.
+    """
+    base = np.array([BASE_COSTS[t] for t in STRUCTURE_TYPES])[type_idx]
+    fixed = np.array([RECHARGE_ACCESSORIES[t] for t in STRUCTURE_TYPES])[type_idx]
+    multiplier = np.array([SOIL_MULTIPLIERS[s] for s in SOIL_TYPES])[soil_idx]
+    material_cost = volume * 200
+    labor_cost = volume * base * multiplier
+    return (material_cost + labor_cost) * 1.2 + fixed  # 20% contingency
+
+
+def itemized_cost_fn(engine):
+    """cost_fn pricing candidates from the backend rate tables of a CostEngine
+
+    Same signature and broadcasting as synthetic_cost, so it can be passed
+    to StructureOptimizer in its place. Accessories are included as the
+    per-structure fixed cost.
+    """
+    types = np.asarray(STRUCTURE_TYPES)
+    soils = np.asarray(SOIL_TYPES)
+
+    def cost_fn(type_idx, length, width, depth, volume, soil_idx):
+        items = engine.recharge_cost(types[type_idx], volume, depth)
+        return (items['cost'] + items['accessories']) * engine.soil_multiplier(soils[soil_idx])
+
+    return cost_fn
+
+
+def candidate_grid(step=0.25, depth_step=0.1):
+    """All candidate designs as flat arrays (type_idx, length, width, depth, volume)"""
+    parts = []
+
+    # Pit: square-ish footprint, length >= width
+    sides = np.arange(0.5, 10 + step / 2, step)
+    depths = np.arange(DEPTH_LIMITS['pit'][0], DEPTH_LIMITS['pit'][1] + depth_step / 2, depth_step)
+    length, width, depth = np.meshgrid(sides, sides, depths, indexing='ij')
+    keep = length >= width
+    parts.append(('pit', length[keep], width[keep], depth[keep]))
+
+    # Trench: long and narrow
+    lengths = np.arange(1.0, 50 + 1 / 2, 1.0)
+    widths = np.arange(0.5, 2 + step / 2, step)
+    depths = np.arange(DEPTH_LIMITS['trench'][0], DEPTH_LIMITS['trench'][1] + depth_step / 2, depth_step)
+    length, width, depth = np.meshgrid(lengths, widths, depths, indexing='ij')
+    parts.append(('trench', length.ravel(), width.ravel(), depth.ravel()))
+
+    # Shaft: square section, deep
+    sides = np.arange(0.5, 3 + step / 2, step)
+    depths = np.arange(DEPTH_LIMITS['shaft'][0], DEPTH_LIMITS['shaft'][1] + depth_step / 2, depth_step)
+    side, depth = np.meshgrid(sides, depths, indexing='ij')
+    parts.append(('shaft', side.ravel(), side.ravel(), depth.ravel()))
+
+    type_idx = np.concatenate([np.full(len(p[1]), STRUCTURE_TYPES.index(p[0])) for p in parts])
+    length = np.concatenate([p[1] for p in parts])
+    width = np.concatenate([p[2] for p in parts])
+    depth = np.concatenate([p[3] for p in parts])
+    volume = length * width * depth * 1000  # liters
+
+    return {'type_idx': type_idx, 'length': length, 'width': width, 'depth': depth, 'volume': volume}
+
+
+class StructureOptimizer:
+    """Search structure dimensions for the lowest cost per captured liter
+
+    Only designs capturing at least target_capture of the roof's runoff
+    compete on cost per liter, so the chosen size follows roof area and
+    rainfall. When no feasible design reaches the target, the one capturing
+    the most water wins, with cost per liter breaking ties.
+    """
+
+    def __init__(self, rainfall=None, cost_fn=synthetic_cost, step=0.25, depth_step=0.1,
+                 target_capture=TARGET_CAPTURE, rain_events=RAIN_EVENTS_PER_YEAR):
+        self.rainfall = rainfall or RainfallEngine()
+        self.cost_fn = cost_fn
+        self.target_capture = target_capture
+        self.rain_events = rain_events
+        self.candidates = candidate_grid(step, depth_step)
+        self.clearance = np.array([GROUNDWATER_CLEARANCE[t] for t in STRUCTURE_TYPES])[self.candidates['type_idx']]
+
+    def optimize_batch(self, roof_area, household_size, location_features, locations='Erode', max_footprint=None,
+                       rainfall=None):
+        """Best design per household as a dict of NumPy columns
+
+        location_features is (n, 5) in LOCATION_FEATURES order (or one row);
+        max_footprint optionally limits length x width in sq meters per row.
+        Rows with no feasible candidate get NaN dimensions and no structure.
+        rainfall overrides the optimizer's RainfallEngine, e.g. per district.
+        """
+        rainfall = rainfall or self.rainfall
+        roof_area = np.asarray(roof_area, dtype=float).ravel()
+        household_size = np.asarray(household_size, dtype=float).ravel()
+        n = len(roof_area)
+        location_features = np.broadcast_to(np.asarray(location_features, dtype=float), (n, 5))
+        locations = np.broadcast_to(np.asarray(locations), (n,))
+        max_footprint = np.broadcast_to(
+            np.asarray(np.inf if max_footprint is None else max_footprint, dtype=float), (n,)
+        )
+
+        cand = self.candidates
+        footprint = cand['length'] * cand['width']
+        best = np.full(n, -1)
+        best_objective = np.full(n, np.inf)
+        best_cost = np.full(n, np.nan)
+        best_captured = np.full(n, np.nan)
+        best_efficiency = np.full(n, np.nan)
+
+        rows_per_chunk = max(1, MAX_CELLS // len(cand['volume']))
+        for start in range(0, n, rows_per_chunk):
+            rows = slice(start, min(start + rows_per_chunk, n))
+            gw_depth = location_features[rows, 0:1]
+            soil_idx = np.argmax(location_features[rows, 1:5], axis=1)[:, None]
+            inflow_scale = roof_area[rows, None] * RUNOFF_COEFFS[soil_idx]
+            daily_draw = household_size[rows, None] * DAILY_DRAW_PER_PERSON
+
+            feasible = (
+                (cand['depth'] <= gw_depth - self.clearance) &
+                (cand['volume'] >= household_size[rows, None] * MIN_VOLUME_PER_PERSON) &
+                (footprint <= max_footprint[rows, None])
+            )
+
+            cost = self.cost_fn(cand['type_idx'], cand['length'], cand['width'], cand['depth'],
+                                cand['volume'], soil_idx)
+            cost = np.broadcast_to(cost, feasible.shape)
+
+            captured = np.zeros(feasible.shape)
+            efficiency = np.zeros(feasible.shape)
+            chunk_locations = locations[rows]
+            for name in np.unique(chunk_locations):
+                sel = chunk_locations == name
+                captured[sel], efficiency[sel] = self.capture(
+                    rainfall, name, inflow_scale[sel], cand['volume'], daily_draw[sel]
+                )
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                cost_per_liter = np.where(feasible & (captured > 0), cost / captured, np.inf)
+            # Designs below the capture target only compete when nothing reaches it
+            meets = np.isfinite(cost_per_liter) & (efficiency >= self.target_capture)
+            any_meets = meets.any(axis=1, keepdims=True)
+            best_capture = np.where(np.isfinite(cost_per_liter), captured, -np.inf).max(axis=1, keepdims=True)
+            competing = np.where(any_meets, meets, np.isfinite(cost_per_liter) & (captured >= best_capture))
+            objective = np.where(competing, cost_per_liter, np.inf)
+
+            idx = np.argmin(objective, axis=1)
+            row_idx = np.arange(objective.shape[0])
+            found = np.isfinite(objective[row_idx, idx])
+
+            best[rows] = np.where(found, idx, -1)
+            best_objective[rows] = objective[row_idx, idx]
+            best_cost[rows] = np.where(found, cost[row_idx, idx], np.nan)
+            best_captured[rows] = np.where(found, captured[row_idx, idx], np.nan)
+            best_efficiency[rows] = np.where(found, efficiency[row_idx, idx], np.nan)
+
+        found = best >= 0
+        pick = np.where(found, best, 0)
+
+        def column(name):
+            return np.where(found, cand[name][pick], np.nan)
+
+        return {
+            'structure_type': np.where(found, np.asarray(STRUCTURE_TYPES, dtype=object)[cand['type_idx'][pick]], None),
+            'length': column('length'),
+            'width': column('width'),
+            'depth': column('depth'),
+            'volume': column('volume'),
+            'cost': best_cost,
+            'annual_captured': best_captured,
+            'capture_efficiency': best_efficiency,
+            'cost_per_captured_liter': np.where(found, best_objective, np.nan)
+        }
+
+    def capture(self, rainfall, location, inflow_scale, volume, daily_draw):
+        """Captured liters per year and capture efficiency per candidate
+
+        With a rainfall series this is the engine's daily tank simulation.
+        Without one, the engine counts all runoff as captured whatever the
+        size, so capture is limited to the structure's volume per storm.
+        """
+        annual_inflow, captured, efficiency = rainfall.harvest_metrics(location, inflow_scale, volume, daily_draw)
+        if rainfall.summary(location) is None:
+            captured = np.minimum(annual_inflow, volume * self.rain_events)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                efficiency = np.where(annual_inflow > 0, captured / annual_inflow, 0)
+        return captured, efficiency
+
+    def optimize(self, roof_area, household_size, location_info, location='Erode', max_footprint=None,
+                 rainfall=None):
+        """Best design for one household, formatted for the /optimize endpoint"""
+        features = [
+            location_info['groundwater_depth'],
+            location_info['sandy_percentage'],
+            location_info['loamy_percentage'],
+            location_info['clayey_percentage'],
+            location_info['rocky_percentage']
+        ]
+        result = self.optimize_batch([roof_area], [household_size], features, location, max_footprint, rainfall)
+
+        if result['structure_type'][0] is None:
+            return {
+                'feasible': False,
+                'message': 'No structure fits the groundwater clearance and space constraints'
+            }
+
+        return {
+            'feasible': True,
+            'recommended_structure': result['structure_type'][0],
+            'dimensions': {
+                'length': round(float(result['length'][0]), 2),
+                'width': round(float(result['width'][0]), 2),
+                'depth': round(float(result['depth'][0]), 2),
+                'volume': round(float(result['volume'][0]), 2)
+            },
+            'cost_estimation': {
+                'total_cost': round(float(result['cost'][0]), 2),
+                'cost_per_captured_liter': round(float(result['cost_per_captured_liter'][0]), 4)
+            },
+            'water_harvesting': {
+                'annual_captured': round(float(result['annual_captured'][0]), 2),
+                'storage_efficiency': round(float(result['capture_efficiency'][0]) * 100, 1)
+            },
+            'location_info': {
+                'groundwater_depth': location_info['groundwater_depth']
+            }
+        }
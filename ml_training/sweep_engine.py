@@ -0,0 +1,291 @@
+import argparse
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing as mp
+
+import numpy as np
+import pandas as pd
+
+from simple_prediction_service import SimplePredictionService
+from district_registry import load_service
+from response_serializer import COLUMN_DECIMALS, round_column
+
+# Columns written for every grid cell
+OUTPUT_COLUMNS = [
+    'town', 'roof_area', 'household_size', 'structure_type',
+    'pit_length', 'pit_width', 'pit_depth', 'volume', 'cost',
+    'cost_per_liter', 'annual_harvestable', 'annual_captured', 'storage_efficiency',
+    'annual_savings', 'payback_years'
+]
+
+# Written as well when the service prices designs from the backend rate tables
+ITEMIZED_COLUMNS = ['itemized_cost', 'annual_maintenance']
+
+# Per-process service used by sweep workers
+_worker_service = None
+
+
+def _init_worker(model_dir, engine=None, district_options=None):
+    """Load one prediction service per worker process"""
+    global _worker_service
+    _worker_service = SimplePredictionService(model_dir, engine=engine, **(district_options or {}))
+
+
+def _score_chunk(roof_area, household_size, location_features, locations):
+    """Score one chunk in a worker process"""
+    return _worker_service.predict_batch(roof_area, household_size, location_features, locations)
+
+
+class ScenarioGrid:
+    """Lazy cartesian grid of towns x roof areas x household sizes"""
+
+    def __init__(self, towns, location_features, roof_areas, household_sizes):
+        self.towns = np.asarray(towns)
+        self.location_features = np.asarray(location_features, dtype=float)
+        self.roof_areas = np.asarray(roof_areas, dtype=float)
+        self.household_sizes = np.asarray(household_sizes, dtype=float)
+        self.shape = (len(self.towns), len(self.roof_areas), len(self.household_sizes))
+        self.size = int(np.prod(self.shape))
+
+    def chunks(self, chunk_size):
+        """Yield (town_idx, roof_area, household_size, location_features, towns) per chunk"""
+        for start in range(0, self.size, chunk_size):
+            flat = np.arange(start, min(start + chunk_size, self.size))
+            town_idx, roof_idx, hh_idx = np.unravel_index(flat, self.shape)
+            yield (
+                town_idx,
+                self.roof_areas[roof_idx],
+                self.household_sizes[hh_idx],
+                self.location_features[town_idx],
+                self.towns[town_idx]
+            )
+
+
+class SweepAggregator:
+    """Streaming per-town totals over scored chunks"""
+
+    def __init__(self, towns, structure_types):
+        n = len(towns)
+        self.towns = list(towns)
+        self.structure_types = list(structure_types)
+        self.count = np.zeros(n, dtype=np.int64)
+        self.total_harvestable = np.zeros(n)
+        self.total_captured = np.zeros(n)
+        self.total_volume = np.zeros(n)
+        self.total_cost = np.zeros(n)
+        self.total_itemized_cost = None
+        self.structure_counts = np.zeros((n, len(self.structure_types)), dtype=np.int64)
+
+    def update(self, town_idx, columns):
+        """Fold one scored chunk into the running totals"""
+        n = len(self.towns)
+        self.count += np.bincount(town_idx, minlength=n)
+        self.total_harvestable += np.bincount(town_idx, weights=columns['annual_harvestable'], minlength=n)
+        self.total_captured += np.bincount(town_idx, weights=columns['annual_captured'], minlength=n)
+        self.total_volume += np.bincount(town_idx, weights=columns['volume'], minlength=n)
+        self.total_cost += np.bincount(town_idx, weights=columns['cost'], minlength=n)
+        if 'itemized_cost' in columns:
+            if self.total_itemized_cost is None:
+                self.total_itemized_cost = np.zeros(n)
+            self.total_itemized_cost += np.bincount(town_idx, weights=columns['itemized_cost'], minlength=n)
+
+        struct_idx = np.searchsorted(self.structure_types, columns['structure_type'])
+        np.add.at(self.structure_counts, (town_idx, struct_idx), 1)
+
+    def summary(self):
+        """Per-town and district-wide aggregates as plain JSON types"""
+        towns = []
+        for i, town in enumerate(self.towns):
+            count = int(self.count[i])
+            towns.append({
+                'town': str(town),
+                'cells': count,
+                'total_annual_harvestable': round(float(self.total_harvestable[i]), 2),
+                'total_annual_captured': round(float(self.total_captured[i]), 2),
+                'total_volume': round(float(self.total_volume[i]), 2),
+                'total_cost': round(float(self.total_cost[i]), 2),
+                'mean_cost': round(float(self.total_cost[i] / count), 2) if count else 0,
+                'structure_counts': {
+                    s: int(c) for s, c in zip(self.structure_types, self.structure_counts[i])
+                }
+            })
+            if self.total_itemized_cost is not None:
+                towns[-1]['total_itemized_cost'] = round(float(self.total_itemized_cost[i]), 2)
+
+        summary = {
+            'cells': int(self.count.sum()),
+            'total_annual_harvestable': round(float(self.total_harvestable.sum()), 2),
+            'total_annual_captured': round(float(self.total_captured.sum()), 2),
+            'total_volume': round(float(self.total_volume.sum()), 2),
+            'total_cost': round(float(self.total_cost.sum()), 2),
+            'towns': towns
+        }
+        if self.total_itemized_cost is not None:
+            summary['total_itemized_cost'] = round(float(self.total_itemized_cost.sum()), 2)
+        return summary
+
+
+class ChunkWriter:
+    """Append scored chunks to a CSV or Parquet file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.format = 'parquet' if path.endswith('.parquet') else 'csv'
+        self._parquet_writer = None
+        self._wrote_header = False
+
+        if self.format == 'parquet':
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow)")
+        elif os.path.exists(path):
+            os.remove(path)
+
+    def write(self, frame):
+        if self.format == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            frame.to_csv(self.path, mode='a', header=not self._wrote_header, index=False)
+            self._wrote_header = True
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+
+
+def score_chunks(service, chunks, workers=1, model_dir='models'):
+    """Score (meta, roof_area, household_size, location_features, locations) chunks in order
+
+    Yields (meta, columns) in input order. With workers > 1 chunks are scored
+    in separate processes, each holding its own copy of the models; at most
+    2 * workers chunks are in flight so memory stays bounded.
+    """
+    if workers <= 1:
+        for meta, roof_area, household_size, features, locations in chunks:
+            yield meta, service.predict_batch(roof_area, household_size, features, locations)
+        return
+
+    ctx = mp.get_context('spawn')  # TensorFlow is not fork-safe
+    with ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_worker,
+                             initargs=(model_dir, service.engine, service.district_options)) as pool:
+        pending = deque()
+        for meta, roof_area, household_size, features, locations in chunks:
+            pending.append((meta, pool.submit(_score_chunk, roof_area, household_size, features, locations)))
+            if len(pending) >= 2 * workers:
+                meta_done, future = pending.popleft()
+                yield meta_done, future.result()
+
+        while pending:
+            meta_done, future = pending.popleft()
+            yield meta_done, future.result()
+
+
+def output_column(columns, name):
+    """Per-cell output column, with numbers rounded as in /predict responses"""
+    if name in COLUMN_DECIMALS:
+        return round_column(columns[name], COLUMN_DECIMALS[name])
+    return columns[name]
+
+
+def build_grid(service, roof_areas, household_sizes, towns=None):
+    """Grid over the given towns (default: every town in the soil dataset)"""
+    if towns is None:
+        if service.soil_data is None:
+            raise ValueError("No soil data loaded; pass towns explicitly")
+        towns = service.soil_data['Town'].tolist()
+
+    location_features = np.vstack([service.location_features(town) for town in towns])
+    return ScenarioGrid(towns, location_features, roof_areas, household_sizes)
+
+
+def run_sweep(service, grid, output_path=None, chunk_size=50000, workers=1, model_dir='models'):
+    """Score every grid cell in chunks and return streaming aggregates"""
+    aggregator = SweepAggregator(grid.towns, service.label_encoders['structure_type'].classes_)
+    writer = ChunkWriter(output_path) if output_path else None
+    start_time = time.time()
+
+    def consume(town_idx, roof_area, household_size, columns):
+        aggregator.update(town_idx, columns)
+        if writer is not None:
+            frame = pd.DataFrame({
+                'town': grid.towns[town_idx],
+                'roof_area': roof_area,
+                'household_size': household_size.astype(int),
+                **{name: output_column(columns, name) for name in OUTPUT_COLUMNS[3:]},
+                **{name: output_column(columns, name) for name in ITEMIZED_COLUMNS if name in columns}
+            })
+            writer.write(frame)
+
+    try:
+        chunks = (
+            ((town_idx, roof_area, household_size), roof_area, household_size, features, towns)
+            for town_idx, roof_area, household_size, features, towns in grid.chunks(chunk_size)
+        )
+        for (town_idx, roof_area, household_size), columns in score_chunks(service, chunks, workers, model_dir):
+            consume(town_idx, roof_area, household_size, columns)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    summary = aggregator.summary()
+    summary['elapsed_seconds'] = round(time.time() - start_time, 2)
+    return summary
+
+
+def parse_range(spec, cast=float):
+    """Parse 'start:stop:step' (inclusive stop) into an array"""
+    start, stop, step = (cast(x) for x in spec.split(':'))
+    return np.arange(start, stop + step / 2, step)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='District-wide RWH scenario sweep')
+    parser.add_argument('--roof-area', default='50:500:10', help='start:stop:step in sq meters')
+    parser.add_argument('--household-size', default='1:12:1', help='start:stop:step in people')
+    parser.add_argument('--towns', nargs='*', help='Towns to sweep (default: all in soil dataset)')
+    parser.add_argument('--output', help='Per-cell output file (.csv or .parquet)')
+    parser.add_argument('--summary', default='sweep_summary.json', help='Aggregate JSON output')
+    parser.add_argument('--chunk-size', type=int, default=50000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--model-dir', default='models')
+    parser.add_argument('--district', help='District from districts.json (overrides --model-dir)')
+    parser.add_argument('--engine', help='Model engine (default: best in metadata.json)')
+    args = parser.parse_args()
+
+    service = load_service(args.district, args.model_dir, engine=args.engine)
+    grid = build_grid(
+        service,
+        parse_range(args.roof_area),
+        parse_range(args.household_size, int),
+        towns=args.towns
+    )
+    print(f"Sweeping {grid.size:,} scenarios ({grid.shape[0]} towns) with {args.workers} workers...")
+
+    summary = run_sweep(
+        service, grid,
+        output_path=args.output,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        model_dir=service.model_dir
+    )
+
+    with open(args.summary, 'w') as f:
+        json.dump(summary, f, indent=2)
+
+    print(f"✅ Sweep completed: {summary['cells']:,} cells in {summary['elapsed_seconds']}s")
+    print(f"Summary saved in '{args.summary}'")
+
+
+if __name__ == "__main__":
+    main()
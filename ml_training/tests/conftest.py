@@ -0,0 +1,56 @@
+import os
+import sys
+
+import pytest
+
+# Modules in ml_training import each other by bare name
+ML_TRAINING_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(ML_TRAINING_DIR)
+sys.path.insert(0, ML_TRAINING_DIR)
+
+
+@pytest.fixture(scope='session')
+def trainer(tmp_path_factory):
+    """Trainer with a small Keras and linear model bundle trained on the Erode data
+
+    Keras trains for two epochs only: tests check plumbing, not accuracy.
+    District data paths are relative to ml_training/, as when the scripts run.
+    """
+    from district_registry import ERODE
+    from simple_ml_trainer import SimpleRWHTrainer
+
+    os.chdir(ML_TRAINING_DIR)
+    trainer = SimpleRWHTrainer(district={**ERODE, 'model_dir': str(tmp_path_factory.mktemp('models'))})
+    trainer.backend_options['keras'] = {'epochs': 2}
+    gw_df, soil_df = trainer.load_and_process_data()
+    training_df = trainer.generate_training_data(gw_df, soil_df, num_samples=600, seed=0)
+    trainer.train_models(training_df, engines=['keras', 'linear'])
+    trainer.save_models()
+    return trainer
+
+
+@pytest.fixture(scope='session')
+def model_dir(trainer):
+    return trainer.model_dir
+
+
+@pytest.fixture(scope='session')
+def service(model_dir):
+    """Service on the linear engine (float64 outputs, finite-difference gradients)"""
+    from simple_prediction_service import SimplePredictionService
+    return SimplePredictionService(model_dir, engine='linear')
+
+
+@pytest.fixture(scope='session')
+def keras_service(model_dir):
+    """Service on the compiled Keras pipeline (float32 outputs, exact gradients)"""
+    from simple_prediction_service import SimplePredictionService
+    return SimplePredictionService(model_dir, engine='keras')
+
+
+@pytest.fixture
+def client(service, monkeypatch):
+    """API test client serving the default district from the linear service"""
+    import api_server
+    monkeypatch.setattr(api_server, 'prediction_service', service)
+    return api_server.app.test_client()
@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+
+from admission_control import AdmissionController, Rejected
+
+
+def run(controller, kind='predict', rows=1, seconds=0.0, deadline_ms=None):
+    started = controller.acquire(controller.deadline(deadline_ms), kind, rows)
+    time.sleep(seconds)
+    controller.release(started, kind, rows)
+
+
+def test_idle_server_recovers_after_slow_request():
+    controller = AdmissionController(max_in_flight=2, max_queue=4)
+    run(controller, seconds=0.2)  # one outlier slower than every later deadline
+
+    for _ in range(20):
+        run(controller, deadline_ms=50)
+
+    assert controller.counts['rejected_deadline'] == 0
+    assert controller.expected_service_ms('predict') < 200
+
+
+def test_batch_estimate_does_not_affect_single_predictions():
+    controller = AdmissionController(max_in_flight=1, max_queue=4)
+    run(controller, kind='batch', rows=1000, seconds=0.1)
+
+    assert controller.expected_service_ms('predict') == 0.0
+    assert controller.expected_service_ms('batch', rows=10) == pytest.approx(1.0, rel=0.5)
+
+
+def test_queued_request_rejected_when_it_cannot_meet_deadline():
+    controller = AdmissionController(max_in_flight=1, max_queue=4)
+    run(controller, seconds=0.1)
+
+    started = controller.acquire(controller.deadline())
+    try:
+        with pytest.raises(Rejected) as excinfo:
+            controller.acquire(controller.deadline(20), 'predict')
+        assert excinfo.value.status == 503
+    finally:
+        controller.release(started)
+
+
+def test_full_queue_rejected_with_429():
+    controller = AdmissionController(max_in_flight=1, max_queue=0)
+    started = controller.acquire(controller.deadline())
+    try:
+        with pytest.raises(Rejected) as excinfo:
+            controller.acquire(controller.deadline())
+        assert excinfo.value.status == 429
+    finally:
+        controller.release(started)
+
+
+def test_queued_request_runs_when_slot_frees():
+    controller = AdmissionController(max_in_flight=1, max_queue=4)
+    started = controller.acquire(controller.deadline())
+    results = []
+
+    def waiter():
+        run(controller, deadline_ms=2000)
+        results.append('done')
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    time.sleep(0.05)
+    controller.release(started)
+    thread.join(timeout=2)
+
+    assert results == ['done']
+    assert controller.stats()['completed'] == 2
+
+
+def test_passed_deadline_rejected_even_when_idle():
+    controller = AdmissionController(max_in_flight=2, max_queue=4)
+
+    with pytest.raises(Rejected) as excinfo:
+        controller.acquire(controller.deadline(-100))
+    assert excinfo.value.status == 503
+    assert controller.stats()['in_flight'] == 0
+
+
+def test_deadline_rechecked_once_lock_is_acquired():
+    controller = AdmissionController(max_in_flight=1, max_queue=4)
+    results = []
+
+    def late():
+        try:
+            controller.acquire(time.monotonic() + 0.05)
+            results.append('admitted')
+        except Rejected:
+            results.append('expired')
+
+    thread = threading.Thread(target=late)
+    with controller._cond:  # the deadline passes while the request waits for the lock
+        thread.start()
+        time.sleep(0.1)
+    thread.join(timeout=2)
+
+    assert results == ['expired']
+    assert controller.stats()['in_flight'] == 0
@@ -0,0 +1,107 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from bulk_scoring import BulkOutputWriter, BulkScorer, part_index
+
+HOUSEHOLDS = pd.DataFrame({
+    'roof_area': [120, 80, -5, 300, 'abc', 95, 1500, 60, 220, 40],
+    'household_size': [4, 3, 2, 6, 4, 5, 12, 0, 7, 2],
+    'town': ['Erode', 'Bhavani', 'Erode', 'Ero(de', 'Kodumudi', None, 'Perundurai', 'Erode', 'Bhavani', 'Solar'],
+})
+INVALID_ROWS = [2, 4, 7]
+
+
+class FailingScorer(BulkScorer):
+    """Stops the run partway through, like a crash after some chunks were committed"""
+
+    def __init__(self, service, fail_at):
+        super().__init__(service)
+        self.fail_at = fail_at
+        self.chunks = 0
+
+    def enrich(self, frame, valid, location_features, columns):
+        if self.chunks == self.fail_at:
+            raise KeyboardInterrupt
+        self.chunks += 1
+        return super().enrich(frame, valid, location_features, columns)
+
+
+@pytest.fixture
+def input_csv(tmp_path):
+    path = str(tmp_path / 'households.csv')
+    HOUSEHOLDS.to_csv(path, index=False)
+    return path
+
+
+def test_invalid_rows_get_errors_without_stopping_the_run(service, input_csv, tmp_path):
+    output = str(tmp_path / 'scored.csv')
+
+    summary = BulkScorer(service).run(input_csv, output, chunk_size=4)
+
+    scored = pd.read_csv(output, keep_default_na=False)
+    assert summary['rows'] == len(scored) == len(HOUSEHOLDS)
+    assert summary['chunks'] == 3
+    assert [i for i, error in enumerate(scored['error']) if error] == INVALID_ROWS
+    assert (scored.drop(INVALID_ROWS)['recommended_structure'] != '').all()
+    assert (scored.loc[INVALID_ROWS, 'recommended_structure'] == '').all()
+
+
+def test_resume_after_interruption_matches_uninterrupted_run(service, input_csv, tmp_path):
+    expected = str(tmp_path / 'expected.csv')
+    BulkScorer(service).run(input_csv, expected, chunk_size=3)
+
+    output = str(tmp_path / 'scored.csv')
+    with pytest.raises(KeyboardInterrupt):
+        FailingScorer(service, fail_at=2).run(input_csv, output, chunk_size=3)
+    with open(f'{output}.checkpoint.json') as f:
+        assert json.load(f)['chunks_done'] == 2
+    with open(output, 'a') as f:
+        f.write('half-written row')
+
+    summary = BulkScorer(service).run(input_csv, output, chunk_size=3, resume=True)
+
+    assert summary['chunks'] == 4
+    with open(output) as f, open(expected) as g:
+        assert f.read() == g.read()
+
+
+def test_resume_rejects_other_chunk_size(service, input_csv, tmp_path):
+    output = str(tmp_path / 'scored.csv')
+    BulkScorer(service).run(input_csv, output, chunk_size=4)
+
+    with pytest.raises(ValueError):
+        BulkScorer(service).run(input_csv, output, chunk_size=5, resume=True)
+
+
+def test_parquet_resume(service, tmp_path):
+    input_csv = str(tmp_path / 'households.csv')
+    HOUSEHOLDS.drop(INVALID_ROWS).to_csv(input_csv, index=False)
+    output = str(tmp_path / 'scored.parquet')
+    with pytest.raises(KeyboardInterrupt):
+        FailingScorer(service, fail_at=1).run(input_csv, output, chunk_size=4)
+
+    BulkScorer(service).run(input_csv, output, chunk_size=4, resume=True)
+
+    scored = pd.read_parquet(output)
+    assert len(scored) == len(HOUSEHOLDS) - len(INVALID_ROWS)
+    assert sorted(os.listdir(output)) == [f'part-{i:05d}.parquet' for i in range(2)]
+
+
+def test_part_index_beyond_five_digits():
+    assert part_index('part-00012.parquet') == 12
+    assert part_index('part-123456.parquet') == 123456
+
+
+def test_truncate_drops_parts_after_checkpoint(tmp_path):
+    path = str(tmp_path / 'scored.parquet')
+    os.makedirs(path)
+    names = ['part-00000.parquet', 'part-99999.parquet', 'part-100000.parquet', 'part-100001.parquet']
+    for name in names:
+        open(os.path.join(path, name), 'w').close()
+
+    BulkOutputWriter(path).truncate({'chunks_done': 100000})
+
+    assert sorted(os.listdir(path)) == names[:2]
@@ -0,0 +1,110 @@
+import json
+import os
+import shutil
+import subprocess
+
+import numpy as np
+import pytest
+
+from cost_engine import CostEngine, TierTable, load_rate_tables
+
+COST_DATASET = os.path.join(os.path.dirname(__file__), '..', '..', 'backend', 'costDataset.js')
+
+CAPACITIES = [0, 499, 500, 1999, 2000, 2001, 9999, 10000, 10001, 50000, 50001, 120000]
+DEPTHS = [0.2, 0.5, 1.0, 1.5, 2.0, 3.0, 3.5, 5.0, 6.0, 9.0, 12.0, 20.0]
+
+
+def first_match(tiers, range_key, fallback, value):
+    """The backend's tier loop: first tier in declaration order containing value"""
+    for name, spec in tiers.items():
+        low, high = spec[range_key]
+        if low <= value <= high:
+            return name
+    return fallback
+
+
+@pytest.fixture(scope='module')
+def tables():
+    return load_rate_tables(COST_DATASET)
+
+
+@pytest.fixture(scope='module')
+def engine():
+    return CostEngine(COST_DATASET)
+
+
+def test_tank_tiers_match_backend_loop(tables):
+    tiers = tables['storageTanks']['plastic']
+    table = TierTable(tiers, 'capacity', 'costPerLiter', 'large')
+
+    expected = [first_match(tiers, 'capacity', 'large', value) for value in CAPACITIES]
+    assert [table.names[i] for i in table.lookup(CAPACITIES)] == expected
+
+
+@pytest.mark.parametrize('kind', ['pit', 'trench'])
+def test_recharge_tiers_match_backend_loop(tables, kind):
+    tiers = tables['rechargeStructures'][kind]
+    table = TierTable(tiers, 'depth', 'costPerCubicMeter', 'medium')
+
+    expected = [first_match(tiers, 'depth', 'medium', value) for value in DEPTHS]
+    assert [table.names[i] for i in table.lookup(DEPTHS)] == expected
+
+
+def test_shared_boundary_takes_lower_tier(tables):
+    table = TierTable(tables['storageTanks']['plastic'], 'capacity', 'costPerLiter', 'large')
+
+    assert table.rate([2000, 10000]).tolist() == [12.0, 10.0]
+
+
+def test_storage_cost_breakdown(engine):
+    items = engine.storage_cost([1000, 60000])
+
+    assert items['tank'].tolist() == [12000.0, 480000.0]  # 60000 L falls back to 'large'
+    assert items['installation'].tolist() == [2400.0, 96000.0]
+    assert items['accessories'].tolist() == [5000.0, 5000.0]
+
+
+def test_recharge_cost_mixed_structures(engine):
+    items = engine.recharge_cost(['pit', 'trench', 'shaft'], [2000, 2000, 2000], [2.0, 2.0, 10.0])
+
+    assert items['cost'].tolist() == [5000.0, 5000.0, 120000.0]
+    assert items['structure'].tolist() == [2500.0, 2500.0, 72000.0]
+    assert items['filter_media'].tolist() == [1600.0, 1600.0, 1000.0]
+    assert items['accessories'].tolist() == [5000.0, 5000.0, 8000.0]
+
+
+def test_price_applies_soil_and_space_multipliers(engine):
+    columns = engine.price(
+        np.array(['pit', 'pit']), [2000, 2000], [2.0, 2.0],
+        np.array(['Sandy', 'Rocky']), space_area=[100, 5]
+    )
+
+    assert columns['itemized_cost'].tolist() == [5000.0, 5000.0 * 2.0 * 1.3]
+    assert set(columns) >= {'cost_excavation', 'cost_structure', 'annual_maintenance'}
+
+
+def test_empty_arrays(engine):
+    assert engine.storage_cost([])['cost'].shape == (0,)
+    assert engine.recharge_cost(np.array([], dtype=str), [], [])['cost'].shape == (0,)
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='node is not installed')
+def test_costs_match_backend_functions(engine):
+    script = f"""
+const {{ calculateStorageCost, calculateRechargeCost }} = require({json.dumps(os.path.abspath(COST_DATASET))});
+const capacities = {json.dumps(CAPACITIES)};
+const depths = {json.dumps(DEPTHS)};
+console.log(JSON.stringify({{
+  storage: capacities.map(c => calculateStorageCost(c).cost),
+  pit: depths.map(d => calculateRechargeCost(4, 'pit', d).cost),
+  trench: depths.map(d => calculateRechargeCost(4, 'trench', d).cost),
+  shaft: depths.map(d => calculateRechargeCost(4, 'shaft', d).cost)
+}}));
+"""
+    backend = json.loads(subprocess.run(['node', '-e', script], capture_output=True, text=True, check=True).stdout)
+
+    np.testing.assert_allclose(engine.storage_cost(CAPACITIES)['cost'], backend['storage'])
+    for kind in ('pit', 'trench', 'shaft'):
+        # The backend takes recharge volumes in cubic meters, the engine in liters
+        cost = engine.recharge_cost(kind, 4000, DEPTHS)['cost']
+        np.testing.assert_allclose(cost, backend[kind], err_msg=kind)
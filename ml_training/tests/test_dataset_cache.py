@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset_cache import DatasetCache, dataset_key, load_training_data
+from district_registry import ERODE
+from simple_ml_trainer import SimpleRWHTrainer
+from training_control import dataset_fingerprint
+
+FRAME = pd.DataFrame({
+    'roof_area': [120.0, 80.5, 300.0],
+    'household_size': [4, 3, 6],
+    'structure_type': ['pit', 'trench', 'shaft'],
+})
+
+
+def test_columns_round_trip_memory_mapped(tmp_path):
+    cache = DatasetCache(str(tmp_path))
+    cache.save('key', FRAME, {'num_samples': 3})
+
+    columns = cache.columns('key')
+
+    assert all(isinstance(values, np.memmap) for values in columns.values())
+    assert columns['roof_area'].tolist() == FRAME['roof_area'].tolist()
+    assert columns['structure_type'].tolist() == FRAME['structure_type'].tolist()
+    assert cache.load('key').to_dict('list') == FRAME.to_dict('list')
+    assert dataset_fingerprint(columns) == dataset_fingerprint(FRAME)
+
+
+def test_miss_returns_none(tmp_path):
+    cache = DatasetCache(str(tmp_path))
+
+    assert cache.columns('missing') is None
+    assert cache.load('missing') is None
+
+
+def test_key_changes_with_inputs_and_config(tmp_path):
+    source = tmp_path / 'soil.csv'
+    source.write_text('Town,Sandy\nErode,30\n')
+    config = {'num_samples': 100, 'seed': 1}
+    key = dataset_key([str(source)], config)
+
+    assert dataset_key([str(source)], dict(config)) == key
+    assert dataset_key([str(source)], {**config, 'seed': 2}) != key
+    assert dataset_key([str(source)], {**config, 'num_samples': 101}) != key
+
+    source.write_text('Town,Sandy\nErode,31\n')
+    assert dataset_key([str(source)], config) != key
+
+
+@pytest.fixture
+def fresh_trainer(tmp_path, trainer):  # trainer: run from ml_training/ like the other trainer tests
+    return SimpleRWHTrainer(district={**ERODE, 'model_dir': str(tmp_path / 'models')})
+
+
+def test_training_runs_on_memory_mapped_cache(fresh_trainer, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / 'cache')
+    generated = load_training_data(fresh_trainer, 300, seed=3, cache_dir=cache_dir)
+
+    def regenerate(*args, **kwargs):
+        raise AssertionError('cache hit expected')
+
+    monkeypatch.setattr(fresh_trainer, 'generate_training_data', regenerate)
+    cached = load_training_data(fresh_trainer, 300, seed=3, cache_dir=cache_dir)
+
+    assert isinstance(cached['roof_area'], np.memmap)
+    assert dataset_fingerprint(cached) == dataset_fingerprint(generated)
+
+    fresh_trainer.train_models(cached, engines=['linear'])
+    assert set(fresh_trainer.engines['linear']) >= {'structure_type', 'cost'}
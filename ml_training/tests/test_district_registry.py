@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from district_registry import DistrictRegistry, load_districts
+
+
+class CountingRegistry(DistrictRegistry):
+    """Registry whose services are plain objects, to exercise caching alone"""
+
+    def build(self, name):
+        return {'district': name}
+
+
+@pytest.fixture
+def districts_file(tmp_path):
+    path = tmp_path / 'districts.json'
+    path.write_text(json.dumps({
+        name: {'groundwater_csv': f'{name}/gw.csv', 'soil_csv': f'{name}/soil.csv'}
+        for name in ['Erode', 'Salem', 'Namakkal', 'Karur']
+    }))
+    return str(path)
+
+
+def test_pinned_default_is_never_evicted(districts_file):
+    registry = CountingRegistry(districts_file, max_loaded=2)
+    default = registry.pin()
+
+    for name in ['Salem', 'Namakkal', 'Karur', 'Salem']:
+        registry.get(name)
+
+    assert registry.get('erode') is default
+    assert registry.get() is default
+    stats = registry.stats()
+    assert 'Erode' in stats['loaded']
+    assert len(stats['loaded']) == 2
+    assert stats['loads'] == 5  # Erode once; Salem again after its eviction
+
+
+def test_least_recently_used_district_is_evicted(districts_file):
+    registry = CountingRegistry(districts_file, max_loaded=2)
+    registry.get('Salem')
+    registry.get('Namakkal')
+    registry.get('Salem')
+    registry.get('Karur')
+
+    assert registry.stats()['loaded'] == ['Salem', 'Karur']
+    assert registry.evictions == 1
+
+
+def test_unknown_district_raises(districts_file):
+    registry = CountingRegistry(districts_file)
+    with pytest.raises(KeyError):
+        registry.get('Chennai')
+
+
+def test_districts_default_to_their_own_location_info(districts_file):
+    districts = load_districts(districts_file)
+
+    assert districts['Salem']['default_location_info'] is None
+    assert districts['Salem']['default_location'] == 'Salem'
+    assert districts['Salem']['model_dir'] == 'models/salem'
@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+from model_compiler import ACTIVATIONS, CompiledPipeline, compile_models, fold_scaler, verify_pipeline
+
+N_FEATURES = 7
+
+
+def random_layers(rng, sizes, output_activation):
+    layers = []
+    for i, (n_in, n_out) in enumerate(zip(sizes[:-1], sizes[1:])):
+        activation = output_activation if i == len(sizes) - 2 else 'relu'
+        layers.append((rng.normal(0, 0.5, (n_in, n_out)), rng.normal(0, 0.1, n_out), activation))
+    return layers
+
+
+class ReferenceModel:
+    """Unfused float64 evaluation of Dense layers on scaled features, predict() like Keras"""
+
+    def __init__(self, layers):
+        self.layers = layers
+
+    def predict(self, X, verbose=0):
+        h = np.asarray(X, dtype=float)
+        for kernel, bias, activation in self.layers:
+            h = ACTIVATIONS[activation](h @ kernel + bias)
+        return h
+
+
+@pytest.fixture
+def setup():
+    rng = np.random.default_rng(0)
+    scaler = StandardScaler().fit(rng.normal(50, 20, (200, N_FEATURES)))
+    heads = {
+        'structure_type': random_layers(rng, [N_FEATURES, 16, 8, 3], 'softmax'),
+        'cost': random_layers(rng, [N_FEATURES, 16, 8, 1], 'linear'),
+    }
+    models = {name: ReferenceModel(layers) for name, layers in heads.items()}
+    pipeline = CompiledPipeline({
+        name: fold_scaler(layers, scaler.mean_, scaler.scale_) for name, layers in heads.items()
+    })
+    return rng, scaler, models, pipeline
+
+
+def test_fold_scaler_matches_scaling_first(setup):
+    rng, scaler, models, pipeline = setup
+    X = scaler.mean_ + rng.normal(0, 1, (50, N_FEATURES)) * scaler.scale_
+
+    outputs = pipeline(X)
+    for name, model in models.items():
+        np.testing.assert_allclose(outputs[name], model.predict(scaler.transform(X)), rtol=1e-4, atol=1e-4)
+
+
+def test_verify_pipeline_accepts_faithful_compilation(setup):
+    _, scaler, models, pipeline = setup
+
+    report = verify_pipeline(pipeline, models, scaler, num_samples=500)
+
+    assert set(report) == set(models)
+    assert max(report.values()) < 1e-4
+
+
+def test_verify_pipeline_raises_on_mismatch(setup):
+    _, scaler, models, pipeline = setup
+    kernel, bias, activation = models['cost'].layers[-1]
+    models['cost'].layers[-1] = (kernel, bias + 1.0, activation)
+
+    with pytest.raises(AssertionError, match='cost'):
+        verify_pipeline(pipeline, models, scaler, num_samples=500)
+
+
+def test_jacobian_matches_finite_differences(setup):
+    rng, scaler, _, pipeline = setup
+    pipeline = CompiledPipeline(pipeline.heads, dtype=np.float64)
+    X = scaler.mean_ + rng.normal(0, 1, (5, N_FEATURES)) * scaler.scale_
+    step = 1e-4 * scaler.scale_
+
+    outputs, jacobians = pipeline.jacobian(X)
+    for name, jacobian in jacobians.items():
+        assert jacobian.shape == (len(X), outputs[name].shape[1], N_FEATURES)
+        np.testing.assert_allclose(outputs[name], pipeline(X)[name])
+        for f in range(N_FEATURES):
+            offset = np.zeros(N_FEATURES)
+            offset[f] = step[f]
+            numeric = (pipeline(X + offset)[name] - pipeline(X - offset)[name]) / (2 * step[f])
+            np.testing.assert_allclose(jacobian[:, :, f], numeric, rtol=1e-3, atol=1e-6)
+
+
+def test_save_load_round_trip(setup, tmp_path):
+    rng, scaler, _, pipeline = setup
+    X = scaler.mean_ + rng.normal(0, 1, (10, N_FEATURES)) * scaler.scale_
+    path = str(tmp_path / 'compiled_pipeline.npz')
+
+    pipeline.save(path)
+    loaded = CompiledPipeline.load(path)
+
+    for name, values in pipeline(X).items():
+        np.testing.assert_array_equal(loaded(X)[name], values)
+
+
+def test_compile_keras_models():
+    keras = pytest.importorskip('tensorflow').keras
+    rng = np.random.default_rng(0)
+    scaler = StandardScaler().fit(rng.normal(50, 20, (200, N_FEATURES)))
+    model = keras.Sequential([
+        keras.layers.Dense(16, activation='relu', input_shape=(N_FEATURES,)),
+        keras.layers.Dropout(0.3),
+        keras.layers.Dense(3, activation='softmax')
+    ])
+
+    pipeline = compile_models({'structure_type': model}, scaler)
+
+    assert verify_pipeline(pipeline, {'structure_type': model}, scaler)['structure_type'] < 1e-4
@@ -0,0 +1,26 @@
+from model_zoo import select_engine
+
+
+def engines():
+    return {
+        'keras': {'score': 0.95, 'latency': {'single_row_ms': 0.13}},
+        'tree': {'score': 0.97, 'latency': {'single_row_ms': 16.0}},
+        'linear': {'score': 0.80, 'latency': {'single_row_ms': 0.4}}
+    }
+
+
+def test_default_slo_keeps_fast_engine():
+    assert select_engine(engines()) == 'keras'
+
+
+def test_infinite_slo_ranks_on_accuracy():
+    assert select_engine(engines(), float('inf')) == 'tree'
+
+
+def test_explicit_slo_filters_slow_engines():
+    assert select_engine(engines(), 20) == 'tree'
+    assert select_engine(engines(), 0.2) == 'keras'
+
+
+def test_fastest_engine_when_none_meets_slo():
+    assert select_engine(engines(), 0.01) == 'keras'
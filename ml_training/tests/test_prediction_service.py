@@ -0,0 +1,115 @@
+import numpy as np
+
+import rainfall_engine
+import simple_prediction_service
+
+
+def test_location_names_are_matched_as_text(service):
+    features = service.location_features('Ero(de')
+
+    np.testing.assert_array_equal(features, service.location_features('No such town'))
+
+
+def test_location_cache_is_bounded(service, monkeypatch):
+    monkeypatch.setattr(simple_prediction_service, 'LOCATION_CACHE_SIZE', 3)
+    monkeypatch.setattr(rainfall_engine, 'RESOLVE_CACHE_SIZE', 3)
+
+    for i in range(20):
+        service.location_features(f'Household {i}')
+        service.rainfall.resolve(f'Household {i}')
+    service.location_features('Household 17')  # most recently used survives the next insert
+    service.location_features('Household 20')
+
+    assert list(service._location_cache) == ['Household 19', 'Household 17', 'Household 20']
+    assert len(service.rainfall._resolved) == 3
+
+
+ROWS = np.array([
+    [120.0, 4.0, 8.5, 30.0, 40.0, 20.0, 10.0],
+    [450.0, 9.0, 8.5, 30.0, 40.0, 20.0, 10.0],
+])
+
+
+def central_differences(service, X, step):
+    """d model_outputs / d features (n, outputs, 7) from one +/- step pair per feature"""
+    jacobians = {}
+    for j in range(X.shape[1]):
+        offset = np.zeros(X.shape[1])
+        offset[j] = step[j]
+        up = service.model_outputs(X + offset)
+        down = service.model_outputs(X - offset)
+        for name in up:
+            column = (np.asarray(up[name], dtype=float) - down[name]) / (2 * step[j])
+            jacobians.setdefault(name, np.zeros(column.shape + (X.shape[1],)))[..., j] = column
+    return jacobians
+
+
+def sensitivity_of(service, X):
+    return service.sensitivity(X[:, 0], X[:, 1], X[0, 2:], locations='Erode')
+
+
+def test_finite_difference_gradients(service):
+    step = service.backend.gradient_step * service.scaler.scale_
+    outputs, jacobians = service.model_gradients(ROWS)
+
+    assert service.gradient_method() == 'finite_difference'
+    expected = central_differences(service, ROWS, step)
+    for name, jacobian in jacobians.items():
+        np.testing.assert_allclose(jacobian, expected[name], rtol=1e-6, atol=1e-9, err_msg=name)
+        np.testing.assert_allclose(outputs[name], service.model_outputs(ROWS)[name])
+
+
+def test_compiled_jacobian_matches_finite_differences(keras_service):
+    step = 1e-3 * keras_service.scaler.scale_
+    _, jacobians = keras_service.model_gradients(ROWS)
+
+    assert keras_service.gradient_method() == 'compiled'
+    expected = central_differences(keras_service, ROWS, step)
+    for name, jacobian in jacobians.items():
+        scale = np.abs(expected[name]).max() + 1e-6
+        np.testing.assert_allclose(jacobian, expected[name], atol=2e-2 * scale, err_msg=name)
+
+
+def test_sensitivity_gradients_per_output(service):
+    columns, gradients = sensitivity_of(service, ROWS)
+    _, jacobians = service.model_gradients(ROWS)
+
+    np.testing.assert_allclose(gradients['volume'], jacobians['volume'][:, 0, :])
+    volume, cost = columns['volume'][:, None], columns['cost'][:, None]
+    np.testing.assert_allclose(  # quotient rule on cost / volume
+        gradients['cost_per_liter'], (gradients['cost'] * volume - cost * gradients['volume']) / volume ** 2
+    )
+    chosen = np.argmax(service.model_outputs(ROWS)['structure_type'], axis=1)
+    np.testing.assert_allclose(gradients['structure_probability'], jacobians['structure_type'][[0, 1], chosen])
+
+
+def test_clamped_outputs_have_zero_gradient(service, monkeypatch):
+    model_gradients = service.model_gradients
+
+    def clamp_first_row(X, batch_size=4096):
+        outputs, jacobians = model_gradients(X, batch_size)
+        outputs['pit_depth'] = outputs['pit_depth'].copy()
+        outputs['pit_depth'][0] = -1.0
+        return outputs, jacobians
+
+    monkeypatch.setattr(service, 'model_gradients', clamp_first_row)
+    _, gradients = sensitivity_of(service, ROWS)
+
+    assert not gradients['pit_depth'][0].any()
+    assert gradients['pit_depth'][1].any()
+
+
+def test_sensitivity_of_no_rows(service):
+    columns, gradients = service.sensitivity([], [], ROWS[0, 2:], locations='Erode')
+
+    assert len(columns['volume']) == 0
+    assert all(values.shape == (0, 7) for values in gradients.values())
+
+
+def test_sensitivity_endpoint(client):
+    response = client.post('/predict/sensitivity', json={'roof_area': 150, 'household_size': 5, 'location': 'Erode'})
+
+    assert response.status_code == 200
+    sensitivity = response.get_json()['sensitivity']
+    assert sensitivity['method'] == 'finite_difference'
+    assert set(sensitivity['gradients']['cost_per_liter']) == set(simple_prediction_service.INPUT_FEATURES)
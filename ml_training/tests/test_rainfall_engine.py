@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from rainfall_engine import interp2d, simulate_tank
+
+
+def test_tank_balances_inflow():
+    rng = np.random.default_rng(0)
+    rain = rng.gamma(0.3, 20, (3, 365))
+    inflow, captured, overflow = simulate_tank(rain, [80.0, 120.0], [500.0, 20000.0], [50.0, 200.0])
+
+    assert inflow.shape == captured.shape == overflow.shape == (3, 2)
+    np.testing.assert_allclose(captured + overflow, inflow)
+    assert (captured >= 0).all() and (overflow >= 0).all()
+
+
+def test_zero_capacity_captures_nothing():
+    rain = np.full((1, 365), 5.0)
+    inflow, captured, overflow = simulate_tank(rain, [100.0], [0.0], [0.0])
+
+    assert captured[0, 0] == 0
+    assert overflow[0, 0] == pytest.approx(inflow[0, 0])
+
+
+def test_capture_limited_by_capacity_and_draw():
+    rain = np.zeros((1, 365))
+    rain[0, 0] = 100.0  # one 10000 L storm into a 1000 L tank
+
+    _, captured, overflow = simulate_tank(rain, [100.0], [1000.0], [10.0])
+    assert captured[0, 0] == pytest.approx(1000.0)
+    assert overflow[0, 0] == pytest.approx(9000.0)
+
+    rain[0, :] = 1.0  # 100 L/day, drawn down by 10 L/day, filling a 1000 L tank
+    _, captured, _ = simulate_tank(rain, [100.0], [1000.0], [10.0])
+    assert captured[0, 0] < 100.0 * 365
+    assert captured[0, 0] == pytest.approx(1000.0 + 10.0 * 364)
+
+
+def test_interp2d_exact_at_grid_points():
+    x_grid = np.array([0.0, 1.0, 3.0])
+    y_grid = np.array([0.0, 2.0])
+    table = np.array([[0.0, 1.0], [2.0, 3.0], [4.0, 5.0]])
+
+    xs, ys = np.meshgrid(x_grid, y_grid, indexing='ij')
+    np.testing.assert_allclose(interp2d(x_grid, y_grid, table, xs, ys), table)
+
+
+def test_interp2d_bilinear_between_and_clamped_outside():
+    x_grid = np.array([0.0, 1.0, 3.0])
+    y_grid = np.array([0.0, 2.0])
+    table = np.add.outer(2 * x_grid, 0.5 * y_grid)  # bilinear, so reproduced exactly
+
+    x = np.array([0.5, 2.0, 2.9])
+    y = np.array([1.0, 0.5, 1.9])
+    np.testing.assert_allclose(interp2d(x_grid, y_grid, table, x, y), 2 * x + 0.5 * y)
+
+    assert interp2d(x_grid, y_grid, table, -5.0, -5.0) == pytest.approx(table[0, 0])
+    assert interp2d(x_grid, y_grid, table, 10.0, 10.0) == pytest.approx(table[-1, -1])
@@ -0,0 +1,82 @@
+import json
+
+import msgpack
+import numpy as np
+import pytest
+
+from response_serializer import flat_columns, round_column
+
+HOUSEHOLDS = [
+    {'roof_area': 120, 'household_size': 4, 'location': 'Erode'},
+    {'roof_area': 75.5, 'household_size': 2, 'location': 'Bhavani'},
+    {'roof_area': 900, 'household_size': 11, 'location': 'Perundurai'},
+]
+
+
+def flatten(record, prefix=''):
+    flat = {}
+    for key, value in record.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f'{prefix}{key}_'))
+        else:
+            flat[f'{prefix}{key}'] = value
+    return flat
+
+
+def test_round_column_matches_python_round_on_float32():
+    values = np.array([0.59, 123.455, 7.1, 1e6 / 3], dtype=np.float32)
+
+    assert round_column(values, 2).tolist() == [round(float(v), 2) for v in values]
+    assert round_column(values, None).dtype == np.float64
+
+
+def test_flat_columns_clip_payback(service):
+    columns = service.predict_batch([100.0], [4.0], service.location_features('Erode'))
+    columns['payback_years'] = np.array([np.inf])
+
+    flat = flat_columns(columns, service.location_features('Erode')[None, :])
+    assert flat['cost_estimation_payback_period_years'].tolist() == [50.0]
+
+
+@pytest.fixture
+def keras_client(keras_service, monkeypatch):
+    import api_server
+    monkeypatch.setattr(api_server, 'prediction_service', keras_service)
+    return api_server.app.test_client()
+
+
+@pytest.fixture
+def single_results(keras_client):
+    results = []
+    for household in HOUSEHOLDS:
+        result = keras_client.post('/predict', json=household).get_json()
+        del result['metadata']
+        results.append(result)
+    return results
+
+
+def test_batch_json_matches_predict(keras_client, single_results):
+    response = keras_client.post('/predict/batch', json={'households': HOUSEHOLDS})
+
+    assert response.status_code == 200
+    assert response.get_json()['results'] == single_results
+
+
+def test_batch_ndjson_matches_predict(keras_client, single_results):
+    response = keras_client.post(
+        '/predict/batch', json={'households': HOUSEHOLDS}, headers={'Accept': 'application/x-ndjson'}
+    )
+
+    assert response.mimetype == 'application/x-ndjson'
+    records = [json.loads(line) for line in response.data.splitlines()]
+    assert records == [flatten(result) for result in single_results]
+
+
+def test_batch_msgpack_matches_predict(keras_client, single_results):
+    response = keras_client.post(
+        '/predict/batch', json={'households': HOUSEHOLDS}, headers={'Accept': 'application/msgpack'}
+    )
+
+    columns = msgpack.unpackb(response.data)
+    records = [{name: values[i] for name, values in columns.items()} for i in range(len(HOUSEHOLDS))]
+    assert records == [flatten(result) for result in single_results]
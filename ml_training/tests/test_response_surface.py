@@ -0,0 +1,93 @@
+import os
+import shutil
+
+import joblib
+import numpy as np
+import pytest
+
+from response_surface import SURFACE_FILE, ResponseSurfaces, build_surfaces, stack_channels
+from simple_prediction_service import SimplePredictionService
+
+
+@pytest.fixture(scope='module')
+def surfaces(service):
+    return build_surfaces(service, roof_points=32, check_samples=2000)
+
+
+def town_rows(service, town, roof_area, household_size):
+    features = np.broadcast_to(service.location_features(town), (len(roof_area), 5))
+    return np.column_stack([roof_area, household_size, features])
+
+
+def test_lookup_exact_at_grid_points(service, surfaces):
+    roof, household = np.meshgrid(surfaces.roof_grid[::5], [1.0, 7.0, 50.0], indexing='ij')
+    X = town_rows(service, 'Bhavani', roof.ravel(), household.ravel())
+
+    outputs, covered = surfaces.lookup(X)
+
+    assert covered.all()
+    targets = surfaces.targets
+    np.testing.assert_allclose(
+        stack_channels(outputs, targets), stack_channels(service.model_outputs(X), targets), rtol=1e-5, atol=1e-3
+    )
+
+
+def test_error_bound_holds_off_grid(service, surfaces):
+    rng = np.random.default_rng(1)
+    roof_area = np.exp(rng.uniform(0, np.log(10000), 3000))
+    X = town_rows(service, 'Erode', roof_area, rng.integers(1, 51, 3000))
+    town = surfaces.towns.index('Erode')
+
+    outputs, _ = surfaces.lookup(X)
+    live = service.model_outputs(X)
+    bound = surfaces.error_bound(town)
+    for target in surfaces.targets:
+        error = np.abs(outputs[target] - live[target]).max()
+        assert error <= 1.1 * bound[target] + 1e-6, target
+    assert 0 <= bound['structure_mismatch_rate'] <= 1
+
+
+def test_unknown_town_and_out_of_grid_rows_not_covered(service, surfaces):
+    X = town_rows(service, 'Erode', np.array([100.0, 20000.0]), np.array([4.0, 4.0]))
+    X = np.vstack([X, [100.0, 4.0, 99.0, 25.0, 25.0, 25.0, 25.0]])
+
+    _, covered = surfaces.lookup(X)
+    assert covered.tolist() == [True, False, False]
+
+
+@pytest.fixture
+def surface_dir(model_dir, surfaces, tmp_path):
+    path = str(tmp_path / 'models')
+    shutil.copytree(model_dir, path)
+    surfaces.save(os.path.join(path, SURFACE_FILE))
+    return path
+
+
+def test_surface_served_for_the_models_it_was_built_from(surface_dir):
+    service = SimplePredictionService(surface_dir, engine='linear', use_surfaces=True)
+
+    assert service.surfaces is not None
+    assert service.serving_info('Erode')['serving_mode'] == 'surface'
+
+
+def test_surface_refused_after_retraining(surface_dir):
+    path = os.path.join(surface_dir, 'linear', 'cost_model.pkl')
+    model = joblib.load(path)
+    model.coef_ = model.coef_ * 1.01
+    joblib.dump(model, path)
+
+    service = SimplePredictionService(surface_dir, engine='linear', use_surfaces=True)
+
+    assert service.surfaces is None
+    assert service.serving_info('Erode')['serving_mode'] == 'model'
+
+
+def test_surface_without_fingerprint_refused(surface_dir):
+    path = os.path.join(surface_dir, SURFACE_FILE)
+    legacy = ResponseSurfaces.load(path)
+    legacy.model_fingerprint = None  # as written before surfaces were fingerprinted
+    legacy.save(path)
+
+    service = SimplePredictionService(surface_dir, engine='linear', use_surfaces=True)
+
+    assert service.surfaces is None
@@ -0,0 +1,15 @@
+import numpy as np
+
+
+def test_engine_predict_fn_matches_serving_path(trainer, service, monkeypatch):
+    X = np.array([[120.0, 4.0, 8.5, 30.0, 40.0, 20.0, 10.0]] * 3)
+    calls = []
+    transform = trainer.scaler.transform
+    monkeypatch.setattr(trainer.scaler, 'transform', lambda X: calls.append(len(X)) or transform(X))
+
+    outputs = trainer.engine_predict_fn('linear')(X)
+
+    assert calls == [3]  # once for all heads, as SimplePredictionService.model_outputs does
+    served = service.model_outputs(X)
+    for name, values in outputs.items():
+        np.testing.assert_allclose(values, served[name])
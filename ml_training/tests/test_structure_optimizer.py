@@ -0,0 +1,79 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cost_engine import CostEngine
+from rainfall_engine import RainfallEngine
+from structure_optimizer import STRUCTURE_TYPES, StructureOptimizer, candidate_grid, itemized_cost_fn
+
+COST_DATASET = os.path.join(os.path.dirname(__file__), '..', '..', 'backend', 'costDataset.js')
+LOCATION = [20.0, 40.0, 30.0, 20.0, 10.0]  # deep groundwater, sandy-dominant soil
+
+
+def write_series(directory, daily_mm, rain_days=40):
+    """Two complete years of daily rainfall with rain on rain_days evenly spaced days"""
+    dates = pd.date_range('2021-01-01', '2022-12-31', freq='D')
+    rain = np.zeros(len(dates))
+    for year in (2021, 2022):
+        days = np.flatnonzero(dates.year == year)
+        rain[days[np.linspace(0, len(days) - 1, rain_days).astype(int)]] = daily_mm
+    os.makedirs(directory, exist_ok=True)
+    pd.DataFrame({'date': dates.strftime('%Y-%m-%d'), 'rainfall_mm': rain}).to_csv(
+        os.path.join(directory, 'Erode.csv'), index=False
+    )
+    return RainfallEngine(str(directory))
+
+
+@pytest.fixture(scope='module')
+def optimizer(tmp_path_factory):
+    return StructureOptimizer(RainfallEngine(str(tmp_path_factory.mktemp('no_series'))))
+
+
+def test_design_grows_with_roof_area(optimizer):
+    result = optimizer.optimize_batch([200, 1000, 5000], [4, 4, 4], LOCATION)
+
+    assert np.all(np.diff(result['volume']) > 0)
+    assert np.all(result['capture_efficiency'] >= optimizer.target_capture)
+
+
+def test_design_grows_with_rainfall(tmp_path):
+    dry = StructureOptimizer(RainfallEngine(str(tmp_path), default_annual_mm=600))
+    wet = StructureOptimizer(RainfallEngine(str(tmp_path), default_annual_mm=1500))
+
+    assert (wet.optimize_batch([1000], [4], LOCATION)['volume'][0] >
+            dry.optimize_batch([1000], [4], LOCATION)['volume'][0])
+
+
+def test_design_grows_with_rainfall_series(tmp_path):
+    dry = StructureOptimizer(write_series(tmp_path / 'dry', daily_mm=10))
+    wet = StructureOptimizer(write_series(tmp_path / 'wet', daily_mm=40))
+
+    dry_volume = dry.optimize_batch([1000], [4], LOCATION, 'Erode')['volume'][0]
+    wet_volume = wet.optimize_batch([1000], [4], LOCATION, 'Erode')['volume'][0]
+    assert wet_volume > dry_volume
+
+
+def test_itemized_costs_follow_roof_area(tmp_path):
+    engine = CostEngine(COST_DATASET)
+    optimizer = StructureOptimizer(RainfallEngine(str(tmp_path)), cost_fn=itemized_cost_fn(engine))
+    result = optimizer.optimize_batch([200, 5000], [4, 4], LOCATION)
+
+    assert result['volume'][1] > result['volume'][0]
+    assert np.all(result['cost'] > 0)
+
+
+def test_shallow_groundwater_leaves_no_feasible_design(optimizer):
+    result = optimizer.optimize_batch([500], [4], [0.5, 40, 30, 20, 10])
+
+    assert result['structure_type'][0] is None
+    assert np.isnan(result['volume'][0])
+
+
+def test_shaft_depths_use_depth_step():
+    grid = candidate_grid(step=0.25, depth_step=0.1)
+    shaft = grid['type_idx'] == STRUCTURE_TYPES.index('shaft')
+
+    depths = np.unique(np.round(grid['depth'][shaft], 6))
+    assert np.allclose(np.diff(depths), 0.1)
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sweep_engine import ScenarioGrid, build_grid, parse_range, run_sweep
+
+TOWNS = ['Erode', 'Bhavani', 'Gobichettipalayam']
+
+
+def test_parse_range_includes_stop():
+    assert parse_range('50:100:25').tolist() == [50.0, 75.0, 100.0]
+    assert parse_range('1:5:2', int).tolist() == [1, 3, 5]
+
+
+def test_grid_chunks_cover_every_cell_once():
+    grid = ScenarioGrid(['A', 'B'], np.zeros((2, 5)), [10.0, 20.0, 30.0], [1, 2])
+
+    cells = []
+    for town_idx, roof_area, household_size, features, towns in grid.chunks(5):
+        assert features.shape == (len(town_idx), 5)
+        cells += list(zip(towns, roof_area, household_size))
+
+    assert grid.size == len(cells) == 12
+    assert len(set(cells)) == 12
+
+
+def test_sweep_totals_match_direct_scoring(service):
+    grid = build_grid(service, parse_range('50:300:50'), parse_range('1:6:1', int), towns=TOWNS)
+    summary = run_sweep(service, grid, chunk_size=7)
+
+    _, roof_area, household_size, features, towns = next(grid.chunks(grid.size))
+    total = service.predict_batch(roof_area, household_size, features, towns)['annual_harvestable'].sum()
+
+    assert summary['cells'] == grid.size == 3 * 6 * 6
+    assert [town['cells'] for town in summary['towns']] == [36, 36, 36]
+    assert summary['total_annual_harvestable'] == pytest.approx(total, rel=1e-6)
+    assert summary == {**run_sweep(service, grid, chunk_size=1000), 'elapsed_seconds': summary['elapsed_seconds']}
+
+
+def test_sweep_writes_every_cell(service, tmp_path):
+    grid = build_grid(service, parse_range('50:100:50'), parse_range('1:3:1', int), towns=TOWNS)
+    path = str(tmp_path / 'sweep.csv')
+
+    run_sweep(service, grid, output_path=path, chunk_size=4)
+
+    frame = pd.read_csv(path)
+    assert len(frame) == grid.size
+    assert set(frame['town']) == set(TOWNS)
+
+
+def test_api_sweep(client):
+    response = client.post('/sweep', json={
+        'towns': TOWNS,
+        'roof_area': {'start': 50, 'stop': 150, 'step': 50},
+        'household_size': {'start': 2, 'stop': 4, 'step': 2}
+    })
+
+    assert response.status_code == 200
+    assert response.get_json()['cells'] == 3 * 3 * 2
+
+
+@pytest.mark.parametrize('roof_area, household_size, error', [
+    ({'start': -100, 'stop': 100, 'step': 50}, {'start': 1, 'stop': 4, 'step': 1}, 'Invalid roof_area'),
+    ({'start': 50, 'stop': 20000, 'step': 50}, {'start': 1, 'stop': 4, 'step': 1}, 'Invalid roof_area'),
+    ({'start': 50, 'stop': 100, 'step': 50}, {'start': 0, 'stop': 4, 'step': 1}, 'Invalid household_size'),
+    ({'start': 50, 'stop': 100, 'step': 50}, {'start': 1, 'stop': 60, 'step': 1}, 'Invalid household_size'),
+    ({'start': 50, 'stop': 100, 'step': 0}, {'start': 1, 'stop': 4, 'step': 1}, 'Invalid sweep ranges'),
+    ({'start': 50, 'stop': 'nan', 'step': 1}, {'start': 1, 'stop': 4, 'step': 1}, 'Invalid sweep ranges'),
+    ({'start': 1, 'stop': 10000, 'step': 1e-9}, {'start': 1, 'stop': 4, 'step': 1}, 'Sweep too large'),
+])
+def test_api_sweep_rejects_bad_ranges(client, roof_area, household_size, error):
+    response = client.post('/sweep', json={'roof_area': roof_area, 'household_size': household_size})
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == error
+
+
+def test_api_sweep_runs_under_admission_control(client, monkeypatch):
+    import api_server
+    from admission_control import AdmissionController
+    body = {'towns': TOWNS, 'roof_area': {'start': 50, 'stop': 100, 'step': 50}}
+
+    monkeypatch.setattr(api_server, 'admission', AdmissionController(max_in_flight=1, max_queue=0))
+    assert api_server.sweep_cells(body) == 3 * 2 * 12
+    assert client.post('/sweep', json=body).status_code == 200
+    assert 'sweep' in api_server.admission.stats()['service_ms_per_row']
+
+    started = api_server.admission.acquire(api_server.admission.deadline())
+    try:
+        assert client.post('/sweep', json=body).status_code == 429
+    finally:
+        api_server.admission.release(started)
@@ -0,0 +1,67 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from training_control import (
+    BudgetExhausted, TrainingBudget, dataset_fingerprint, load_holdout, save_holdout
+)
+
+
+def test_holdout_round_trip_without_pickle(tmp_path):
+    path = tmp_path / 'holdout.npz'
+    holdout = {
+        'X': np.random.default_rng(0).normal(size=(5, 7)),
+        'structure_type': np.array([0, 2, 1, 1, 0]),
+        'volume': np.linspace(1000, 5000, 5)
+    }
+    save_holdout(path, holdout)
+
+    loaded = load_holdout(path)
+    assert sorted(loaded) == sorted(holdout)
+    for key, values in holdout.items():
+        np.testing.assert_array_equal(loaded[key], values)
+
+
+def test_object_columns_saved_as_text(tmp_path):
+    path = tmp_path / 'holdout.npz'
+    save_holdout(path, {'structure_type': np.array(['pit', 'shaft'], dtype=object)})
+
+    loaded = load_holdout(path)
+    assert loaded['structure_type'].tolist() == ['pit', 'shaft']
+
+
+def test_pickled_holdout_is_ignored(tmp_path):
+    path = tmp_path / 'holdout.npz'
+    np.savez(path, structure_type=np.array(['pit', None], dtype=object))
+
+    assert load_holdout(path) is None
+
+
+def test_missing_holdout(tmp_path):
+    assert load_holdout(tmp_path / 'missing.npz') is None
+
+
+def test_fingerprint_survives_csv_round_trip(tmp_path):
+    df = pd.DataFrame({'roof_area': [150.123456789, 90.5], 'structure_type': ['pit', 'trench']})
+    path = tmp_path / 'data.csv'
+    df.to_csv(path, index=False)
+
+    assert dataset_fingerprint(pd.read_csv(path)) == dataset_fingerprint(df)
+
+
+def test_budget_check_raises_once_used_up():
+    budget = TrainingBudget(0.05, total_heads=2)
+    budget.check('keras/structure_type')
+
+    time.sleep(0.06)
+    with pytest.raises(BudgetExhausted):
+        budget.check('tree/structure_type')
+
+
+def test_budget_shares_remaining_time_between_heads():
+    budget = TrainingBudget(10, total_heads=4)
+    first = budget.start_head() - time.monotonic()
+
+    assert 2 < first <= 2.5
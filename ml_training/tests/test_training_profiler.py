@@ -0,0 +1,74 @@
+import tracemalloc
+
+from training_profiler import TrainingProfiler
+
+
+def allocate(mb):
+    return bytearray(mb * 2 ** 20)
+
+
+def test_nested_phases_report_their_own_heap_peaks():
+    profiler = TrainingProfiler(trace_malloc=True)
+    tracemalloc.start()
+    try:
+        with profiler.phase('outer'):
+            block = allocate(20)
+            del block
+            with profiler.phase('inner'):
+                small = allocate(2)
+                del small
+            after = allocate(1)
+            del after
+    finally:
+        tracemalloc.stop()
+
+    peaks = {record['name']: record['python_heap_peak_mb'] for record in profiler.phases}
+    assert 1.5 <= peaks['inner'] < 10
+    assert peaks['outer'] >= 20
+
+
+def test_inner_peak_carries_into_outer_phase():
+    profiler = TrainingProfiler(trace_malloc=True)
+    tracemalloc.start()
+    try:
+        with profiler.phase('outer'):
+            with profiler.phase('inner'):
+                block = allocate(30)
+                del block
+    finally:
+        tracemalloc.stop()
+
+    peaks = {record['name']: record['python_heap_peak_mb'] for record in profiler.phases}
+    assert peaks['inner'] >= 30
+    assert peaks['outer'] >= peaks['inner']
+
+
+def test_no_heap_figures_without_tracing():
+    profiler = TrainingProfiler(trace_malloc=True)
+    with profiler.phase('untraced', samples=10):
+        pass
+
+    record = profiler.phases[0]
+    assert 'python_heap_peak_mb' not in record
+    assert 'process_peak_rss_mb' in record
+
+
+def test_trainer_profile_passes_trace_malloc(monkeypatch, tmp_path):
+    import simple_ml_trainer
+    import training_profiler
+    calls = []
+
+    def run_profiled(num_samples, engines, epochs=None, trace_malloc=False, save=False):
+        calls.append({'engines': engines, 'epochs': epochs, 'trace_malloc': trace_malloc})
+        return {}, TrainingProfiler(trace_malloc=trace_malloc)
+
+    monkeypatch.setattr(training_profiler, 'run_profiled', run_profiled)
+    output = str(tmp_path / 'profile.json')
+    monkeypatch.setattr('sys.argv', [
+        'simple_ml_trainer.py', '--profile', '--trace-malloc', '--engines', 'linear',
+        '--epochs', '3', '--profile-output', output
+    ])
+
+    simple_ml_trainer.main()
+
+    assert calls == [{'engines': ['linear'], 'epochs': 3, 'trace_malloc': True}]
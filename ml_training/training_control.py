@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def dataset_fingerprint(df):
+    """Stable hash of a training DataFrame's (or {column: array} mapping's) contents
+
+    Values are rounded first so a frame survives a CSV round trip unchanged.
+    """
+    if not isinstance(df, pd.DataFrame):
+        df = pd.DataFrame(df)
+    hashed = pd.util.hash_pandas_object(df.round(6), index=False).values
+    return hashlib.sha256(hashed.tobytes()).hexdigest()[:16]
+
+
+def save_holdout(path, holdout):
+    """Write holdout arrays to an .npz that loads without pickle
+
+    Text columns are stored as fixed-width unicode rather than object arrays.
+    """
+    arrays = {}
+    for key, values in holdout.items():
+        values = np.asarray(values)
+        arrays[key] = values.astype(str) if values.dtype == object else values
+    np.savez(path, **arrays)
+
+
+def load_holdout(path):
+    """Holdout arrays saved by save_holdout, or None if there is none"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as data:
+            return {key: data[key] for key in data.files}
+    except ValueError:
+        print(f"⚠️  {path} holds pickled arrays from an older version; ignoring it")
+        return None
+
+
+class BudgetExhausted(Exception):
+    """Raised instead of starting a fit once the training budget is used up"""
+
+
+class TrainingBudget:
+    """Wall-clock budget shared across all heads of a training run
+
+    Each head may use an equal share of whatever time is left when it
+    starts, so heads trained late are not starved by early ones. Keras fits
+    are stopped at their share; other fits cannot be interrupted, so the
+    budget is checked before each one starts.
+    """
+
+    def __init__(self, seconds, total_heads):
+        self.deadline = time.monotonic() + seconds
+        self.heads_left = total_heads
+
+    def remaining(self):
+        return max(0.0, self.deadline - time.monotonic())
+
+    def check(self, key):
+        """Raise BudgetExhausted rather than start fitting key with no time left"""
+        if self.remaining() <= 0:
+            raise BudgetExhausted(f"Training budget used up before {key}")
+
+    def start_head(self):
+        """Deadline (monotonic seconds) for the head about to train"""
+        share = self.remaining() / max(1, self.heads_left)
+        self.heads_left -= 1
+        return time.monotonic() + share
+
+    def callback(self, head_deadline):
+        """Keras callback that stops training once the head's deadline passes"""
+        from tensorflow import keras
+
+        class BudgetStop(keras.callbacks.Callback):
+            def on_train_batch_end(self, batch, logs=None):
+                if time.monotonic() > head_deadline:
+                    self.model.stop_training = True
+
+        return BudgetStop()
+
+
+class CheckpointStore:
+    """Finished and in-progress heads of a training run, for resuming
+
+    State is tied to a dataset fingerprint; a checkpoint written for other
+    training data is ignored.
+    """
+
+    def __init__(self, directory, fingerprint, resume=False):
+        self.directory = directory
+        self.fingerprint = fingerprint
+        self.state_path = os.path.join(directory, 'state.json')
+        self.state = {'fingerprint': fingerprint, 'heads': {}}
+
+        if resume and os.path.exists(self.state_path):
+            with open(self.state_path, 'r') as f:
+                saved = json.load(f)
+            if saved.get('fingerprint') == fingerprint:
+                self.state = saved
+                done = sum(1 for head in saved['heads'].values() if head['status'] == 'complete')
+                print(f"Resuming from checkpoint: {done} heads already trained")
+            else:
+                print("⚠️  Checkpoint was written for different training data; starting fresh")
+
+        os.makedirs(directory, exist_ok=True)
+
+    def completed(self, key):
+        return self.state['heads'].get(key, {}).get('status') == 'complete'
+
+    def partial_epoch(self, key):
+        """Epochs finished by an interrupted head, or 0"""
+        head = self.state['heads'].get(key, {})
+        return head.get('epoch', 0) if head.get('status') == 'partial' else 0
+
+    def model_path(self, backend, name):
+        path = backend.path(self.directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def partial_path(self, name):
+        return os.path.join(self.directory, f'{name}_partial.keras')
+
+    def mark_complete(self, key, backend, name, model):
+        backend.save(model, self.model_path(backend, name))
+        self.state['heads'][key] = {'status': 'complete'}
+        self._write()
+
+    def epoch_callback(self, key, name, every=5):
+        """Keras callback saving the head every `every` epochs"""
+        from tensorflow import keras
+
+        store = self
+
+        class PeriodicCheckpoint(keras.callbacks.Callback):
+            def on_epoch_end(self, epoch, logs=None):
+                if (epoch + 1) % every == 0:
+                    self.model.save(store.partial_path(name))
+                    store.state['heads'][key] = {'status': 'partial', 'epoch': epoch + 1}
+                    store._write()
+
+        return PeriodicCheckpoint()
+
+    def clear(self):
+        """Remove the checkpoint once the models have been saved"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _write(self):
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
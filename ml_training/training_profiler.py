@@ -0,0 +1,188 @@
+import argparse
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# The profiled run's generated data, kept apart from the training_data.csv that --resume reuses
+PROFILE_CSV = 'training_data_profile.csv'
+
+
+def peak_rss_mb():
+    """Process-wide peak resident set size so far in MB, if the platform reports it"""
+    if resource is None:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+class TrainingProfiler:
+    """Wall time, throughput and peak memory per training phase
+
+    process_peak_rss_mb is the process-wide high-water mark when a phase
+    ends, not the phase's own usage. With trace_malloc=True and tracemalloc
+    running (see run_profiled), the Python-heap peak inside each phase is
+    recorded too, at a noticeable slowdown. Phases may nest; an outer
+    phase's heap peak includes its inner phases.
+    """
+
+    def __init__(self, trace_malloc=False):
+        self.trace_malloc = trace_malloc
+        self.phases = []
+        self.epochs = {}
+        self._start = time.perf_counter()
+        self._heap_peaks = []  # peak already seen by each open phase, innermost last
+
+    @contextmanager
+    def phase(self, name, samples=None):
+        tracing = self.trace_malloc and tracemalloc.is_tracing()
+        if tracing:
+            self._begin_heap_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            record = {
+                'name': name,
+                'seconds': round(seconds, 4),
+                'samples': samples,
+                'samples_per_second': round(samples / seconds, 1) if samples and seconds > 0 else None,
+                'process_peak_rss_mb': peak_rss_mb()
+            }
+            if tracing:
+                record['python_heap_peak_mb'] = round(self._end_heap_peak() / 2 ** 20, 1)
+            self.phases.append(record)
+
+    def _begin_heap_peak(self):
+        """Save the enclosing phase's peak so far and measure this phase from zero"""
+        if self._heap_peaks:
+            self._heap_peaks[-1] = max(self._heap_peaks[-1], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        self._heap_peaks.append(0)
+
+    def _end_heap_peak(self):
+        """This phase's heap peak, carried into the enclosing phase"""
+        peak = max(self._heap_peaks.pop(), tracemalloc.get_traced_memory()[1])
+        if self._heap_peaks:
+            self._heap_peaks[-1] = max(self._heap_peaks[-1], peak)
+        tracemalloc.reset_peak()
+        return peak
+
+    def epoch_callback(self, name):
+        """Keras callback recording each epoch's duration under name"""
+        from tensorflow import keras
+
+        durations = self.epochs.setdefault(name, [])
+
+        class EpochTimer(keras.callbacks.Callback):
+            def on_epoch_begin(self, epoch, logs=None):
+                self._epoch_start = time.perf_counter()
+
+            def on_epoch_end(self, epoch, logs=None):
+                durations.append(round(time.perf_counter() - self._epoch_start, 4))
+
+        return EpochTimer()
+
+    def report(self):
+        return {
+            'total_seconds': round(time.perf_counter() - self._start, 4),
+            'process_peak_rss_mb': peak_rss_mb(),
+            'phases': self.phases,
+            'epochs': {
+                name: {
+                    'count': len(durations),
+                    'mean_seconds': round(sum(durations) / len(durations), 4) if durations else None,
+                    'seconds': durations
+                }
+                for name, durations in self.epochs.items()
+            }
+        }
+
+    def print_summary(self):
+        print("\n⏱️  Training profile")
+        for record in self.phases:
+            rate = f", {record['samples_per_second']:,.0f} samples/s" if record['samples_per_second'] else ''
+            memory = ''
+            if record['process_peak_rss_mb'] is not None:
+                memory = f", process peak RSS so far {record['process_peak_rss_mb']} MB"
+            if 'python_heap_peak_mb' in record:
+                memory += f", heap peak {record['python_heap_peak_mb']} MB"
+            print(f"  {record['name']}: {record['seconds']:.3f}s{rate}{memory}")
+
+
+def run_profiled(num_samples, engines, epochs=None, trace_malloc=False, save=False):
+    """Run the training pipeline under a profiler and return its report"""
+    from simple_ml_trainer import SimpleRWHTrainer
+
+    profiler = TrainingProfiler(trace_malloc=trace_malloc)
+    trainer = SimpleRWHTrainer(profiler=profiler)
+    if epochs is not None:
+        trainer.backend_options['keras'] = {'epochs': epochs}
+
+    # Traced once for the whole run; phases only reset the peak
+    if trace_malloc:
+        tracemalloc.start()
+    try:
+        with profiler.phase('load_data'):
+            gw_df, soil_df = trainer.load_and_process_data()
+
+        with profiler.phase('generate_data', samples=num_samples):
+            training_df = trainer.generate_training_data(gw_df, soil_df, num_samples=num_samples)
+
+        with profiler.phase('write_training_csv', samples=num_samples):
+            training_df.to_csv(PROFILE_CSV, index=False)
+
+        with profiler.phase('train_models', samples=num_samples):
+            trainer.train_models(training_df, engines=engines)
+
+        if save:
+            with profiler.phase('save_models'):
+                trainer.save_models()
+    finally:
+        if trace_malloc:
+            tracemalloc.stop()
+
+    report = profiler.report()
+    report['num_samples'] = num_samples
+    report['engines'] = list(engines)
+    return report, profiler
+
+
+def benchmark(sizes, engines, epochs=None, trace_malloc=False):
+    """Profile the pipeline at each dataset size"""
+    runs = []
+    for num_samples in sizes:
+        print(f"\n📊 Benchmarking {num_samples:,} samples...")
+        report, profiler = run_profiled(num_samples, engines, epochs, trace_malloc)
+        profiler.print_summary()
+        runs.append(report)
+    return {
+        'sizes': list(sizes),
+        'engines': list(engines),
+        'epochs': epochs,
+        'runs': runs
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Training pipeline profiler and scaling benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1500, 10000, 100000, 1000000])
+    parser.add_argument('--engines', nargs='+', default=['keras'])
+    parser.add_argument('--epochs', type=int, help='Override Keras epochs (default: 50)')
+    parser.add_argument('--trace-malloc', action='store_true', help='Also record Python-heap peaks')
+    parser.add_argument('--output', default='training_benchmark.json')
+    args = parser.parse_args()
+
+    report = benchmark(args.sizes, args.engines, args.epochs, args.trace_malloc)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Benchmark report saved to '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()